@@ -0,0 +1,62 @@
+"""对比两次基准测试结果
+
+    python -m benchmarks.compare old.json new.json
+"""
+import json
+import argparse
+
+METRICS = [
+    ('files_per_second', "文件/秒", True),
+    ('mb_per_second', "MB/秒", True),
+    ('p50', "p50 ms", False),
+    ('p95', "p95 ms", False),
+    ('p99', "p99 ms", False),
+    ('peak_rss_mb', "峰值内存 MB", False),
+    ('save_seconds', "保存耗时 s", False),
+    ('unlocked_size_ratio', "输出体积比", False),
+]
+
+
+def load_runs(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        results = json.load(f)
+    runs = {}
+    for run in results['runs']:
+        # 同一配置重复运行时取吞吐量最高的一次
+        key = (run['workers'], run.get('save_profile', "standard"))
+        best = runs.get(key)
+        if best is None or run['files_per_second'] > best['files_per_second']:
+            runs[key] = run
+    return results, runs
+
+
+def metric(run, key):
+    return run['latency_ms'][key] if key in run['latency_ms'] else run.get(key)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="对比两次基准测试结果")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args(argv)
+
+    old, old_runs = load_runs(args.baseline)
+    new, new_runs = load_runs(args.candidate)
+    if old['corpus'] != new['corpus']:
+        print("警告: 两次测试使用的语料不同，结果不可直接比较")
+    print(f"基准: {old.get('commit')}  对比: {new.get('commit')}")
+
+    for config in sorted(set(old_runs) & set(new_runs)):
+        print(f"\nworkers={config[0]}  save_profile={config[1]}")
+        for key, label, higher_is_better in METRICS:
+            before, after = metric(old_runs[config], key), metric(new_runs[config], key)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before * 100 if before else 0.0
+            better = change > 0 if higher_is_better else change < 0
+            mark = "" if abs(change) < 1 else (" ↑" if better else " ↓")
+            print(f"  {label:<12}{before:>10}  →{after:>10}  ({change:+.1f}%){mark}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""可复现的合成PDF测试语料生成器
+
+    python -m benchmarks.corpus ./bench_corpus --preset small
+"""
+import json
+import random
+import argparse
+from pathlib import Path
+import pikepdf
+
+USER_PASSWORD = "bench-user"
+OWNER_PASSWORD = "bench-owner"
+
+ENCRYPTIONS = {
+    'none': None,
+    'owner_only_aes256': dict(user="", owner=OWNER_PASSWORD, R=6),
+    'user_only_aes256': dict(user=USER_PASSWORD, owner="", R=6),
+    'user_rc4_40': dict(user=USER_PASSWORD, owner=OWNER_PASSWORD, R=2, aes=False, metadata=False),
+    'user_rc4_128': dict(user=USER_PASSWORD, owner=OWNER_PASSWORD, R=3, aes=False, metadata=False),
+    'user_aes128': dict(user=USER_PASSWORD, owner=OWNER_PASSWORD, R=4, aes=True),
+    'user_aes256': dict(user=USER_PASSWORD, owner=OWNER_PASSWORD, R=6),
+}
+
+# (名称, 加密方式, 页数, 每页附加数据KB, 文件数)
+PRESETS = {
+    'small': [
+        ('plain', 'none', 5, 4, 40),
+        ('owner_only', 'owner_only_aes256', 5, 4, 40),
+        ('user_only', 'user_only_aes256', 5, 4, 20),
+        ('rc4_40', 'user_rc4_40', 5, 4, 30),
+        ('rc4_128', 'user_rc4_128', 5, 4, 30),
+        ('aes128', 'user_aes128', 5, 4, 30),
+        ('aes256', 'user_aes256', 5, 4, 30),
+        ('many_pages', 'user_aes256', 1000, 0, 4),
+        ('large_file', 'user_aes128', 20, 1024, 2),
+    ],
+    'medium': [
+        ('plain', 'none', 10, 8, 300),
+        ('owner_only', 'owner_only_aes256', 10, 8, 300),
+        ('user_only', 'user_only_aes256', 10, 8, 200),
+        ('rc4_40', 'user_rc4_40', 10, 8, 200),
+        ('rc4_128', 'user_rc4_128', 10, 8, 200),
+        ('aes128', 'user_aes128', 10, 8, 300),
+        ('aes256', 'user_aes256', 10, 8, 300),
+        ('many_pages', 'user_aes256', 5000, 0, 10),
+        ('large_file', 'user_aes128', 50, 2048, 8),
+    ],
+    'large': [
+        ('plain', 'none', 10, 8, 2000),
+        ('owner_only', 'owner_only_aes256', 10, 8, 2000),
+        ('user_only', 'user_only_aes256', 10, 8, 1000),
+        ('rc4_128', 'user_rc4_128', 10, 8, 2000),
+        ('aes128', 'user_aes128', 10, 8, 2000),
+        ('aes256', 'user_aes256', 10, 8, 2000),
+        ('many_pages', 'user_aes256', 20000, 0, 10),
+        ('large_file', 'user_aes128', 100, 5120, 10),
+    ],
+}
+
+MANIFEST_NAME = "corpus.json"
+
+
+def build_pdf(rng, pages, payload_kb):
+    pdf = pikepdf.new()
+    for page_number in range(pages):
+        pdf.add_blank_page()
+        if payload_kb:
+            # 随机数据难以压缩，使文件大小接近设定值
+            payload = rng.getrandbits(payload_kb * 8192).to_bytes(payload_kb * 1024, 'little')
+            pdf.pages[page_number].Contents = pdf.make_stream(payload)
+    return pdf
+
+
+def generate_corpus(target_dir, preset="small", seed=20240101):
+    target_dir = Path(target_dir)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    files = []
+
+    for name, encryption, pages, payload_kb, count in PRESETS[preset]:
+        for i in range(count):
+            file_path = target_dir / encryption / f"{name}_{i:05d}.pdf"
+            file_path.parent.mkdir(exist_ok=True)
+            with build_pdf(rng, pages, payload_kb) as pdf:
+                options = ENCRYPTIONS[encryption]
+                pdf.save(file_path, static_id=True,
+                         encryption=pikepdf.Encryption(**options) if options else False)
+            files.append({'path': str(file_path.relative_to(target_dir)), 'kind': name,
+                          'encryption': encryption, 'pages': pages,
+                          'size': file_path.stat().st_size})
+
+    manifest = {'preset': preset, 'seed': seed, 'files': files,
+                'user_password': USER_PASSWORD, 'owner_password': OWNER_PASSWORD}
+    with open(target_dir / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    return manifest
+
+
+def load_or_generate(target_dir, preset="small", seed=20240101):
+    manifest_path = Path(target_dir) / MANIFEST_NAME
+    if manifest_path.exists():
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('preset') == preset and manifest.get('seed') == seed:
+            return manifest
+    return generate_corpus(target_dir, preset, seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="生成可复现的合成加密PDF测试语料")
+    parser.add_argument("target_dir")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--seed", type=int, default=20240101)
+    args = parser.parse_args(argv)
+
+    manifest = generate_corpus(args.target_dir, args.preset, args.seed)
+    total = sum(f['size'] for f in manifest['files'])
+    print(f"已生成 {len(manifest['files'])} 个文件，共 {total / 1024 / 1024:.1f} MB: {args.target_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""核心处理流程的性能基准（无需Qt）
+
+    python -m benchmarks.run_benchmark --corpus ./bench_corpus --preset small \\
+        --workers 1 2 4 --profiles fast compact --output bench_results.json
+
+结果写入 JSON 文件，可用 benchmarks.compare 对比两次提交的结果。
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import pikepdf
+from core.pdf_utils import PDFUnlocker, SAVE_PROFILES, DEFAULT_SAVE_PROFILE
+from core.batch import BatchProcessor, default_worker_count
+from core.report import RunningStats
+from benchmarks.corpus import PRESETS, load_or_generate
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def peak_rss_mb():
+    """本进程与已结束子进程的峰值常驻内存（MB），不支持的平台返回 None
+
+    该值在进程生命周期内只增不减，需要单独测量某一配置时请分别运行。
+    """
+    if resource is None:
+        return None
+    # Linux 上 ru_maxrss 以 KB 为单位，macOS 上以字节为单位
+    unit = 1 if sys.platform == "darwin" else 1024
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return round(peak * unit / 1024 / 1024, 1)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_once(file_paths, passwords, workers, save_profile=DEFAULT_SAVE_PROFILE):
+    output_dir = tempfile.mkdtemp(prefix="pdf_unlock_bench_")
+    try:
+        unlocker = PDFUnlocker(passwords, output_dir, "unlocked_", skip_unencrypted=False,
+                               password_type="两种密码都尝试", save_profile=save_profile)
+        batch = BatchProcessor(unlocker, workers)
+        stats = RunningStats()
+        durations = []
+        bytes_out = 0
+        for result in batch.run(file_paths):
+            stats.add(result)
+            durations.append(result['duration'])
+            if result['output_file'] != "未生成":
+                bytes_out += os.path.getsize(os.path.join(output_dir, result['output_file']))
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    durations.sort()
+    elapsed = batch.elapsed
+    return {
+        'workers': batch.workers,
+        'save_profile': save_profile,
+        'files': stats.total,
+        'elapsed': round(elapsed, 3),
+        'files_per_second': round(stats.total / elapsed, 2) if elapsed else 0.0,
+        'mb_per_second': round(stats.bytes_in / 1024 / 1024 / elapsed, 2) if elapsed else 0.0,
+        'bytes_in': stats.bytes_in,
+        'bytes_out': bytes_out,
+        'save_seconds': round(stats.stage_times['save'], 3),
+        'unlocked_size_ratio': round(stats.unlocked_bytes_out / stats.unlocked_bytes_in, 4)
+        if stats.unlocked_bytes_in else None,
+        'latency_ms': {
+            'p50': round(percentile(durations, 0.50) * 1000, 2),
+            'p95': round(percentile(durations, 0.95) * 1000, 2),
+            'p99': round(percentile(durations, 0.99) * 1000, 2),
+            'max': round(durations[-1] * 1000, 2) if durations else 0.0,
+        },
+        'peak_rss_mb': peak_rss_mb(),
+        'statuses': dict(stats.status_counts),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PDF解密核心流程性能基准")
+    parser.add_argument("--corpus", default="bench_corpus", help="语料目录，不存在时自动生成")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--seed", type=int, default=20240101)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, default_worker_count()],
+                        help="依次测试的并行进程数")
+    parser.add_argument("--profiles", nargs="+", choices=list(SAVE_PROFILES),
+                        default=[DEFAULT_SAVE_PROFILE], help="依次测试的输出保存方式")
+    parser.add_argument("--repeat", type=int, default=1, help="每种配置重复运行的次数")
+    parser.add_argument("--output", default="bench_results.json", help="结果JSON文件")
+    args = parser.parse_args(argv)
+
+    manifest = load_or_generate(args.corpus, args.preset, args.seed)
+    file_paths = [os.path.join(args.corpus, f['path']) for f in manifest['files']]
+    passwords = [manifest['user_password'], manifest['owner_password']]
+
+    runs = []
+    for workers in args.workers:
+        for save_profile in args.profiles:
+            for _ in range(args.repeat):
+                run = run_once(file_paths, passwords, workers, save_profile)
+                runs.append(run)
+                print(f"workers={run['workers']:>2}  {save_profile:<10}  "
+                      f"{run['files_per_second']:>8.1f} 文件/秒  {run['mb_per_second']:>7.1f} MB/秒  "
+                      f"p50={run['latency_ms']['p50']}ms  p95={run['latency_ms']['p95']}ms  "
+                      f"p99={run['latency_ms']['p99']}ms  保存 {run['save_seconds']}s  "
+                      f"体积 {run['unlocked_size_ratio']}")
+
+    results = {
+        'commit': git_commit(),
+        'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'python': platform.python_version(),
+        'pikepdf': pikepdf.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'corpus': {'preset': manifest['preset'], 'seed': manifest['seed'],
+                   'files': len(file_paths), 'bytes': sum(f['size'] for f in manifest['files'])},
+        'runs': runs,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""冷启动耗时基准：分别测量库接口、命令行和图形界面从启动进程到可用所需的时间
+
+    python -m benchmarks.startup --repeat 10 --output startup_results.json
+
+每个场景都在新的 Python 子进程中运行，结果包含解释器自身的启动时间（见 python 场景）。
+图形界面场景使用 offscreen 平台创建并显示主窗口，无需显示器。
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+from benchmarks.run_benchmark import git_commit
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# 场景名 -> 在子进程中执行的代码；结束时报告 pikepdf 和 Qt 是否已被导入
+_LOADED = "import sys; print(int('pikepdf' in sys.modules), int('PyQt5.QtCore' in sys.modules))"
+SCENARIOS = {
+    'python': "pass",
+    'import core': "import core",
+    'core api': "from core import unlock_file, unlock_batch, classify_file",
+    'cli --help': "from core.cli import build_parser; build_parser().format_help()",
+    'pikepdf': "import pikepdf",
+    'gui window': (
+        "from PyQt5.QtWidgets import QApplication\n"
+        "from gui.main_window import PDFPasswordRemover\n"
+        "app = QApplication([])\n"
+        "window = PDFPasswordRemover()\n"
+        "window.show()\n"
+        "app.processEvents()"
+    ),
+}
+
+
+def measure(code, repeat):
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    timings = []
+    loaded = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable, "-c", f"{code}\n{_LOADED}"], cwd=REPO_ROOT, env=env,
+                                   capture_output=True, text=True)
+        timings.append(time.perf_counter() - start)
+        if completed.returncode != 0:
+            stderr = completed.stderr.strip()
+            return {'error': stderr.splitlines()[-1] if stderr else f"退出码 {completed.returncode}"}
+        loaded = completed.stdout.split()[-2:]
+    return {
+        'median_ms': round(statistics.median(timings) * 1000, 1),
+        'min_ms': round(min(timings) * 1000, 1),
+        'pikepdf_loaded': loaded[0] == "1",
+        'qt_loaded': loaded[1] == "1",
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="库接口、命令行和图形界面的冷启动耗时")
+    parser.add_argument("--repeat", type=int, default=10, help="每个场景运行的次数")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--output", help="结果JSON文件（不指定时只打印）")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.scenarios:
+        result = measure(SCENARIOS[name], max(1, args.repeat))
+        results[name] = result
+        if 'error' in result:
+            print(f"{name:<12}  失败: {result['error']}")
+            continue
+        print(f"{name:<12}  中位数 {result['median_ms']:>7.1f} ms  最快 {result['min_ms']:>7.1f} ms  "
+              f"pikepdf: {'已加载' if result['pikepdf_loaded'] else '未加载'}  "
+              f"Qt: {'已加载' if result['qt_loaded'] else '未加载'}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'commit': git_commit(),
+                'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'repeat': args.repeat,
+                'scenarios': results,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
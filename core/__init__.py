@@ -0,0 +1,35 @@
+"""PDF解锁核心库（不依赖Qt）
+
+    from core import unlock_file, unlock_batch, classify_file, sniff_file
+
+接口说明见 core.api。各名称在第一次使用时才导入对应模块，
+因此 import core 本身几乎不花时间，也不会加载 pikepdf。
+"""
+import importlib
+
+_EXPORTS = {
+    'unlock_file': "core.api",
+    'unlock_batch': "core.api",
+    'classify_file': "core.api",
+    'create_batch': "core.api",
+    'sniff_file': "core.pdf_sniff",
+    'verify_output': "core.verifier",
+    'PDFUnlocker': "core.pdf_utils",
+    'BatchProcessor': "core.batch",
+    'FileFeed': "core.batch",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
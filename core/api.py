@@ -0,0 +1,110 @@
+"""不依赖Qt的库接口，供脚本和其他程序直接调用
+
+    from core import unlock_file, unlock_batch, classify_file
+
+    result = unlock_file("a.pdf", ["密码1", "密码2"], "输出目录")
+    for result in unlock_batch(["a.pdf", "b.pdf"], "密码", "输出目录", workers=4):
+        print(result['original_file'], result['status'], result['message'])
+    info = classify_file("a.pdf", ["密码1"])
+
+处理结果是与命令行 JSON 报告相同字段的字典（status、success、message、output_file 等）。
+pikepdf 在第一次真正处理文件时才导入。
+"""
+from core.pdf_utils import PDFUnlocker, error_result, load_pikepdf, unique_passwords, DEFAULT_SAVE_PROFILE
+from core.pdf_io import InputSource, DEFAULT_INPUT_MODE, DEFAULT_ARCHIVE_OUTPUT, DEFAULT_PIPELINE_MEMORY
+from core.scheduler import DEFAULT_SCHEDULE_ORDER
+from core.batch import BatchProcessor
+from core.result_cache import ResultCache, CACHE_FILENAME
+
+DEFAULT_PREFIX = "unlocked_"
+
+
+def create_unlocker(passwords, output_dir, prefix=DEFAULT_PREFIX, skip_unencrypted=True,
+                    password_type="打开密码", preserve_restrictions=False,
+                    save_profile=DEFAULT_SAVE_PROFILE, input_mode=DEFAULT_INPUT_MODE,
+                    write_behind=False, archive_output=DEFAULT_ARCHIVE_OUTPUT, sniff=True, key_cache=True):
+    return PDFUnlocker(passwords, output_dir, prefix, skip_unencrypted, password_type,
+                       preserve_restrictions, save_profile, input_mode, write_behind, archive_output, sniff,
+                       key_cache)
+
+
+def create_batch(passwords, output_dir, prefix=DEFAULT_PREFIX, workers=1, use_cache=False,
+                 force=False, cache_hash=False, cache_max_entries=200000, write_queue_size=0,
+                 order=DEFAULT_SCHEDULE_ORDER, memory_budget=0, file_timeout=0, memory_limit=0,
+                 dedup=False, read_ahead=0, pipeline_memory=DEFAULT_PIPELINE_MEMORY, verify=None, **options):
+    """按给定设置创建 BatchProcessor，命令行、界面和 unlock_batch 共用
+
+    write_queue_size 大于 0 时启用后台写出队列，read_ahead 大于 0 时单进程处理也预读后续文件；
+    verify 为保存后校验输出的抽样设置（"all"、每 N 个抽 1 个的 N 或 "P%"），None 表示不校验；
+    memory_budget、memory_limit、pipeline_memory 以字节为单位；
+    其余关键字参数（skip_unencrypted、save_profile 等）传给 PDFUnlocker。
+    """
+    unlocker = create_unlocker(passwords, output_dir, prefix,
+                               write_behind=write_queue_size > 0, **options)
+    cache = None
+    if use_cache:
+        cache = ResultCache(unlocker.output_dir / CACHE_FILENAME, unlocker.settings_key(),
+                            use_hash=cache_hash, max_entries=cache_max_entries, force=force)
+    return BatchProcessor(unlocker, workers, cache, write_queue_size=write_queue_size or 8,
+                          order=order, memory_budget=memory_budget, file_timeout=file_timeout,
+                          memory_limit=memory_limit, dedup=dedup, read_ahead=read_ahead,
+                          pipeline_memory=pipeline_memory, verify=verify)
+
+
+def unlock_file(file_path, passwords, output_dir, prefix=DEFAULT_PREFIX, **options):
+    """解锁单个文件，返回处理结果字典；出错时不抛出异常，而是返回失败结果"""
+    unlocker = create_unlocker(passwords, output_dir, prefix, **options)
+    unlocker.output_dir.mkdir(parents=True, exist_ok=True)
+    return unlocker.process_file(str(file_path))
+
+
+def unlock_batch(file_paths, passwords, output_dir, prefix=DEFAULT_PREFIX, workers=1, **options):
+    """批量解锁，按完成顺序逐个产出处理结果字典
+
+    提前结束迭代（break 或关闭生成器）时会停止提交新文件，在途文件照常完成并写出。
+    """
+    batch = create_batch(passwords, output_dir, prefix, workers, **options)
+    batch.unlocker.output_dir.mkdir(parents=True, exist_ok=True)
+    results = batch.run([str(file_path) for file_path in file_paths])
+    try:
+        yield from results
+    finally:
+        batch.stop()
+        results.close()
+
+
+def classify_file(file_path, passwords=(), input_mode=DEFAULT_INPUT_MODE):
+    """检查文件是否加密、哪个候选密码可以打开以及加密方式和权限，不写出任何文件
+
+    未给出密码时只尝试空密码，因此仅设置了权限密码的文件也能识别出来。
+    """
+    pikepdf = load_pikepdf()
+    file_path = str(file_path)
+    passwords = unique_passwords([passwords] if isinstance(passwords, str) else passwords) or [""]
+    info = {'file': file_path, 'encrypted': None, 'opened': False, 'password_index': None,
+            'user_password_matched': None, 'owner_password_matched': None,
+            'encryption': None, 'permissions': None, 'pages': None, 'error': None}
+    try:
+        with InputSource(file_path, input_mode) as source:
+            for index, password in enumerate(passwords):
+                try:
+                    pdf = pikepdf.open(source.open(), password=password)
+                except pikepdf.PasswordError:
+                    continue
+                with pdf:
+                    info.update(opened=True, encrypted=pdf.is_encrypted, pages=len(pdf.pages))
+                    if pdf.is_encrypted:
+                        encryption = pdf.encryption
+                        info.update(password_index=index,
+                                    user_password_matched=pdf.user_password_matched,
+                                    owner_password_matched=pdf.owner_password_matched,
+                                    permissions=pdf.allow._asdict(),
+                                    encryption={'R': encryption.R, 'V': encryption.V, 'P': encryption.P,
+                                                'bits': encryption.bits,
+                                                'method': encryption.stream_method.name})
+                return info
+            info['encrypted'] = True
+            info['error'] = "所有候选密码均错误"
+    except Exception as e:
+        info['error'] = error_result(file_path, e)['message']
+    return info
@@ -0,0 +1,522 @@
+import os
+import time
+import signal
+import threading
+from collections import deque
+from core.password_ranker import PasswordRanker
+from core.pdf_utils import error_result, write_failed
+from core.pdf_io import (WriteBehindQueue, ReadAheadQueue, BufferBudget, ArchiveOutputs, remove_partial_files,
+                         DEFAULT_PIPELINE_MEMORY)
+from core.scheduler import SizeScheduler, DEFAULT_SCHEDULE_ORDER
+from core.dedup import Deduplicator
+from core.verifier import OutputVerifier
+
+_worker_unlocker = None
+
+
+def _init_pool_worker(unlocker):
+    global _worker_unlocker
+    # Ctrl+C 由主进程处理：停止提交新文件，在途文件照常完成
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_unlocker = unlocker
+
+
+def _process_in_pool(file_path, password_order):
+    return _worker_unlocker.process_file(file_path, password_order)
+
+
+def default_worker_count():
+    return os.cpu_count() or 1
+
+
+class FileFeed:
+    """待处理文件队列，处理过程中仍可追加文件（如边扫描边处理）"""
+    DONE = object()
+
+    def __init__(self, file_paths=(), closed=False, sizes=None):
+        self._queue = deque(file_paths)
+        self._condition = threading.Condition()
+        self._closed = closed
+        self.total = len(self._queue)
+        # 扫描时已知的文件大小，调度时无需再次读取文件信息
+        self.sizes = sizes if sizes is not None else {}
+        self.on_add = None
+
+    def snapshot(self):
+        with self._condition:
+            return list(self._queue)
+
+    def add(self, file_paths, sizes=None):
+        with self._condition:
+            if self._closed:
+                return
+            if sizes:
+                self.sizes.update(sizes)
+            self._queue.extend(file_paths)
+            self.total += len(file_paths)
+            self._condition.notify_all()
+        if self.on_add is not None:
+            self.on_add(file_paths)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def get(self, timeout=None):
+        """取出下一个文件；暂无文件时返回 None，全部取完且已关闭时返回 DONE"""
+        with self._condition:
+            if not self._queue and not self._closed:
+                self._condition.wait(timeout)
+            if self._queue:
+                return self._queue.popleft()
+            return self.DONE if self._closed else None
+
+    def __iter__(self):
+        while True:
+            file_path = self.get()
+            if file_path is self.DONE:
+                return
+            if file_path is not None:
+                yield file_path
+
+
+class BatchProcessor:
+    """批量调度：顺序执行或分发到进程池，按完成顺序逐个产出结果"""
+
+    def __init__(self, unlocker, workers=1, cache=None, journal=None, write_queue_size=8,
+                 order=DEFAULT_SCHEDULE_ORDER, memory_budget=0, file_timeout=0, memory_limit=0,
+                 dedup=False, read_ahead=0, pipeline_memory=DEFAULT_PIPELINE_MEMORY, verify=None):
+        self.unlocker = unlocker
+        self.cache = cache
+        self.journal = journal
+        self.write_queue_size = write_queue_size
+        self.order = order
+        self.memory_budget = memory_budget
+        self.file_timeout = file_timeout
+        self.memory_limit = memory_limit
+        self.dedup = Deduplicator(unlocker.output_dir, unlocker.prefix) if dedup else None
+        # 预读深度；只在单进程顺序处理时使用，多进程时各进程的读取本来就与解密重叠
+        self.read_ahead = read_ahead
+        self.pipeline_memory = pipeline_memory
+        # 保存后校验输出的抽样设置（见 core.verifier），None 表示不校验
+        self.verify = verify
+        self.verifier = None
+        self.budget = None
+        self.reader = None
+        self.writer = None
+        self.archives = None
+        self.scheduler = None
+        self.supervisor = None
+        self.workers = max(1, int(workers))
+        self.ranker = PasswordRanker(len(unlocker.passwords))
+        self.processed_count = 0
+        self.bytes_processed = 0
+        self.start_time = None
+        self.end_time = None
+        self._is_running = True
+        self._feed = None
+        self._archived_results = []
+
+    def run(self, file_paths):
+        feed = file_paths if isinstance(file_paths, FileFeed) else FileFeed(file_paths, closed=True)
+        self._feed = feed
+        self.scheduler = SizeScheduler(feed, self.order, self.memory_budget, self.memory_factor())
+        self.start_time = time.perf_counter()
+        self.end_time = None
+        remove_partial_files(self.unlocker.output_dir)
+        # 只有恢复任务时才保留输出ZIP中之前完成的成员
+        self.archives = ArchiveOutputs(self.unlocker.output_dir,
+                                       keep_existing=self.journal is not None and self.journal.resumed)
+        self._archived_results = []
+        self.budget = BufferBudget(self.pipeline_memory)
+        if self.unlocker.write_behind:
+            self.writer = WriteBehindQueue(self.write_queue_size, budget=self.budget)
+        if self.pipelined:
+            self.reader = ReadAheadQueue(self.read_ahead, self.budget)
+        if self.verify is not None:
+            # 保留权限限制时输出本来就重新加密，只要求不用密码即可打开
+            self.verifier = OutputVerifier(self.verify, self.write_queue_size,
+                                           allow_encryption=self.unlocker.preserve_restrictions)
+        try:
+            if self.file_timeout or self.memory_limit:
+                yield from self._run_supervised(feed)
+            elif self.pipelined:
+                yield from self._run_pipelined(feed)
+            elif self.workers == 1:
+                yield from self._run_sequential(feed)
+            else:
+                yield from self._run_parallel(feed)
+            if self.writer is not None:
+                # 停止时已解密的文件仍会写完
+                for result, error in self.writer.close():
+                    yield from self._emit(self._written_result(result, error))
+            if self.verifier is not None:
+                for result in self.verifier.drain():
+                    yield from self._emit_verified(result)
+            self._close_archives()
+            if self.journal is not None and self._is_running:
+                self.journal.finish()
+        finally:
+            self.end_time = time.perf_counter()
+            if self.reader is not None:
+                self.reader.close()
+            if self.writer is not None:
+                self.writer.close()
+            if self.verifier is not None:
+                self.verifier.close()
+            if self.archives is not None:
+                self._close_archives()
+            if self.cache is not None:
+                self.cache.close()
+            if self.journal is not None:
+                self.journal.close()
+
+    def memory_factor(self):
+        """估算处理一个文件时的内存占用相对文件大小的倍数"""
+        factor = 2
+        if self.unlocker.input_mode == "buffer":
+            factor += 1
+        if self.unlocker.write_behind:
+            factor += 1
+        if self.pipelined:
+            factor += 1
+        return factor
+
+    @property
+    def pipelined(self):
+        return self.read_ahead > 0 and self.workers == 1 and not (self.file_timeout or self.memory_limit)
+
+    def _run_sequential(self, feed):
+        while self._is_running:
+            file_path = self.scheduler.next(timeout=0.1)
+            if file_path is FileFeed.DONE:
+                break
+            if file_path is None:
+                yield from self._completed_writes()
+                continue
+            shortcut = self._shortcut_result(file_path)
+            if shortcut is False:
+                continue
+            if shortcut is not None:
+                yield from self._emit(shortcut)
+            else:
+                password_order = self.ranker.order_for(file_path)
+                yield from self._finish(self.unlocker.process_file(file_path, password_order))
+
+    def _run_pipelined(self, feed):
+        """单进程时分为三段：预读线程读入后续文件，当前线程解密，后台写出队列写出"""
+        submitted = 0
+        exhausted = False
+        while self._is_running:
+            while not exhausted and self.reader.has_room:
+                file_path = self.scheduler.next(timeout=0 if submitted else 0.1)
+                if file_path is FileFeed.DONE:
+                    exhausted = True
+                if file_path is None or file_path is FileFeed.DONE:
+                    break
+                shortcut = self._shortcut_result(file_path)
+                if shortcut is False:
+                    continue
+                if shortcut is not None:
+                    yield from self._emit(shortcut)
+                    continue
+                self.reader.submit(file_path)
+                submitted += 1
+
+            if not submitted:
+                if exhausted:
+                    break
+                yield from self._completed_writes()
+                continue
+
+            # 停止时已预读但未处理的文件在任务日志中仍为未完成
+            file_path, data, read_time = self.reader.take()
+            submitted -= 1
+            result = self.unlocker.process_file(file_path, self.ranker.order_for(file_path), data)
+            result['read_time'] += read_time
+            yield from self._finish(result)
+
+    def pipeline_status(self):
+        """预读和写出队列的当前占用、平均占用和等待时间，未启用时返回 None
+
+        解密阶段等待读取的时间长说明瓶颈在读取，等待写出队列的时间长说明瓶颈在写出，两者都短则瓶颈在解密。
+        """
+        if self.reader is None and self.writer is None:
+            return None
+        status = {'memory_limit': self.budget.limit, 'buffered_bytes': self.budget.used,
+                  'peak_buffered_bytes': self.budget.peak}
+        waits = {}
+        if self.reader is not None:
+            reader = self.reader
+            status['read'] = {'depth': reader.depth, 'queued': reader.gauge.value,
+                              'average_queued': round(reader.gauge.average, 2), 'peak_queued': reader.gauge.peak,
+                              'buffered_bytes': reader.buffered_bytes, 'read_seconds': round(reader.read_time, 3),
+                              'wait_seconds': round(reader.wait_time, 3),
+                              'stall_seconds': round(reader.stall_time, 3)}
+            waits['read'] = reader.wait_time
+        if self.writer is not None:
+            writer = self.writer
+            status['write'] = {'depth': writer.max_pending, 'queued': writer.gauge.value,
+                               'average_queued': round(writer.gauge.average, 2), 'peak_queued': writer.gauge.peak,
+                               'buffered_bytes': writer.buffered_bytes, 'write_seconds': round(writer.write_time, 3),
+                               'wait_seconds': round(writer.wait_time, 3)}
+            waits['write'] = writer.wait_time
+        stage, wait = max(waits.items(), key=lambda item: item[1])
+        status['bottleneck'] = stage if wait > self.elapsed * 0.1 else "decrypt"
+        return status
+
+    def _new_pool(self):
+        from concurrent.futures import ProcessPoolExecutor
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_pool_worker,
+                                   initargs=(self.unlocker,))
+
+    def _run_parallel(self, feed):
+        from concurrent.futures import FIRST_COMPLETED, wait
+        from concurrent.futures.process import BrokenProcessPool
+        # 限制已提交但未完成的任务数，停止时只需等待少量在途任务
+        max_pending = self.workers * 2
+        exhausted = False
+        pending = {}
+        # 工作进程异常退出（如崩溃或被系统终止）后进程池不再可用，当时在途的文件都无法确定是否为肇事者：
+        # 换用新的进程池后逐个单独重新处理，单独处理时仍使进程池崩溃的文件才记为错误
+        suspects = deque()
+        isolated = None
+
+        executor = self._new_pool()
+        generation = 0
+        try:
+            while True:
+                while self._is_running and suspects and not pending:
+                    file_path, password_order = suspects.popleft()
+                    try:
+                        future = executor.submit(_process_in_pool, file_path, password_order)
+                    except BrokenProcessPool:
+                        executor, generation = self._replace_pool(executor), generation + 1
+                        future = executor.submit(_process_in_pool, file_path, password_order)
+                    pending[future] = (file_path, password_order, generation)
+                    isolated = future
+
+                while (self._is_running and not suspects and isolated is None and not exhausted
+                       and len(pending) < max_pending):
+                    # 内存预算已满时 next() 返回 None，等在途任务完成后再提交
+                    file_path = self.scheduler.next(timeout=0 if pending else 0.1)
+                    if file_path is FileFeed.DONE:
+                        exhausted = True
+                    if file_path is None or file_path is FileFeed.DONE:
+                        break
+                    shortcut = self._shortcut_result(file_path)
+                    if shortcut is False:
+                        continue
+                    if shortcut is not None:
+                        yield from self._emit(shortcut)
+                        continue
+                    password_order = self.ranker.order_for(file_path)
+                    try:
+                        future = executor.submit(_process_in_pool, file_path, password_order)
+                    except BrokenProcessPool:
+                        executor, generation = self._replace_pool(executor), generation + 1
+                        future = executor.submit(_process_in_pool, file_path, password_order)
+                    pending[future] = (file_path, password_order, generation)
+
+                if not pending:
+                    if (exhausted and not suspects) or not self._is_running:
+                        break
+                    continue
+
+                # 输入仍可能追加时定期醒来提交新文件
+                done, _ = wait(pending, timeout=None if exhausted else 0.1,
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path, password_order, submitted_in = pending.pop(future)
+                    was_isolated = future is isolated
+                    if was_isolated:
+                        isolated = None
+                    if isinstance(future.exception(), BrokenProcessPool):
+                        if submitted_in == generation:
+                            executor, generation = self._replace_pool(executor), generation + 1
+                        if not was_isolated:
+                            suspects.append((file_path, password_order))
+                            continue
+                        yield from self._finish(error_result(file_path, "工作进程异常退出"))
+                        continue
+                    yield from self._finish(self._future_result(future, file_path))
+                yield from self._completed_writes()
+        finally:
+            executor.shutdown(wait=True)
+
+    def _replace_pool(self, executor):
+        executor.shutdown(wait=False)
+        return self._new_pool()
+
+    def _run_supervised(self, feed):
+        from core.supervisor import SupervisedPool
+        # 设置了超时或内存上限时每个文件都在可被终止的子进程中处理（单进程时也是如此）
+        self.supervisor = SupervisedPool(self.unlocker, self.workers, self.file_timeout, self.memory_limit)
+        exhausted = False
+        try:
+            while self._is_running:
+                while not exhausted and self.supervisor.has_idle:
+                    busy = self.supervisor.busy_count
+                    file_path = self.scheduler.next(timeout=0 if busy else 0.1)
+                    if file_path is FileFeed.DONE:
+                        exhausted = True
+                    if file_path is None or file_path is FileFeed.DONE:
+                        break
+                    shortcut = self._shortcut_result(file_path)
+                    if shortcut is False:
+                        continue
+                    if shortcut is not None:
+                        yield from self._emit(shortcut)
+                        continue
+                    self.supervisor.submit(file_path, self.ranker.order_for(file_path))
+
+                if not self.supervisor.busy_count:
+                    if exhausted:
+                        break
+                    continue
+
+                for result in self.supervisor.poll():
+                    yield from self._finish(result)
+                yield from self._completed_writes()
+        finally:
+            # 停止时直接终止正在处理的文件，它们在任务日志中仍为未完成
+            self.supervisor.shutdown(kill=True)
+
+    def _future_result(self, future, file_path):
+        try:
+            return future.result()
+        except Exception as e:
+            return error_result(file_path, e)
+
+    def _finish(self, result):
+        """结果带有待写出的数据时交给后台写出队列，写完后再记录和产出"""
+        data = result.pop('_output_data', None)
+        archive_name = result.pop('_output_archive', None)
+        if data is None:
+            yield from self._emit(result)
+        elif archive_name is not None:
+            yield from self._emit(self._archived_result(result, archive_name, data))
+        else:
+            self.writer.submit(self.unlocker.output_dir / result['output_file'], data, result)
+        yield from self._completed_writes()
+
+    def _completed_writes(self):
+        """产出后台写出和保存后校验已完成的结果"""
+        if self.writer is not None:
+            for result, error in self.writer.completed():
+                yield from self._emit(self._written_result(result, error))
+        if self.verifier is not None:
+            for result in self.verifier.completed():
+                yield from self._emit_verified(result)
+
+    def _archived_result(self, result, archive_name, data):
+        member_name = os.path.relpath(result['output_file'], archive_name).replace(os.sep, '/')
+        try:
+            result['write_time'] = self.archives.add(archive_name, member_name, data)
+        except Exception as e:
+            return write_failed(result, e)
+        result['output_archive'] = archive_name
+        if self.verifier is not None:
+            # 输出ZIP关闭前成员无法重新读取，校验写入的数据
+            result['_verify_data'] = data
+        return result
+
+    def _close_archives(self):
+        """写完输出ZIP后才把其中的成员记入任务日志，中断时未写完的成员在恢复任务时重新处理"""
+        archives, self.archives = self.archives, None
+        archived, self._archived_results = self._archived_results, []
+        archives.close()
+        if self.journal is not None:
+            for result in archived:
+                self.journal.record(result)
+
+    def _written_result(self, result, error):
+        return write_failed(result, error) if error is not None else result
+
+    def _cached_result(self, file_path):
+        if self.cache is None:
+            return None
+        return self.cache.lookup(file_path, self.unlocker.output_dir)
+
+    def _shortcut_result(self, file_path):
+        """无需解密的文件：返回缓存或内容重复的结果，False 表示等待内容相同的文件处理完成"""
+        cached = self._cached_result(file_path)
+        if cached is not None or self.dedup is None:
+            return cached
+        duplicate = self.dedup.check(file_path, self.scheduler.size_of(file_path))
+        if duplicate is not None:
+            # 副本不占用内存预算，结果由 _emit() 在原文件完成时产出
+            self.scheduler.finished(file_path)
+        return duplicate
+
+    def _emit(self, result):
+        """需要校验的输出交给后台校验，校验完成后再记录和产出"""
+        verify_data = result.pop('_verify_data', None)
+        if self.verifier is not None and self.verifier.wants(result):
+            source = verify_data if verify_data is not None else self.unlocker.output_dir / result['output_file']
+            self.verifier.submit(source, result)
+            return
+        yield from self._emit_verified(result)
+
+    def _emit_verified(self, result):
+        yield self._record(result)
+        if self.dedup is not None:
+            for duplicate in self.dedup.resolve(result):
+                yield self._record(duplicate)
+
+    def _record(self, result):
+        if not result.get('dedup_of'):
+            self.scheduler.finished(result['file_path'])
+        self.processed_count += 1
+        self.bytes_processed += result.get('file_size', 0)
+        if not result.get('cached'):
+            if not result.get('dedup_of'):
+                self.ranker.record(result['file_path'], result.get('password_index'))
+            if self.cache is not None:
+                self.cache.store(result)
+        if self.journal is not None:
+            if result.get('output_archive'):
+                self._archived_results.append(result)
+            else:
+                self.journal.record(result)
+        return result
+
+    @property
+    def elapsed(self):
+        if self.start_time is None:
+            return 0.0
+        end = self.end_time if self.end_time is not None else time.perf_counter()
+        return end - self.start_time
+
+    @property
+    def files_per_second(self):
+        elapsed = self.elapsed
+        return self.processed_count / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def total_bytes(self):
+        return self.scheduler.total_bytes if self.scheduler is not None else 0
+
+    @property
+    def eta_seconds(self):
+        """按已处理字节数的速度估算剩余时间，无法估算时返回 None"""
+        elapsed = self.elapsed
+        if not self.bytes_processed or elapsed <= 0:
+            return None
+        remaining = max(0, self.total_bytes - self.bytes_processed)
+        return remaining / (self.bytes_processed / elapsed)
+
+    @property
+    def megabytes_per_second(self):
+        elapsed = self.elapsed
+        return self.bytes_processed / 1024 / 1024 / elapsed if elapsed > 0 else 0.0
+
+    def stop(self):
+        self._is_running = False
+        if self._feed is not None:
+            self._feed.close()
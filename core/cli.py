@@ -0,0 +1,437 @@
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import threading
+from pathlib import Path
+from core.api import create_batch
+from core.pdf_utils import unique_passwords, SAVE_PROFILES, DEFAULT_SAVE_PROFILE
+from core.batch import FileFeed, default_worker_count
+from core.report import ResultCollector, REPORT_FORMATS
+from core.result_cache import CACHE_FILENAME
+from core.job_journal import JobJournal, JOURNAL_FILENAME, open_job_journal
+from core.pdf_io import (INPUT_MODES, DEFAULT_INPUT_MODE, ARCHIVE_OUTPUTS, DEFAULT_ARCHIVE_OUTPUT,
+                         DEFAULT_PIPELINE_MEMORY)
+from core.scheduler import SCHEDULE_ORDERS, DEFAULT_SCHEDULE_ORDER
+from core.watcher import FolderWatcher, RollingSummary
+from core.profiling import Profiler, PROFILE_STATS_FILENAME, PROFILE_REPORT_FILENAME
+from core.verifier import parse_verify_spec, VERIFY_ALL
+from utils.file_utils import collect_pdf_files, load_password_file
+
+PASSWORD_TYPES = {
+    'user': "打开密码",
+    'owner': "只读密码锁（权限密码）",
+    'both': "两种密码都尝试",
+}
+
+EXIT_OK = 0
+EXIT_FAILURES = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+DEFAULT_SERVICE_PORT = 8765
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m core",
+        description="批量移除PDF打开密码和权限密码（命令行模式，不依赖Qt）"
+    )
+    parser.add_argument("inputs", nargs="*", help="PDF文件或包含PDF的文件夹")
+    parser.add_argument("-p", "--password",
+                        help="PDF密码，未指定时读取环境变量 PDF_PASSWORD")
+    parser.add_argument("--password-file",
+                        help="候选密码文件（每行一个），按本次运行的命中率排序尝试")
+    parser.add_argument("-o", "--output-dir",
+                        help="输出文件夹，默认为第一个输入所在位置下的 Unlocked_PDFs")
+    parser.add_argument("--prefix", default="unlocked_", help="输出文件名前缀")
+    parser.add_argument("--password-type", choices=sorted(PASSWORD_TYPES), default="user",
+                        help="密码类型: user=打开密码, owner=权限密码, both=两种都尝试")
+    parser.add_argument("--no-skip-unencrypted", dest="skip_unencrypted",
+                        action="store_false", help="复制无密码文件而不是跳过")
+    parser.add_argument("--preserve-restrictions", action="store_true",
+                        help="保留原始权限设置（去掉打开密码，保留打印、复制等限制）")
+    parser.add_argument("--save-profile", choices=list(SAVE_PROFILES), default=DEFAULT_SAVE_PROFILE,
+                        help="输出保存方式: standard=标准, fast=数据流原样写出不重新压缩, "
+                             "compact=对象流并重新压缩以减小体积, linearized=网页优化（线性化）")
+    parser.add_argument("--input-mode", choices=INPUT_MODES, default=DEFAULT_INPUT_MODE,
+                        help="读取方式: direct=直接打开, mmap=内存映射, buffer=整块读入内存（适合SMB/NFS网络盘）")
+    parser.add_argument("--write-behind", type=int, nargs="?", const=8, default=0, metavar="N",
+                        help="在后台线程写出输出文件，最多缓存 N 个待写文件（默认 8），网络盘写入较慢时使用")
+    parser.add_argument("--read-ahead", type=int, nargs="?", const=2, default=0, metavar="N",
+                        help="单进程处理时在后台线程预读后续 N 个文件（默认 2），解密当前文件时同时读取下一个文件")
+    parser.add_argument("--pipeline-memory", type=int, default=DEFAULT_PIPELINE_MEMORY // 1024 // 1024,
+                        metavar="MB", help="预读和后台写出队列合计缓冲的数据上限（MB）")
+    parser.add_argument("--verify", nargs="?", const=VERIFY_ALL, default=None, metavar="SAMPLE",
+                        help="保存后在后台重新打开输出，检查能否不用密码打开、页数一致且不再带有 /Encrypt，"
+                             "未通过的文件记录为 verify_failed；SAMPLE 为 all（默认）、N（每 N 个抽查 1 个）"
+                             "或百分比如 10%%")
+    parser.add_argument("--order", choices=SCHEDULE_ORDERS, default=DEFAULT_SCHEDULE_ORDER,
+                        help="处理顺序: input=按输入顺序, largest_first=大文件优先（总用时最短）, "
+                             "smallest_first=小文件优先（尽快看到结果）")
+    parser.add_argument("--memory-budget", type=int, default=0, metavar="MB",
+                        help="同时处理的文件估算内存上限（MB），0 表示不限制")
+    parser.add_argument("--timeout", type=float, default=0, metavar="SECONDS",
+                        help="单个文件的处理时间上限（秒），超时的文件被终止并记录为 timeout，0 表示不限制")
+    parser.add_argument("--memory-limit", type=int, default=0, metavar="MB",
+                        help="单个工作进程的内存上限（MB，仅 Linux），超出时终止并记录为 resource_limit")
+    parser.add_argument("--archives", action="store_true",
+                        help="把ZIP压缩包视为文件夹，直接在内存中处理其中的PDF，不解压到磁盘")
+    parser.add_argument("--archive-output", choices=ARCHIVE_OUTPUTS, default=DEFAULT_ARCHIVE_OUTPUT,
+                        help="压缩包中PDF的输出位置: zip=输出目录中对应的 <前缀><压缩包名>.zip, "
+                             "folder=以压缩包命名的文件夹")
+    parser.add_argument("--no-sniff", dest="sniff", action="store_false",
+                        help="不预先读取文件尾部快速分类，每个文件都用 pikepdf 完整打开")
+    parser.add_argument("--no-key-cache", dest="key_cache", action="store_false",
+                        help="不按加密字典指纹复用密码校验结果，每个文件都重新校验候选密码")
+    parser.add_argument("--inventory", action="store_true",
+                        help="只统计加密情况：读取每个文件的尾部判断是否加密、密码类型和加密算法，"
+                             "不需要密码，不写出任何文件")
+    parser.add_argument("--dedup", action="store_true",
+                        help="内容相同的文件只解密一次，其余副本的输出通过 reflink/硬链接/复制生成")
+    parser.add_argument("--watch", action="store_true",
+                        help="持续监视输入文件夹，处理新放入或修改的PDF；"
+                             "Ctrl+C 或 SIGTERM 时停止监视，处理完已排队的文件后退出")
+    parser.add_argument("--settle", type=float, default=2.0, metavar="SECONDS",
+                        help="监视模式下文件大小和修改时间保持不变多少秒后才开始处理（默认 2）")
+    parser.add_argument("--poll", action="store_true",
+                        help="监视模式下定期扫描而不使用 inotify（SMB/NFS 等网络盘上的远程写入不会产生 inotify 事件）")
+    parser.add_argument("--poll-interval", type=float, default=2.0, metavar="SECONDS",
+                        help="定期扫描的间隔（秒，默认 2）")
+    parser.add_argument("--summary-interval", type=float, default=300, metavar="SECONDS",
+                        help="监视模式下重新生成清单的间隔（秒，默认 300），0 表示只在退出时生成")
+    parser.add_argument("--serve", action="store_true",
+                        help="以本地 HTTP 服务方式运行，供其他程序提交文件并取回解密结果")
+    parser.add_argument("--host", default="127.0.0.1", help="服务监听地址（默认只监听本机 127.0.0.1）")
+    parser.add_argument("--port", type=int, default=DEFAULT_SERVICE_PORT, help=f"服务端口（默认 {DEFAULT_SERVICE_PORT}）")
+    parser.add_argument("--max-queue", type=int, default=16,
+                        help="服务最多排队的任务数，正在处理和排队的任务都满时返回 429（默认 16）")
+    parser.add_argument("--work-dir",
+                        help="服务保存上传文件和输出文件的目录（默认使用临时目录，退出时删除）")
+    parser.add_argument("--job-ttl", type=float, default=3600, metavar="SECONDS",
+                        help="已完成任务及其文件的保留时间（秒，默认 3600）")
+    parser.add_argument("--allow-local-paths", action="store_true",
+                        help="服务除上传的文件外还接受本机文件路径（服务没有身份验证，只能与本机监听地址一起使用）")
+    parser.add_argument("--no-summary", dest="generate_summary", action="store_false",
+                        help="不生成已解锁文件清单")
+    parser.add_argument("--no-subfolders", dest="include_subfolders", action="store_false",
+                        help="扫描文件夹时不包含子文件夹")
+    parser.add_argument("-j", "--workers", type=int, default=default_worker_count(),
+                        help="并行进程数（默认: CPU核心数）")
+    parser.add_argument("--cache", action="store_true",
+                        help=f"增量处理：在输出目录的 {CACHE_FILENAME} 中记录结果，跳过未变化的已处理文件")
+    parser.add_argument("--cache-hash", action="store_true",
+                        help="除大小和修改时间外还校验文件内容哈希")
+    parser.add_argument("--cache-max-entries", type=int, default=200000,
+                        help="缓存最多保留的记录数，超出时淘汰最久未使用的记录")
+    parser.add_argument("--force", action="store_true",
+                        help="忽略缓存中的记录，重新处理所有文件")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"根据输出目录中的任务日志 {JOURNAL_FILENAME} 继续上次中断的任务（需指定 -o）")
+    parser.add_argument("--report", action="append", choices=REPORT_FORMATS,
+                        help="处理过程中逐条写出的机器可读结果格式，可重复指定（默认: jsonl 和 csv）")
+    parser.add_argument("--no-report", action="store_true", help="不生成机器可读结果文件")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"用 cProfile 分析主进程，结果写入输出目录的 {PROFILE_STATS_FILENAME} 和 {PROFILE_REPORT_FILENAME}")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help=f"用 tracemalloc 记录内存分配，结果写入 {PROFILE_REPORT_FILENAME}")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="不输出逐个文件的进度，只输出最终统计")
+    return parser
+
+
+def default_output_dir(first_input):
+    base = Path(first_input)
+    if not base.is_dir():
+        base = base.parent
+    return base / "Unlocked_PDFs"
+
+
+def apply_job_settings(args, settings):
+    """恢复任务时沿用任务日志中记录的输出相关设置"""
+    args.prefix = settings.get('prefix', args.prefix)
+    args.skip_unencrypted = settings.get('skip_unencrypted', args.skip_unencrypted)
+    args.preserve_restrictions = settings.get('preserve_restrictions', args.preserve_restrictions)
+    args.save_profile = settings.get('save_profile', args.save_profile)
+    args.archive_output = settings.get('archive_output', args.archive_output)
+    for key, value in PASSWORD_TYPES.items():
+        if value == settings.get('password_type'):
+            args.password_type = key
+
+
+def start_watching(watcher, feed):
+    """在后台线程监视文件夹；第一次 Ctrl+C 或 SIGTERM 停止监视并处理完已排队的文件，再按 Ctrl+C 立即停止"""
+    def shutdown(signum, frame):
+        watcher.stop()
+        feed.close()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    signal.signal(signal.SIGINT, shutdown)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, shutdown)
+    thread = threading.Thread(target=watcher.run, args=(feed.add,), name="folder-watcher", daemon=True)
+    thread.start()
+    return thread
+
+
+def serve(args, passwords):
+    # HTTP服务只在 --serve 时用到，不拖慢普通命令行的启动
+    from core.server import UnlockService, UnlockServer
+    service = UnlockService(args.work_dir, args.workers, args.max_queue, passwords,
+                            save_profile=args.save_profile, input_mode=args.input_mode,
+                            allow_local_paths=args.allow_local_paths, job_ttl=args.job_ttl)
+    try:
+        server = UnlockServer((args.host, args.port), service, quiet=args.quiet)
+    except (OSError, ValueError) as e:
+        service.close()
+        print(f"无法监听 {args.host}:{args.port}: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    host, port = server.server_address[:2]
+    emit("serve", url=f"http://{host}:{port}", workers=service.workers, max_queue=service.max_queue,
+         work_dir=service.work_dir)
+
+    def shutdown(signum, frame):
+        # shutdown() 会等待 serve_forever 返回，不能在同一线程中直接调用
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, shutdown)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    emit("summary", **service.metrics())
+    return EXIT_OK
+
+
+def run_inventory(args):
+    from core.pdf_sniff import inventory, InventoryStats
+
+    file_paths = collect_pdf_files(args.inputs, args.include_subfolders, args.archives)
+    stats = InventoryStats()
+    emit("start", total=len(file_paths), inventory=True, workers=args.workers)
+    start = time.perf_counter()
+    interrupted = False
+    try:
+        for i, (file_path, result) in enumerate(inventory(file_paths, args.workers), 1):
+            stats.add(result)
+            if not args.quiet:
+                emit("file", index=i, total=len(file_paths), file=file_path, **result)
+    except KeyboardInterrupt:
+        interrupted = True
+    elapsed = time.perf_counter() - start
+    emit("summary", **stats.as_dict(), elapsed=round(elapsed, 3),
+         files_per_second=round(stats.total / elapsed, 2) if elapsed else 0.0, interrupted=interrupted)
+    return EXIT_INTERRUPTED if interrupted else EXIT_OK
+
+
+def emit(event, **fields):
+    print(json.dumps(dict(event=event, **fields), ensure_ascii=False), flush=True)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    password = args.password if args.password is not None else os.environ.get("PDF_PASSWORD")
+    passwords = [password] if password else []
+    if args.password_file:
+        try:
+            passwords += load_password_file(args.password_file)
+        except OSError as e:
+            parser.error(f"无法读取密码文件: {e}")
+    passwords = unique_passwords(passwords)
+    if args.serve:
+        if args.workers < 1 or args.max_queue < 0 or not 0 <= args.port <= 65535:
+            parser.error("--workers 必须大于等于 1，--max-queue 必须大于等于 0，--port 必须在 0-65535 之间")
+        # 服务模式的密码随每个任务提交，命令行中的密码作为所有任务的备选密码
+        return serve(args, passwords)
+    if args.inventory:
+        if not args.inputs:
+            parser.error("请指定要统计的PDF文件或文件夹")
+        if args.workers < 1:
+            parser.error("--workers 必须大于等于 1")
+        return run_inventory(args)
+    if not passwords:
+        parser.error("请通过 --password、--password-file 或环境变量 PDF_PASSWORD 提供PDF密码")
+    if args.workers < 1:
+        parser.error("--workers 必须大于等于 1")
+    if args.write_behind < 0 or args.read_ahead < 0:
+        parser.error("--write-behind 和 --read-ahead 必须大于等于 0")
+    if args.pipeline_memory < 1:
+        parser.error("--pipeline-memory 必须大于等于 1")
+    if args.verify is not None:
+        try:
+            parse_verify_spec(args.verify)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.memory_budget < 0:
+        parser.error("--memory-budget 必须大于等于 0")
+    if args.timeout < 0 or args.memory_limit < 0:
+        parser.error("--timeout 和 --memory-limit 必须大于等于 0")
+    if args.memory_limit:
+        from core.supervisor import MEMORY_LIMIT_SUPPORTED
+        if not MEMORY_LIMIT_SUPPORTED:
+            parser.error("--memory-limit 目前仅在 Linux 上可用")
+    if args.settle < 0 or args.poll_interval <= 0 or args.summary_interval < 0:
+        parser.error("--settle、--summary-interval 必须大于等于 0，--poll-interval 必须大于 0")
+    if args.watch and args.resume:
+        parser.error("--watch 不能与 --resume 同时使用")
+
+    resume_state = None
+    if args.resume:
+        if not args.output_dir:
+            parser.error("--resume 需要通过 -o 指定上次任务的输出目录")
+        output_dir = Path(args.output_dir)
+        if not JobJournal.exists(output_dir):
+            parser.error(f"输出目录中没有可恢复的任务: {output_dir}")
+        resume_state = JobJournal.load(output_dir)
+        apply_job_settings(args, resume_state.settings)
+        file_paths = resume_state.pending_files
+    else:
+        if not args.inputs:
+            parser.error("请指定要处理的PDF文件或文件夹")
+        missing = [path for path in args.inputs if not os.path.exists(path)]
+        if missing:
+            parser.error(f"输入路径不存在: {', '.join(missing)}")
+        if args.watch and not all(os.path.isdir(path) for path in args.inputs):
+            parser.error("--watch 的输入必须是文件夹")
+        output_dir = Path(args.output_dir) if args.output_dir else default_output_dir(args.inputs[0])
+        file_paths = None
+
+    try:
+        output_dir.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        print(f"无法创建输出目录: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    watcher = None
+    if args.watch:
+        # 默认输出目录位于输入文件夹中，不能监视输出文件
+        watcher = FolderWatcher(args.inputs, args.include_subfolders, exclude=[output_dir],
+                                settle_time=args.settle, poll_interval=args.poll_interval,
+                                use_inotify=not args.poll)
+        file_paths = []
+    elif file_paths is None:
+        file_paths = collect_pdf_files(args.inputs, args.include_subfolders, args.archives)
+    password_type = PASSWORD_TYPES[args.password_type]
+    batch = create_batch(passwords, output_dir, args.prefix, args.workers, use_cache=args.cache,
+                         force=args.force, cache_hash=args.cache_hash,
+                         cache_max_entries=args.cache_max_entries, write_queue_size=args.write_behind,
+                         order=args.order, memory_budget=args.memory_budget * 1024 * 1024,
+                         file_timeout=args.timeout, memory_limit=args.memory_limit * 1024 * 1024,
+                         dedup=args.dedup, read_ahead=args.read_ahead,
+                         pipeline_memory=args.pipeline_memory * 1024 * 1024, verify=args.verify,
+                         skip_unencrypted=args.skip_unencrypted,
+                         password_type=password_type, preserve_restrictions=args.preserve_restrictions,
+                         save_profile=args.save_profile, input_mode=args.input_mode,
+                         archive_output=args.archive_output, sniff=args.sniff, key_cache=args.key_cache)
+
+    feed = FileFeed(file_paths, closed=watcher is None)
+    report_formats = () if args.no_report else tuple(args.report or REPORT_FORMATS)
+    try:
+        collector = ResultCollector(output_dir, password_type, batch, args.generate_summary,
+                                    report_formats, resume=resume_state is not None)
+        if watcher is None:
+            # 监视模式不记录任务日志，重新启动后由扫描和增量缓存跳过已处理的文件
+            batch.journal = open_job_journal(output_dir, feed, batch.unlocker.job_settings(),
+                                             resume=resume_state is not None)
+    except OSError as e:
+        print(f"无法写入结果文件: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    if resume_state:
+        for result in resume_state.iter_results():
+            collector.replay(result)
+
+    emit("start", total=len(file_paths), output_dir=str(output_dir), workers=batch.workers,
+         save_profile=args.save_profile,
+         resumed=collector.stats.total,
+         watch=[str(Path(path).resolve()) for path in args.inputs] if watcher else None)
+
+    resumed = collector.stats.total
+    rolling = RollingSummary(collector, args.summary_interval if watcher else 0)
+    profiler = Profiler(output_dir, cpu=args.profile, memory=args.trace_memory)
+    if profiler.enabled:
+        profiler.start()
+    interrupted = False
+    watch_thread = None
+    if watcher is not None:
+        watch_thread = start_watching(watcher, feed)
+        rolling.start()
+    try:
+        for i, result in enumerate(batch.run(feed), 1):
+            rolling.add(result)
+            if watcher is not None:
+                watcher.done(result['file_path'])
+            if result['error']:
+                print(result['error'], file=sys.stderr)
+            if not args.quiet:
+                emit("file", index=i, total=feed.total,
+                     file=result['file_path'], status=result['status'], success=result['success'],
+                     message=result['message'], output_file=result['output_file'],
+                     password_index=result['password_index'], attempts=result['attempts'],
+                     key_cache=result.get('key_cache'),
+                     cached=bool(result.get('cached')), dedup_of=result.get('dedup_of'),
+                     verified=result.get('verified'),
+                     duration=round(result['duration'], 4),
+                     open_time=round(result.get('open_time', 0.0), 4),
+                     save_time=round(result.get('save_time', 0.0), 4),
+                     copy_time=round(result.get('copy_time', 0.0), 4),
+                     bytes_written=result.get('bytes_written', 0),
+                     files_per_second=round(batch.files_per_second, 2),
+                     bytes_done=batch.bytes_processed, bytes_total=batch.total_bytes,
+                     eta_seconds=round(batch.eta_seconds, 1) if batch.eta_seconds is not None else None)
+    except KeyboardInterrupt:
+        batch.stop()
+        interrupted = True
+    if watcher is not None:
+        watcher.stop()
+        watch_thread.join()
+        rolling.stop()
+
+    profile_files = []
+    if profiler.enabled:
+        try:
+            profile_files = profiler.stop()
+        except OSError as e:
+            print(f"无法写入性能分析结果: {e}", file=sys.stderr)
+
+    summary_file = None
+    try:
+        summary_file = collector.finish()
+    except Exception as e:
+        print(f"生成清单文件时出错: {str(e)}", file=sys.stderr)
+
+    stats = collector.stats
+    emit("summary", job_total=resumed + feed.total, **stats.as_dict(),
+         elapsed=round(batch.elapsed, 3), files_per_second=round(batch.files_per_second, 2),
+         megabytes_per_second=round(batch.megabytes_per_second, 2),
+         slowest=[{'file': path, 'duration': round(duration, 4)} for duration, path in stats.slowest],
+         password_hits=batch.ranker.hits,
+         cache_hits=batch.cache.hits if batch.cache else None,
+         cache_misses=batch.cache.misses if batch.cache else None,
+         dedup={'duplicates': batch.dedup.duplicate_count, 'saved_bytes': batch.dedup.saved_bytes,
+                'links': batch.dedup.link_counts} if batch.dedup else None,
+         io={'read_seconds': round(stats.stage_times['read'], 3),
+             'write_seconds': round(batch.writer.write_time if batch.writer else stats.stage_times['write'], 3),
+             'write_wait_seconds': round(batch.writer.wait_time, 3) if batch.writer else 0.0,
+             'bytes_read': stats.bytes_in, 'bytes_written': stats.bytes_out},
+         pipeline=batch.pipeline_status(),
+         verify={'sample': args.verify, 'verified': batch.verifier.verified, 'failed': batch.verifier.failed,
+                 'verify_seconds': round(batch.verifier.verify_time, 3),
+                 'wait_seconds': round(batch.verifier.wait_time, 3)} if batch.verifier else None,
+         summary_file=summary_file, reports={k: str(v) for k, v in
+                                             (collector.report.paths.items() if collector.report else ())},
+         profile_files=profile_files, watch_backend=watcher.backend if watcher else None,
+         interrupted=interrupted)
+
+    if interrupted:
+        return EXIT_INTERRUPTED
+    return EXIT_FAILURES if stats.failed else EXIT_OK
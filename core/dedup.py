@@ -0,0 +1,97 @@
+import os
+from core.pdf_utils import build_result, STATUS_ERROR
+from core.pdf_io import link_or_copy
+from utils.file_utils import file_digest
+
+
+class Deduplicator:
+    """按内容去重：内容相同的文件只处理一次，其余副本的输出通过 reflink/硬链接/复制生成
+
+    只有大小与其他文件相同的文件才需要计算内容哈希，大小唯一的文件直接处理。
+    已处理文件只保留生成副本结果所需的几个字段。
+    """
+
+    KEPT_FIELDS = ('file_path', 'status', 'message', 'output_file', 'error', 'encrypted',
+                   'password_index', 'file_size', 'bytes_written')
+
+    def __init__(self, output_dir, prefix):
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.duplicate_count = 0
+        self.saved_bytes = 0
+        self.link_counts = {}
+        self._by_size = {}
+        self._digests = {}
+        self._primaries = {}
+        self._results = {}
+        self._waiting = {}
+
+    def check(self, file_path, size):
+        """登记待处理的文件
+
+        返回 None 表示需要正常处理；内容与已处理完的文件相同时返回副本结果；
+        与正在处理的文件相同时返回 False，副本结果在原文件完成后由 resolve() 产出。
+        """
+        same_size = self._by_size.setdefault(size, [])
+        same_size.append(file_path)
+        if len(same_size) == 1:
+            return None
+
+        # 出现第一个同样大小的文件时才补算之前那个文件的哈希
+        for earlier in same_size[:-1]:
+            if earlier not in self._digests:
+                self._register(earlier, self._digest(earlier))
+        digest = self._digest(file_path)
+        self._register(file_path, digest)
+        primary = self._primaries.get(digest) if digest is not None else None
+        if primary is None or primary == file_path:
+            return None
+
+        if primary in self._results:
+            return self.duplicate_result(file_path, self._results[primary])
+        self._waiting.setdefault(primary, []).append(file_path)
+        return False
+
+    def resolve(self, result):
+        """原文件处理完成后，返回等待它的副本的结果"""
+        file_path = result['file_path']
+        if result.get('dedup_of'):
+            return []
+        self._results[file_path] = {field: result.get(field) for field in self.KEPT_FIELDS}
+        return [self.duplicate_result(waiting, result) for waiting in self._waiting.pop(file_path, [])]
+
+    def duplicate_result(self, file_path, primary):
+        filename = os.path.basename(file_path)
+        output_file = primary['output_file']
+        link = None
+        message = f"{primary['message']}（内容重复）"
+        if output_file != "未生成":
+            target = f"{self.prefix}{filename}"
+            if target != output_file:
+                try:
+                    link = link_or_copy(os.path.join(self.output_dir, output_file),
+                                        os.path.join(self.output_dir, target))
+                except OSError as e:
+                    return build_result(file_path, STATUS_ERROR, f"生成副本输出失败: {str(e)}",
+                                        error=f"生成 {filename} 的输出时出错: {str(e)}",
+                                        dedup_of=primary['file_path'])
+                self.link_counts[link] = self.link_counts.get(link, 0) + 1
+                output_file = target
+
+        self.duplicate_count += 1
+        self.saved_bytes += primary.get('file_size', 0)
+        return build_result(file_path, primary['status'], message, output_file, error=primary['error'],
+                            encrypted=primary.get('encrypted'), password_index=primary.get('password_index'),
+                            bytes_written=primary.get('bytes_written', 0) if link else 0,
+                            dedup_of=primary['file_path'], dedup_link=link)
+
+    def _register(self, file_path, digest):
+        self._digests[file_path] = digest
+        if digest is not None:
+            self._primaries.setdefault(digest, file_path)
+
+    def _digest(self, file_path):
+        try:
+            return file_digest(file_path)
+        except OSError:
+            return None
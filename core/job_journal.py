@@ -0,0 +1,131 @@
+import os
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+
+JOURNAL_FILENAME = ".unlock_job.jsonl"
+
+
+class JobState:
+    """从任务日志重放得到的任务状态，已完成的结果记录按需从日志中重新读取"""
+
+    def __init__(self, path, settings, input_files, completed, finished):
+        self.path = path
+        self.settings = settings
+        self.input_files = input_files
+        self.completed = completed
+        self.finished = finished
+
+    @property
+    def pending_files(self):
+        return [path for path in self.input_files if path not in self.completed]
+
+    def iter_results(self):
+        seen = set()
+        for entry_type, entry in read_journal(self.path):
+            if entry_type == 'result' and entry['file_path'] not in seen:
+                seen.add(entry['file_path'])
+                yield entry
+
+
+def read_journal(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # 程序崩溃时最后一行可能只写了一半
+                continue
+            yield entry.pop('type', None), entry
+
+
+class JobJournal:
+    """只追加的任务日志，每处理完一个文件立即写入，用于中断后恢复任务"""
+
+    FSYNC_INTERVAL = 100
+
+    def __init__(self, output_dir):
+        self.path = Path(output_dir) / JOURNAL_FILENAME
+        self._file = None
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self.resumed = False
+
+    def start(self, file_paths, settings):
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self.write({'type': 'job', 'created': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    'settings': settings})
+        self.add_inputs(file_paths)
+
+    def resume(self):
+        self.resumed = True
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self.write({'type': 'resume', 'created': datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
+
+    def add_inputs(self, file_paths, chunk_size=1000):
+        file_paths = list(file_paths)
+        for i in range(0, len(file_paths), chunk_size):
+            self.write({'type': 'inputs', 'files': file_paths[i:i + chunk_size]})
+
+    def record(self, result):
+        self.write(dict(result, type='result'))
+
+    def finish(self):
+        self.write({'type': 'finished'})
+
+    def write(self, entry):
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line)
+            self._file.flush()
+            self._unsynced += 1
+            if self._unsynced >= self.FSYNC_INTERVAL:
+                os.fsync(self._file.fileno())
+                self._unsynced = 0
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+
+    @staticmethod
+    def exists(output_dir):
+        return (Path(output_dir) / JOURNAL_FILENAME).exists()
+
+    @staticmethod
+    def load(output_dir):
+        path = Path(output_dir) / JOURNAL_FILENAME
+        settings = {}
+        input_files = {}
+        completed = set()
+        finished = False
+        for entry_type, entry in read_journal(path):
+            if entry_type == 'job':
+                settings = entry.get('settings', {})
+            elif entry_type == 'inputs':
+                input_files.update(dict.fromkeys(entry['files']))
+            elif entry_type == 'result':
+                completed.add(entry['file_path'])
+            elif entry_type == 'finished':
+                finished = True
+            elif entry_type == 'resume':
+                finished = False
+        return JobState(path, settings, list(input_files), completed, finished)
+
+
+def open_job_journal(output_dir, feed, settings, resume=False):
+    """开始新任务日志或在已有日志后追加，之后追加到队列的文件也会记录为任务输入"""
+    journal = JobJournal(output_dir)
+    if resume:
+        journal.resume()
+        journal.add_inputs(feed.snapshot())
+    else:
+        journal.start(feed.snapshot(), settings)
+    feed.on_add = journal.add_inputs
+    return journal
@@ -0,0 +1,68 @@
+class KeyCache:
+    """按加密字典指纹记住密码校验结果
+
+    同一生成器产生的文件常常共用完全相同的 /Encrypt（/O、/U、/R、/V、/P，R4 及以下还有 /ID），
+    同一密码对这些文件的校验结果也相同，因此按指纹记住：
+    能否用空密码打开（快速分类的结果）、哪个候选密码正确、哪些候选密码错误。
+    再遇到相同指纹时空密码不再校验，正确的密码直接使用，错误的密码不再尝试。
+    指纹第一次出现时先用加密字典在 Python 中校验候选密码，只把正确的密码交给 pikepdf 完整打开；
+    非 ASCII 密码的编码方式由 qpdf 决定，仍交给 pikepdf 尝试。
+    Python 校验为错误的密码在报告密码错误前还会交给 pikepdf 再试一次，两者结果不一致时以 pikepdf 为准。
+    每个进程各有一份缓存，多进程时各工作进程分别积累。
+    """
+
+    MAX_ENTRIES = 4096
+
+    def __init__(self, passwords, max_entries=MAX_ENTRIES):
+        self.passwords = passwords
+        self.max_entries = max_entries
+        # 指纹 -> 快速分类结果，传给 sniff_source 的 known_kinds
+        self.kinds = {}
+        # 指纹 -> [正确密码的序号或 None, 已知错误的序号集合]
+        self._passwords = {}
+
+    def remember(self, fingerprint, kind):
+        """登记快速分类的结果，返回 "hit"（指纹已出现过）或 "miss" """
+        if fingerprint in self.kinds:
+            return "hit"
+        self.kinds[fingerprint] = kind
+        if len(self.kinds) > self.max_entries:
+            oldest = next(iter(self.kinds))
+            del self.kinds[oldest]
+            self._passwords.pop(oldest, None)
+        return "miss"
+
+    def candidates(self, fingerprint, password_order, password_check=None):
+        """返回 (需要依次用 pikepdf 打开的密码序号, 在 Python 中校验为错误的密码序号)"""
+        good, failed = entry = self._passwords.setdefault(fingerprint, [None, set()])
+        if good is not None:
+            return [good] + [i for i in password_order if i != good and i not in failed], []
+
+        rejected = []
+        undecided = []
+        for index in password_order:
+            if index in failed:
+                continue
+            password = self.passwords[index]
+            if password_check is None or not password.isascii():
+                undecided.append(index)
+                continue
+            if password_check.matches(password.encode()):
+                entry[0] = index
+                # pikepdf 仍可能拒绝该密码，之后的候选密码保留在后面，只去掉已校验为错误的
+                return [index] + [i for i in password_order if i != index and i not in failed], rejected
+            rejected.append(index)
+            failed.add(index)
+        return undecided, rejected
+
+    def record(self, fingerprint, index, opened):
+        entry = self._passwords.get(fingerprint)
+        if entry is None:
+            return
+        if opened:
+            entry[0] = index
+            entry[1].discard(index)
+        else:
+            entry[1].add(index)
+            if entry[0] == index:
+                entry[0] = None
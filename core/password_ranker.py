@@ -0,0 +1,25 @@
+import os
+
+
+class PasswordRanker:
+    """根据本次运行中各候选密码的命中情况动态调整尝试顺序"""
+
+    def __init__(self, candidate_count):
+        self.candidate_count = candidate_count
+        self.hits = [0] * candidate_count
+        self.directory_winners = {}
+
+    def order_for(self, file_path):
+        # 同一文件夹的文件通常来自同一部门，优先尝试该文件夹上次成功的密码
+        order = sorted(range(self.candidate_count), key=lambda i: (-self.hits[i], i))
+        winner = self.directory_winners.get(os.path.dirname(file_path))
+        if winner is not None:
+            order.remove(winner)
+            order.insert(0, winner)
+        return order
+
+    def record(self, file_path, password_index):
+        if password_index is None:
+            return
+        self.hits[password_index] += 1
+        self.directory_winners[os.path.dirname(file_path)] = password_index
@@ -0,0 +1,615 @@
+import io
+import os
+import sys
+import mmap
+import time
+import shutil
+import zlib
+import zipfile
+import threading
+from collections import deque
+from contextlib import contextmanager
+from utils.file_utils import split_archive_path
+
+INPUT_MODES = ("direct", "mmap", "buffer")
+INPUT_MODE_LABELS = {
+    'direct': "直接打开文件",
+    'mmap': "内存映射",
+    'buffer': "整块读入内存",
+}
+DEFAULT_INPUT_MODE = "direct"
+PARTIAL_SUFFIX = ".partial"
+# 超过该时间（秒）未修改的临时输出文件视为中断时的残留
+PARTIAL_MAX_AGE = 3600
+
+ARCHIVE_OUTPUTS = ("zip", "folder")
+ARCHIVE_OUTPUT_LABELS = {
+    'zip': "写入对应的输出ZIP",
+    'folder': "写入以压缩包命名的文件夹",
+}
+DEFAULT_ARCHIVE_OUTPUT = "zip"
+# 压缩包成员整块读入内存处理，超过该大小的成员不处理
+MAX_MEMBER_SIZE = 1024 * 1024 * 1024
+# 预读和后台写出队列共用的缓冲字节上限
+DEFAULT_PIPELINE_MEMORY = 256 * 1024 * 1024
+MAX_OPEN_ARCHIVES = 4
+
+_open_archives = {}
+_open_archives_lock = threading.Lock()
+
+
+class _OpenArchive:
+    def __init__(self, archive_path):
+        self.zip = zipfile.ZipFile(archive_path)
+        self.lock = threading.Lock()
+        self.users = 0
+        self.evicted = False
+
+
+@contextmanager
+def open_archive(archive_path):
+    """打开ZIP压缩包；最近使用的几个保持打开，避免每个成员都重新读取中央目录
+
+    预读线程、服务的工作线程和主线程共用这些打开的压缩包：同一压缩包同一时间只有一个线程读取，
+    被挤出的压缩包等最后一个使用者用完后才关闭。
+    """
+    stat = os.stat(archive_path)
+    key = (archive_path, stat.st_size, stat.st_mtime_ns)
+    with _open_archives_lock:
+        archive = _open_archives.pop(key, None)
+        if archive is None:
+            archive = _OpenArchive(archive_path)
+            if len(_open_archives) >= MAX_OPEN_ARCHIVES:
+                oldest = _open_archives.pop(next(iter(_open_archives)))
+                oldest.evicted = True
+                if not oldest.users:
+                    oldest.zip.close()
+        _open_archives[key] = archive
+        archive.users += 1
+    try:
+        with archive.lock:
+            yield archive.zip
+    finally:
+        with _open_archives_lock:
+            archive.users -= 1
+            if archive.evicted and not archive.users:
+                archive.zip.close()
+
+
+def read_member(archive_path, member_name):
+    with open_archive(archive_path) as archive:
+        info = archive.getinfo(member_name)
+        if info.file_size > MAX_MEMBER_SIZE:
+            raise ValueError(f"压缩包成员过大（{info.file_size} 字节），超过 {MAX_MEMBER_SIZE} 字节的上限")
+        with archive.open(info) as member:
+            return member.read()
+
+
+def read_input(file_path):
+    """把输入文件整块读入内存；压缩包成员直接解压"""
+    member = split_archive_path(file_path)
+    if member is not None:
+        return read_member(*member)
+    with open(file_path, 'rb') as f:
+        return f.read()
+
+
+def input_size(file_path):
+    """输入文件大小；压缩包成员为解压后的大小"""
+    member = split_archive_path(file_path)
+    try:
+        if member is None:
+            return os.path.getsize(file_path)
+        with open_archive(member[0]) as archive:
+            return archive.getinfo(member[1]).file_size
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return 0
+
+
+class MappedFile(io.RawIOBase):
+    """以内存映射方式读取文件的只读流，供 pikepdf.open 使用"""
+
+    def __init__(self, file_path):
+        super().__init__()
+        self._file = open(file_path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # 空文件无法映射，交给 pikepdf 报告文件损坏
+            self._map = b""
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = max(0, min(len(buffer), len(self._map) - self._pos))
+        buffer[:count] = self._map[self._pos:self._pos + count]
+        self._pos += count
+        return count
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        else:
+            self._pos = len(self._map) + offset
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        if not self.closed:
+            if isinstance(self._map, mmap.mmap):
+                self._map.close()
+            self._file.close()
+        super().close()
+
+
+class InputSource:
+    """PDF输入：直接按路径打开、内存映射或一次性整块读入
+
+    网络文件系统上 pikepdf 按路径打开时会产生大量小块随机读取，
+    整块读入可以把它们合并为一次顺序读取，尝试多个候选密码时也只需读取一次。
+    data 为预读阶段已读入的文件内容，此时不再读取文件。
+    """
+
+    def __init__(self, file_path, mode=DEFAULT_INPUT_MODE, data=None):
+        if mode not in INPUT_MODES:
+            raise ValueError(f"未知的读取方式: {mode}")
+        self.file_path = file_path
+        self.mode = mode
+        self.read_time = 0.0
+        self.member = split_archive_path(file_path)
+        self.preloaded = data is not None
+        self._stream = None
+        start = time.perf_counter()
+        if self.preloaded:
+            self._stream = io.BytesIO(data)
+        elif self.member is not None:
+            # 压缩包成员直接解压到内存，不落盘
+            self._stream = io.BytesIO(read_member(*self.member))
+        elif mode == "mmap":
+            self._stream = MappedFile(file_path)
+        elif mode == "buffer":
+            self._stream = io.BytesIO(read_input(file_path))
+        self.read_time = time.perf_counter() - start
+
+    def open(self):
+        """返回可传给 pikepdf.open 的路径或流，每次打开都从头读取"""
+        if self._stream is None:
+            return self.file_path
+        self._stream.seek(0)
+        return self._stream
+
+    def read_bytes(self):
+        if self.member is not None or self.preloaded:
+            return self._stream.getvalue()
+        with open(self.file_path, 'rb') as f:
+            return f.read()
+
+    def copy_to(self, output_path):
+        if self.member is not None or self.preloaded:
+            atomic_write_bytes(output_path, self._stream.getvalue())
+        else:
+            atomic_copy(self.file_path, output_path)
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def partial_path(output_path):
+    output_path = os.fspath(output_path)
+    directory, name = os.path.split(output_path)
+    return os.path.join(directory, f".{name}.{os.getpid()}{PARTIAL_SUFFIX}")
+
+
+def atomic_output(output_path, write):
+    """先写入同目录下的临时文件，完成后原子替换为最终文件名
+
+    write(temp_path) 负责写出内容。中断或出错时不会留下截断的输出文件。
+    """
+    temp_path = partial_path(output_path)
+    try:
+        write(temp_path)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_bytes(output_path, data):
+    def write(temp_path):
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+    atomic_output(output_path, write)
+
+
+def atomic_copy(source_path, output_path):
+    atomic_output(output_path, lambda temp_path: shutil.copy2(source_path, temp_path))
+
+
+# Linux 上 FICLONE ioctl 的请求码，Btrfs/XFS 等文件系统支持写时复制的 reflink
+_FICLONE = 0x40049409
+
+
+def reflink(source_path, target_path):
+    if not sys.platform.startswith("linux"):
+        raise OSError("当前平台不支持 reflink")
+    import fcntl
+    with open(source_path, 'rb') as source, open(target_path, 'wb') as target:
+        fcntl.ioctl(target.fileno(), _FICLONE, source.fileno())
+
+
+def link_or_copy(source_path, target_path):
+    """以 reflink、硬链接或复制（依次尝试）生成内容相同的文件，返回实际使用的方式"""
+    for method, create in (("reflink", reflink), ("hardlink", os.link), ("copy", shutil.copyfile)):
+        try:
+            atomic_output(target_path, lambda temp_path: create(source_path, temp_path))
+            return method
+        except OSError:
+            if method == "copy":
+                raise
+    return None
+
+
+def remove_partial_files(output_dir, max_age=PARTIAL_MAX_AGE):
+    """清理上次中断时残留的临时输出文件
+
+    同一输出目录可能同时被其他任务使用（服务、监视模式或另一个命令行进程），
+    只删除超过 max_age 秒未修改的临时文件，不会删掉别人正在写的文件。
+    """
+    removed = 0
+    try:
+        entries = list(os.scandir(output_dir))
+    except OSError:
+        return 0
+    cutoff = time.time() - max_age
+    for entry in entries:
+        if entry.name.startswith(".") and entry.name.endswith(PARTIAL_SUFFIX) and entry.is_file():
+            try:
+                if entry.stat().st_mtime > cutoff:
+                    continue
+                os.remove(entry.path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+class QueueGauge:
+    """记录队列长度随时间的变化，得到平均占用和峰值"""
+
+    def __init__(self):
+        self.start = self._last = time.perf_counter()
+        self.value = 0
+        self.peak = 0
+        self._area = 0.0
+
+    def set(self, value):
+        now = time.perf_counter()
+        self._area += self.value * (now - self._last)
+        self._last = now
+        self.value = value
+        self.peak = max(self.peak, value)
+
+    @property
+    def average(self):
+        now = time.perf_counter()
+        elapsed = now - self.start
+        return (self._area + self.value * (now - self._last)) / elapsed if elapsed > 0 else 0.0
+
+
+class BufferBudget:
+    """预读和后台写出共用的缓冲字节上限
+
+    某一阶段自己没有缓冲任何数据时总是允许放入一个文件，因此超过上限的单个大文件也能通过，
+    两个阶段也不会因为额度被对方占满而互相等待。
+    """
+
+    def __init__(self, limit=DEFAULT_PIPELINE_MEMORY):
+        self.limit = limit
+        self.used = 0
+        self.peak = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, size, held):
+        """占用 size 字节，额度不足时等待；held() 返回调用方阶段当前缓冲的字节数。返回等待的秒数"""
+        start = time.perf_counter()
+        with self._condition:
+            while held() and self.used + size > self.limit:
+                self._condition.wait()
+            self.used += size
+            self.peak = max(self.peak, self.used)
+        return time.perf_counter() - start
+
+    def release(self, size):
+        with self._condition:
+            self.used -= size
+            self._condition.notify_all()
+
+
+class ReadAheadQueue:
+    """后台线程按提交顺序把后续文件整块读入内存，解密当前文件时下一个文件的读取同时进行
+
+    调用方保证已提交但未取走的文件不超过 depth 个；读入的数据受 BufferBudget 限制，
+    额度不足时读取线程等待（计入 stall_time）。take() 等待读取的时间计入 wait_time，
+    该值较大说明读取是瓶颈。大于缓冲上限的文件不预读，由处理阶段按原有方式读取。
+    """
+
+    def __init__(self, depth=2, budget=None):
+        self.depth = max(1, depth)
+        self.budget = budget if budget is not None else BufferBudget()
+        self.read_time = 0.0
+        self.wait_time = 0.0
+        self.stall_time = 0.0
+        self.bytes_read = 0
+        self.gauge = QueueGauge()
+        self._requests = deque()
+        self._ready = deque()
+        self._pending = 0
+        self._buffered_bytes = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="pdf-read-ahead", daemon=True)
+        self._thread.start()
+
+    @property
+    def has_room(self):
+        return self._pending < self.depth
+
+    @property
+    def buffered_bytes(self):
+        return self._buffered_bytes
+
+    def submit(self, file_path):
+        with self._condition:
+            self._requests.append(file_path)
+            self._pending += 1
+            self._condition.notify_all()
+
+    def take(self):
+        """等待最早提交的文件读完，返回 (文件路径, 数据, 读取耗时)；未预读或读取失败时数据为 None"""
+        start = time.perf_counter()
+        with self._condition:
+            while not self._ready:
+                self._condition.wait()
+            file_path, data, read_time = self._ready.popleft()
+            self._pending -= 1
+            self.gauge.set(len(self._ready))
+            if data is not None:
+                self._buffered_bytes -= len(data)
+        if data is not None:
+            self.budget.release(len(data))
+        self.wait_time += time.perf_counter() - start
+        return file_path, data, read_time
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._requests.clear()
+            self._ready.clear()
+            released, self._buffered_bytes = self._buffered_bytes, 0
+            self._condition.notify_all()
+        # 归还额度后等待额度的读取线程才能醒来并退出
+        self.budget.release(released)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._requests and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                file_path = self._requests.popleft()
+
+            size = input_size(file_path)
+            data = None
+            elapsed = 0.0
+            if size <= self.budget.limit:
+                self.stall_time += self.budget.acquire(size, lambda: self._buffered_bytes)
+                start = time.perf_counter()
+                try:
+                    data = read_input(file_path)
+                except Exception:
+                    # 读取失败的文件由处理阶段重新读取并报告错误
+                    data = None
+                elapsed = time.perf_counter() - start
+                self.budget.release(size - (len(data) if data is not None else 0))
+
+            with self._condition:
+                if self._closed:
+                    if data is not None:
+                        self.budget.release(len(data))
+                    return
+                if data is not None:
+                    self.read_time += elapsed
+                    self.bytes_read += len(data)
+                    self._buffered_bytes += len(data)
+                self._ready.append((file_path, data, elapsed))
+                self.gauge.set(len(self._ready))
+                self._condition.notify_all()
+
+
+class WriteBehindQueue:
+    """后台线程写出输出文件，网络存储的写入延迟不再阻塞下一个文件的解密
+
+    队列按文件数和字节数设上限（字节数可与预读共用同一个 BufferBudget），满时 submit() 阻塞等待
+    （等待时间计入 wait_time）。completed()/drain() 在文件真正写出后才交回 (结果, 异常)，
+    任务日志和缓存因此只记录已落盘的文件。
+    """
+
+    def __init__(self, max_pending=8, max_pending_bytes=DEFAULT_PIPELINE_MEMORY, budget=None):
+        self.max_pending = max(1, max_pending)
+        self.budget = budget if budget is not None else BufferBudget(max_pending_bytes)
+        self.bytes_written = 0
+        self.write_time = 0.0
+        self.wait_time = 0.0
+        self.gauge = QueueGauge()
+        self._queue = deque()
+        self._done = deque()
+        self._pending = 0
+        self._pending_bytes = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="pdf-write-behind", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self):
+        return self._pending
+
+    @property
+    def buffered_bytes(self):
+        return self._pending_bytes
+
+    def submit(self, output_path, data, result):
+        start = time.perf_counter()
+        with self._condition:
+            while self._pending >= self.max_pending:
+                self._condition.wait()
+        # 只有主线程提交，等待额度期间队列只会变短
+        self.budget.acquire(len(data), lambda: self._pending_bytes)
+        with self._condition:
+            self._queue.append((output_path, data, result))
+            self._pending += 1
+            self._pending_bytes += len(data)
+            self.gauge.set(self._pending)
+            self._condition.notify_all()
+        self.wait_time += time.perf_counter() - start
+
+    def completed(self):
+        """取出已写完的 (结果, 异常) 列表，不阻塞"""
+        results = []
+        while self._done:
+            results.append(self._done.popleft())
+        return results
+
+    def drain(self):
+        """等待队列中的文件全部写完，返回剩余的结果"""
+        start = time.perf_counter()
+        with self._condition:
+            while self._pending:
+                self._condition.wait()
+        self.wait_time += time.perf_counter() - start
+        return self.completed()
+
+    def close(self):
+        results = self.drain()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        return results
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                output_path, data, result = self._queue.popleft()
+
+            start = time.perf_counter()
+            error = None
+            try:
+                atomic_write_bytes(output_path, data)
+                self.bytes_written += len(data)
+            except Exception as e:
+                error = e
+            elapsed = time.perf_counter() - start
+            result['write_time'] = elapsed
+            self.write_time += elapsed
+
+            with self._condition:
+                self._done.append((result, error))
+                self._pending -= 1
+                self._pending_bytes -= len(data)
+                self.gauge.set(self._pending)
+                self._condition.notify_all()
+            self.budget.release(len(data))
+
+
+class ArchiveOutputs:
+    """把压缩包成员的输出写入对应的输出ZIP（在主进程中顺序写入）
+
+    输出ZIP先写入临时文件，再原子替换为最终文件。恢复任务时（keep_existing 为 True）
+    close() 会补入已有输出中本次没有重新生成的成员，即之前已完成的成员；
+    新任务不保留已有输出中的成员，否则上次的输出（包括本次处理失败的文件）会残留在输出ZIP中。
+    """
+
+    def __init__(self, output_dir, keep_existing=False):
+        self.output_dir = output_dir
+        self.keep_existing = keep_existing
+        self.bytes_written = 0
+        self.write_time = 0.0
+        self._archives = {}
+
+    def add(self, archive_name, member_name, data):
+        """写入一个成员，返回用时"""
+        start = time.perf_counter()
+        archive = self._archives.get(archive_name)
+        if archive is None:
+            output_path = os.path.join(self.output_dir, archive_name)
+            archive = zipfile.ZipFile(partial_path(output_path), 'w', zipfile.ZIP_DEFLATED, compresslevel=1)
+            self._archives[archive_name] = archive
+        archive.writestr(member_name, data)
+        self.bytes_written += len(data)
+        elapsed = time.perf_counter() - start
+        self.write_time += elapsed
+        return elapsed
+
+    def close(self):
+        archives, self._archives = self._archives, {}
+        first_error = None
+        for archive_name, archive in archives.items():
+            output_path = os.path.join(self.output_dir, archive_name)
+            try:
+                try:
+                    if self.keep_existing:
+                        self._keep_existing(archive, output_path)
+                finally:
+                    archive.close()
+                os.replace(archive.filename, output_path)
+            except (OSError, zipfile.BadZipFile) as e:
+                first_error = first_error or e
+        if first_error is not None:
+            raise first_error
+
+    def _keep_existing(self, archive, output_path):
+        if not os.path.exists(output_path):
+            return
+        written = set(archive.namelist())
+        try:
+            existing = zipfile.ZipFile(output_path)
+        except zipfile.BadZipFile:
+            # 已有的输出ZIP已损坏，直接替换
+            return
+        with existing:
+            for info in existing.infolist():
+                if info.filename in written:
+                    continue
+                # 先完整读出并校验 CRC，损坏的成员直接丢弃，不会在新输出中留下写了一半的成员
+                try:
+                    data = existing.read(info)
+                except (zipfile.BadZipFile, zlib.error, EOFError):
+                    continue
+                archive.writestr(info.filename, data)
@@ -0,0 +1,763 @@
+import os
+import re
+import sys
+import zlib
+import signal
+import struct
+import hashlib
+import threading
+from collections import namedtuple, Counter
+from core.pdf_io import InputSource
+
+# 快速分类结果
+KIND_UNENCRYPTED = "unencrypted"
+KIND_OWNER_ONLY = "owner_only"
+KIND_USER_PASSWORD = "user_password"
+KIND_EMPTY_OWNER = "empty_owner_password"
+KIND_ENCRYPTED = "encrypted"
+KIND_UNKNOWN = "unknown"
+SNIFF_KIND_LABELS = {
+    KIND_UNENCRYPTED: "未加密",
+    KIND_OWNER_ONLY: "仅权限密码（空密码可打开）",
+    KIND_USER_PASSWORD: "需要打开密码",
+    KIND_EMPTY_OWNER: "有打开密码，但权限密码为空（空密码可打开）",
+    KIND_ENCRYPTED: "已加密（无法快速区分密码类型）",
+    KIND_UNKNOWN: "无法快速判断（需完整解析）",
+}
+
+TAIL_SIZE = 2048
+# 读取对象时先读一小块，不够再逐步放大
+WINDOW_SIZES = (4096, 65536, 1024 * 1024)
+MAX_XREF_SECTIONS = 64
+MAX_XREF_STREAM_SIZE = 16 * 1024 * 1024
+PASSWORD_PADDING = bytes.fromhex("28bf4e5e4e758a4164004e56fffa01082e2e00b6d0683e802f0ca9fe6453697a")
+
+_SPACE = re.compile(rb"(?:[ \t\r\n\f\0]+|%[^\r\n]*)*")
+_DELIMITED = rb"(?=[ \t\r\n\f\0()<>\[\]{}/%]|$)"
+_REF = re.compile(rb"(\d+)\s+(\d+)\s+R" + _DELIMITED)
+_NUMBER = re.compile(rb"[+-]?(?:\d+(?:\.\d*)?|\.\d+)")
+_KEYWORD = re.compile(rb"(true|false|null)" + _DELIMITED)
+_NAME = re.compile(rb"/([^ \t\r\n\f\0()<>\[\]{}/%]*)")
+_NAME_ESCAPE = re.compile(rb"#([0-9A-Fa-f]{2})")
+_OBJ = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj")
+_STREAM = re.compile(rb"\s*stream(?:\r\n|\r|\n)")
+_XREF = re.compile(rb"\s*xref")
+_SUBSECTION = re.compile(rb"(\d+)[ \t]+(\d+)[ \t]*(?:\r\n|\r|\n)")
+_XREF_ENTRY = re.compile(rb"\s*(\d+)\s+(\d+)\s+([nf])")
+_STARTXREF = re.compile(rb"startxref\s+(\d+)")
+_LITERAL_ESCAPES = {ord('n'): 10, ord('r'): 13, ord('t'): 9, ord('b'): 8, ord('f'): 12}
+
+_Ref = namedtuple("_Ref", "num gen")
+
+
+class _Unknown(Exception):
+    """无法仅凭尾部信息判断，需要完整解析"""
+
+
+class _Truncated(Exception):
+    """读取的数据块不足以解析完整对象"""
+
+
+class _Parser:
+    """解析一块数据中的PDF对象：名称解析为 str，字符串解析为 bytes，间接引用解析为 _Ref"""
+
+    # 未读到文件末尾时，最后几个字节可能是被截断的对象
+    GUARD = 32
+
+    def __init__(self, data, at_eof):
+        self.data = data
+        self.limit = len(data) if at_eof else len(data) - self.GUARD
+
+    def skip(self, pos):
+        pos = _SPACE.match(self.data, pos).end()
+        if pos >= self.limit:
+            raise _Truncated()
+        return pos
+
+    def object(self, pos):
+        pos = self.skip(pos)
+        data = self.data
+        if data.startswith(b"<<", pos):
+            return self.dictionary(pos)
+        head = data[pos:pos + 1]
+        if head == b"[":
+            items = []
+            pos += 1
+            while True:
+                pos = self.skip(pos)
+                if data.startswith(b"]", pos):
+                    return items, pos + 1
+                item, pos = self.object(pos)
+                items.append(item)
+        if head == b"(":
+            return self.literal(pos)
+        if head == b"<":
+            end = data.find(b">", pos)
+            if end < 0 or end >= self.limit:
+                raise _Truncated()
+            digits = re.sub(rb"\s+", b"", data[pos + 1:end])
+            try:
+                return bytes.fromhex((digits + b"0" * (len(digits) % 2)).decode("ascii")), end + 1
+            except ValueError:
+                raise _Unknown("十六进制字符串格式错误")
+        if head == b"/":
+            match = _NAME.match(data, pos)
+            name = _NAME_ESCAPE.sub(lambda m: bytes([int(m.group(1), 16)]), match.group(1))
+            return name.decode("latin-1"), match.end()
+        match = _REF.match(data, pos)
+        if match:
+            return _Ref(int(match.group(1)), int(match.group(2))), match.end()
+        match = _NUMBER.match(data, pos)
+        if match:
+            text = match.group()
+            return (float(text) if b"." in text else int(text)), match.end()
+        match = _KEYWORD.match(data, pos)
+        if match:
+            return {b"true": True, b"false": False, b"null": None}[match.group(1)], match.end()
+        raise _Unknown(f"无法解析的对象（偏移 {pos}）")
+
+    def dictionary(self, pos):
+        data = self.data
+        pos += 2
+        result = {}
+        while True:
+            pos = self.skip(pos)
+            if data.startswith(b">>", pos):
+                return result, pos + 2
+            key, pos = self.object(pos)
+            if not isinstance(key, str):
+                raise _Unknown("字典的键不是名称")
+            result[key], pos = self.object(pos)
+
+    def literal(self, pos):
+        data = self.data
+        out = bytearray()
+        depth = 1
+        pos += 1
+        while True:
+            if pos >= self.limit:
+                raise _Truncated()
+            c = data[pos]
+            pos += 1
+            if c == 0x5c:
+                c = data[pos]
+                pos += 1
+                if c in _LITERAL_ESCAPES:
+                    out.append(_LITERAL_ESCAPES[c])
+                elif 0x30 <= c <= 0x37:
+                    digits = bytes([c])
+                    while len(digits) < 3 and 0x30 <= data[pos] <= 0x37:
+                        digits += data[pos:pos + 1]
+                        pos += 1
+                    out.append(int(digits, 8) & 0xFF)
+                elif c == 0x0d:
+                    if data[pos] == 0x0a:
+                        pos += 1
+                elif c != 0x0a:
+                    out.append(c)
+                continue
+            if c == 0x28:
+                depth += 1
+            elif c == 0x29:
+                depth -= 1
+                if depth == 0:
+                    return bytes(out), pos
+            out.append(c)
+
+
+class _XrefSection:
+    def __init__(self, trailer, subsections=None, stream=None, stream_offset=None):
+        self.trailer = trailer
+        # 交叉引用表：[(起始对象号, 数量, 第一条记录的文件偏移)]
+        self.subsections = subsections or []
+        # 交叉引用流的字典和流数据的文件偏移，需要查找对象时才解压
+        self.stream = stream
+        self.stream_offset = stream_offset
+
+
+class _Sniffer:
+    def __init__(self, stream, known_kinds=None):
+        self.stream = stream
+        self.known_kinds = known_kinds
+        stream.seek(0, 2)
+        self.size = stream.tell()
+        self._sections = None
+        self._loaded_sections = []
+
+    def read_at(self, offset, size):
+        self.stream.seek(offset)
+        return self.stream.read(size)
+
+    def parse_at(self, offset, parse):
+        for size in WINDOW_SIZES:
+            data = self.read_at(offset, size)
+            at_eof = len(data) < size
+            try:
+                return parse(_Parser(data, at_eof))
+            except (_Truncated, IndexError):
+                if at_eof:
+                    raise _Unknown("对象在文件末尾被截断")
+        raise _Unknown("对象过大")
+
+    def classify(self):
+        if not self.read_at(0, 8).startswith(b"%PDF-"):
+            # 文件头不在开头时所有偏移都需要校正，交给 pikepdf 处理
+            raise _Unknown("文件头不在文件开头")
+        tail_start = max(0, self.size - TAIL_SIZE)
+        tail = self.read_at(tail_start, TAIL_SIZE)
+        index = tail.rfind(b"startxref")
+        match = _STARTXREF.match(tail, index) if index >= 0 else None
+        if match is None:
+            raise _Unknown("找不到 startxref")
+
+        self._sections = self.iter_sections(int(match.group(1)))
+        trailer = next(self.sections()).trailer
+        encrypt = trailer.get("Encrypt")
+        if encrypt is None:
+            return _result(KIND_UNENCRYPTED)
+        encrypt = self.resolve(encrypt)
+        if not isinstance(encrypt, dict):
+            raise _Unknown("/Encrypt 不是字典")
+        encrypt = {key: self.resolve(value) for key, value in encrypt.items()}
+        trailer = dict(trailer, ID=self.resolve(trailer.get("ID")))
+        return classify_encryption(encrypt, trailer, self.known_kinds)
+
+    def sections(self):
+        """依次产出各段交叉引用，已读取的段重复查找时直接沿用"""
+        yield from list(self._loaded_sections)
+        for section in self._sections:
+            self._loaded_sections.append(section)
+            yield section
+
+    def iter_sections(self, offset):
+        """从最新的交叉引用开始沿 /Prev 依次产出各段"""
+        seen = set()
+        while offset is not None and len(seen) < MAX_XREF_SECTIONS:
+            if offset in seen or offset >= self.size:
+                raise _Unknown("交叉引用偏移无效")
+            seen.add(offset)
+            section = self.read_section(offset)
+            xref_stream = section.trailer.get("XRefStm")
+            if isinstance(xref_stream, int) and section.stream is None:
+                # 混合引用文件：表中没有的对象记录在 /XRefStm 指向的交叉引用流中
+                hybrid = self.read_section(xref_stream)
+                section.stream, section.stream_offset = hybrid.stream, hybrid.stream_offset
+            yield section
+            prev = section.trailer.get("Prev")
+            offset = prev if isinstance(prev, int) else None
+
+    def read_section(self, offset):
+        head = self.read_at(offset, 64)
+        match = _XREF.match(head)
+        if match:
+            return self.read_table(offset + match.end())
+        if _OBJ.match(head):
+            return self.read_xref_stream(offset)
+        raise _Unknown("startxref 未指向交叉引用")
+
+    def read_table(self, pos):
+        subsections = []
+        while len(subsections) < 100000:
+            data = self.read_at(pos, 64)
+            start = _SPACE.match(data).end()
+            if data.startswith(b"trailer", start):
+                trailer = self.parse_at(pos + start + 7, lambda parser: parser.object(0)[0])
+                if not isinstance(trailer, dict):
+                    raise _Unknown("trailer 不是字典")
+                return _XrefSection(trailer, subsections)
+            match = _SUBSECTION.match(data, start)
+            if match is None:
+                raise _Unknown("交叉引用表格式错误")
+            first, count = int(match.group(1)), int(match.group(2))
+            subsections.append((first, count, pos + match.end()))
+            # 每条记录固定 20 字节，直接跳到下一段或 trailer
+            pos += match.end() + count * 20
+        raise _Unknown("交叉引用表分段过多")
+
+    def read_xref_stream(self, offset):
+        def parse(parser):
+            match = _OBJ.match(parser.data)
+            dictionary, pos = parser.object(match.end())
+            stream = _STREAM.match(parser.data, pos) if isinstance(dictionary, dict) else None
+            if stream is None:
+                raise _Unknown("交叉引用流格式错误")
+            return dictionary, stream.end()
+
+        dictionary, data_start = self.parse_at(offset, parse)
+        if dictionary.get("Type") != "XRef":
+            raise _Unknown("startxref 指向的不是交叉引用流")
+        return _XrefSection(dictionary, stream=dictionary, stream_offset=offset + data_start)
+
+    def find_offset(self, num):
+        """对象在文件中的偏移；对象不存在时返回 None"""
+        for section in self.sections():
+            for first, count, entries in section.subsections:
+                if first <= num < first + count:
+                    match = _XREF_ENTRY.match(self.read_at(entries + (num - first) * 20, 20))
+                    if match is None:
+                        raise _Unknown("交叉引用记录格式错误")
+                    return int(match.group(1)) if match.group(3) == b"n" else None
+            if section.stream is not None:
+                found, offset = self.xref_stream_entry(section, num)
+                if found:
+                    return offset
+        return None
+
+    def xref_stream_entry(self, section, num):
+        widths = section.stream.get("W")
+        index = section.stream.get("Index", [0, section.stream.get("Size")])
+        if not (isinstance(widths, list) and len(widths) == 3 and all(isinstance(w, int) for w in widths)
+                and all(isinstance(i, int) for i in index)):
+            raise _Unknown("交叉引用流参数无效")
+        row = None
+        base = 0
+        for first, count in zip(index[0::2], index[1::2]):
+            if first <= num < first + count:
+                row = base + num - first
+                break
+            base += count
+        if row is None:
+            return False, None
+
+        record = self.xref_stream_row(section, sum(widths), row)
+        fields = []
+        pos = 0
+        for width in widths:
+            fields.append(int.from_bytes(record[pos:pos + width], "big"))
+            pos += width
+        entry_type = fields[0] if widths[0] else 1
+        if entry_type == 1:
+            return True, fields[1]
+        if entry_type == 2:
+            # 加密字典不允许放在对象流中
+            raise _Unknown("对象位于对象流中")
+        return True, None
+
+    def xref_stream_row(self, section, row_size, row):
+        stream = section.stream
+        length = stream.get("Length")
+        if not isinstance(length, int) or length > MAX_XREF_STREAM_SIZE:
+            raise _Unknown("交叉引用流长度无效")
+        filters = stream.get("Filter", [])
+        filters = filters if isinstance(filters, list) else [filters]
+        params = stream.get("DecodeParms") or {}
+        params = (params[0] if params else {}) if isinstance(params, list) else params
+        data = self.read_at(section.stream_offset, length)
+        if filters == ["FlateDecode"]:
+            data = zlib.decompressobj().decompress(data, MAX_XREF_STREAM_SIZE)
+        elif filters:
+            raise _Unknown("不支持的交叉引用流编码")
+
+        predictor = params.get("Predictor", 1) if isinstance(params, dict) else 1
+        if predictor == 1:
+            record = data[row * row_size:(row + 1) * row_size]
+        elif predictor >= 10 and params.get("Columns", 1) == row_size:
+            record = _png_row(data, row_size, row)
+        else:
+            raise _Unknown("不支持的交叉引用流预测器")
+        if len(record) < row_size:
+            raise _Unknown("交叉引用流数据不完整")
+        return record
+
+    def resolve(self, value, depth=0):
+        if not isinstance(value, _Ref):
+            return value
+        if depth > 8:
+            raise _Unknown("间接引用层数过多")
+        offset = self.find_offset(value.num)
+        if offset is None:
+            raise _Unknown(f"找不到对象 {value.num}")
+
+        def parse(parser):
+            match = _OBJ.match(parser.data)
+            if match is None or (int(match.group(1)), int(match.group(2))) != value:
+                raise _Unknown(f"对象 {value.num} 的偏移无效")
+            return parser.object(match.end())[0]
+
+        return self.resolve(self.parse_at(offset, parse), depth + 1)
+
+
+def _png_row(data, row_size, row):
+    """按 PNG 预测器还原到第 row 行（每像素 1 字节）"""
+    stride = row_size + 1
+    previous = bytes(row_size)
+    for index in range(row + 1):
+        chunk = data[index * stride:(index + 1) * stride]
+        if len(chunk) < stride:
+            raise _Unknown("交叉引用流数据不完整")
+        kind, current = chunk[0], bytearray(chunk[1:])
+        if kind == 1:
+            for i in range(1, row_size):
+                current[i] = (current[i] + current[i - 1]) & 0xFF
+        elif kind == 2:
+            current = bytearray((a + b) & 0xFF for a, b in zip(current, previous))
+        elif kind == 3:
+            for i in range(row_size):
+                left = current[i - 1] if i else 0
+                current[i] = (current[i] + ((left + previous[i]) >> 1)) & 0xFF
+        elif kind == 4:
+            for i in range(row_size):
+                left = current[i - 1] if i else 0
+                upper_left = previous[i - 1] if i else 0
+                current[i] = (current[i] + _paeth(left, previous[i], upper_left)) & 0xFF
+        elif kind != 0:
+            raise _Unknown("PNG 预测器类型无效")
+        previous = bytes(current)
+    return previous
+
+
+def _paeth(a, b, c):
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+
+def _rc4(key, data):
+    crypto = _load_libcrypto()
+    if crypto is None or crypto[2] is None:
+        return _rc4_python(key, data)
+    lib, ctypes, cipher = crypto
+    ctx = lib.EVP_CIPHER_CTX_new()
+    if not ctx:
+        return _rc4_python(key, data)
+    out = ctypes.create_string_buffer(len(data) + 16)
+    out_length = ctypes.c_int()
+    try:
+        if (lib.EVP_EncryptInit_ex(ctx, cipher, None, None, None) != 1
+                or lib.EVP_CIPHER_CTX_set_key_length(ctx, len(key)) != 1
+                or lib.EVP_EncryptInit_ex(ctx, None, None, key, None) != 1
+                or lib.EVP_EncryptUpdate(ctx, out, ctypes.byref(out_length), data, len(data)) != 1):
+            return _rc4_python(key, data)
+        return out.raw[:out_length.value]
+    finally:
+        lib.EVP_CIPHER_CTX_free(ctx)
+
+
+def _rc4_python(key, data):
+    state = list(range(256))
+    j = 0
+    for i in range(256):
+        j = (j + state[i] + key[i % len(key)]) & 0xFF
+        state[i], state[j] = state[j], state[i]
+    i = j = 0
+    out = bytearray()
+    for byte in data:
+        i = (i + 1) & 0xFF
+        j = (j + state[i]) & 0xFF
+        state[i], state[j] = state[j], state[i]
+        out.append(byte ^ state[(state[i] + state[j]) & 0xFF])
+    return bytes(out)
+
+
+_libcrypto = None
+_libcrypto_lock = threading.Lock()
+
+
+def _load_libcrypto():
+    """通过 ctypes 使用 OpenSSL 的 AES 和 RC4，找不到可用的 libcrypto 时返回 None
+
+    RC4 属于 legacy provider，只加载到独立的库上下文中，不影响进程里其他代码使用的 OpenSSL；
+    加载失败时 RC4 退回纯 Python 实现。
+    """
+    global _libcrypto
+    with _libcrypto_lock:
+        if _libcrypto is None:
+            _libcrypto = False
+            import ctypes
+            for name in _libcrypto_names():
+                try:
+                    lib = ctypes.CDLL(name)
+                    lib.EVP_CIPHER_CTX_new.restype = ctypes.c_void_p
+                    lib.EVP_CIPHER_CTX_free.argtypes = [ctypes.c_void_p]
+                    lib.EVP_aes_128_cbc.restype = ctypes.c_void_p
+                    lib.EVP_EncryptInit_ex.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p,
+                                                       ctypes.c_char_p, ctypes.c_char_p]
+                    lib.EVP_EncryptUpdate.argtypes = [ctypes.c_void_p, ctypes.c_char_p,
+                                                      ctypes.POINTER(ctypes.c_int), ctypes.c_char_p, ctypes.c_int]
+                    _libcrypto = (lib, ctypes, _fetch_rc4(lib, ctypes))
+                    break
+                except (OSError, AttributeError):
+                    _libcrypto = False
+        return _libcrypto or None
+
+
+def _libcrypto_names():
+    """按平台列出依次尝试加载的 libcrypto"""
+    import ctypes.util
+    if sys.platform == "win32":
+        # Python 自带的 libcrypto 位于安装目录的 DLLs 下，其次是 PATH 中 OpenSSL 安装包提供的版本
+        names = ["libcrypto-3.dll", "libcrypto-3-x64.dll", "libcrypto-1_1.dll", "libcrypto-1_1-x64.dll"]
+        return [os.path.join(sys.base_prefix, "DLLs", name) for name in names] + names
+    if sys.platform == "darwin":
+        # 系统的 /usr/lib/libcrypto.dylib 不允许直接加载（会终止进程），只使用 Homebrew 安装的版本
+        return [os.path.join(prefix, "opt/openssl@3/lib/libcrypto.3.dylib")
+                for prefix in ("/opt/homebrew", "/usr/local")]
+    return [name for name in (ctypes.util.find_library("crypto"), "libcrypto.so.3") if name]
+
+
+def _fetch_rc4(lib, ctypes):
+    try:
+        lib.OSSL_LIB_CTX_new.restype = ctypes.c_void_p
+        lib.OSSL_PROVIDER_load.restype = ctypes.c_void_p
+        lib.OSSL_PROVIDER_load.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
+        lib.EVP_CIPHER_fetch.restype = ctypes.c_void_p
+        lib.EVP_CIPHER_fetch.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p]
+        lib.EVP_CIPHER_CTX_set_key_length.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    except AttributeError:
+        return None
+    context = lib.OSSL_LIB_CTX_new()
+    if not context or not lib.OSSL_PROVIDER_load(context, b"legacy"):
+        return None
+    return lib.EVP_CIPHER_fetch(context, b"RC4", None) or None
+
+
+def _hash_r6(password, salt, user_data=b""):
+    """ISO 32000-2 算法 2.B；每轮的 AES-128-CBC 共用同一个 OpenSSL 上下文"""
+    lib, ctypes, _ = _load_libcrypto()
+    ctx = lib.EVP_CIPHER_CTX_new()
+    if not ctx:
+        raise _Unknown("无法创建 AES 上下文")
+    cipher = lib.EVP_aes_128_cbc()
+    out = ctypes.create_string_buffer(64 * (len(password) + 64 + len(user_data)) + 16)
+    out_length = ctypes.c_int()
+    try:
+        key = hashlib.sha256(password + salt + user_data).digest()
+        round_number = 0
+        while True:
+            round_number += 1
+            data = (password + key + user_data) * 64
+            # 数据长度总是 16 的整数倍，无需填充，也不调用 EVP_EncryptFinal
+            if (lib.EVP_EncryptInit_ex(ctx, cipher, None, key[:16], key[16:32]) != 1
+                    or lib.EVP_EncryptUpdate(ctx, out, ctypes.byref(out_length), data, len(data)) != 1):
+                raise _Unknown("AES 计算失败")
+            encrypted = ctypes.string_at(out, out_length.value)
+            key = (hashlib.sha256, hashlib.sha384, hashlib.sha512)[sum(encrypted[:16]) % 3](encrypted).digest()
+            if round_number >= 64 and encrypted[-1] <= round_number - 32:
+                return key[:32]
+    finally:
+        lib.EVP_CIPHER_CTX_free(ctx)
+
+
+class _PasswordCheck:
+    """只用加密字典中的 /O、/U 校验密码，不解析文件的其余部分"""
+
+    def __init__(self, encrypt, revision, key_bytes, trailer):
+        self.owner_key, self.user_key = encrypt.get("O"), encrypt.get("U")
+        if not isinstance(self.owner_key, bytes) or not isinstance(self.user_key, bytes):
+            raise _Unknown("加密字典缺少 /O 或 /U")
+        self.revision = revision
+        self.key_bytes = 5 if revision == 2 else key_bytes
+        self.permissions = encrypt.get("P")
+        self.encrypt_metadata = encrypt.get("EncryptMetadata") is not False
+        file_id = trailer.get("ID")
+        self.first_id = file_id[0] if isinstance(file_id, list) and file_id and isinstance(file_id[0], bytes) else b""
+
+    @property
+    def fingerprint(self):
+        """决定密码校验结果的全部字段的摘要；R5 起密钥与文件标识无关，不计入 /ID"""
+        parts = [self.revision, self.key_bytes, self.permissions, self.encrypt_metadata,
+                 self.owner_key, self.user_key, self.first_id if self.revision < 5 else b""]
+        return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+    @property
+    def supported(self):
+        if self.revision == 6:
+            return _load_libcrypto() is not None
+        return self.revision in (2, 3, 4, 5)
+
+    def matches(self, password):
+        """密码是打开密码或权限密码时返回 True，与 pikepdf 能否用该密码打开一致"""
+        if self.revision >= 5:
+            password = password[:127]
+        return self.user(password) or self.owner(password)
+
+    def user(self, password):
+        if self.revision == 5:
+            return hashlib.sha256(password + self.user_key[32:40]).digest() == self.user_key[:32]
+        if self.revision == 6:
+            return _hash_r6(password, self.user_key[32:40]) == self.user_key[:32]
+
+        key = self.rc4_file_key(password)
+        if self.revision == 2:
+            return _rc4(key, PASSWORD_PADDING) == self.user_key[:32]
+        check = _rc4(key, hashlib.md5(PASSWORD_PADDING + self.first_id).digest())
+        for i in range(1, 20):
+            check = _rc4(bytes(byte ^ i for byte in key), check)
+        return check == self.user_key[:16]
+
+    def owner(self, password):
+        if self.revision == 5:
+            return (hashlib.sha256(password + self.owner_key[32:40] + self.user_key[:48]).digest()
+                    == self.owner_key[:32])
+        if self.revision == 6:
+            return _hash_r6(password, self.owner_key[32:40], self.user_key[:48]) == self.owner_key[:32]
+
+        # 算法 7：用权限密码解出 /O 中保存的打开密码，再按打开密码校验
+        digest = hashlib.md5(_pad_password(password)).digest()
+        if self.revision >= 3:
+            for _ in range(50):
+                digest = hashlib.md5(digest).digest()
+        key = digest[:self.key_bytes]
+        user_password = self.owner_key[:32]
+        if self.revision == 2:
+            user_password = _rc4(key, user_password)
+        else:
+            for i in range(19, -1, -1):
+                user_password = _rc4(bytes(byte ^ i for byte in key), user_password)
+        return self.user(user_password)
+
+    def rc4_file_key(self, password):
+        """算法 2：由打开密码计算文件密钥"""
+        if not isinstance(self.permissions, int):
+            raise _Unknown("加密字典缺少 /P")
+        digest = hashlib.md5(_pad_password(password) + self.owner_key[:32]
+                             + struct.pack("<I", self.permissions & 0xFFFFFFFF) + self.first_id)
+        if self.revision >= 4 and not self.encrypt_metadata:
+            digest.update(b"\xff\xff\xff\xff")
+        digest = digest.digest()
+        if self.revision >= 3:
+            for _ in range(50):
+                digest = hashlib.md5(digest[:self.key_bytes]).digest()
+        return digest[:self.key_bytes]
+
+
+def _pad_password(password):
+    return (password + PASSWORD_PADDING)[:32]
+
+
+def classify_encryption(encrypt, trailer, known_kinds=None):
+    """根据加密字典判断加密算法，以及能否用空密码打开（只设置了权限密码，或权限密码为空）
+
+    known_kinds 为 指纹 -> kind 的映射，指纹已在其中时直接沿用，不再校验空密码。
+    """
+    handler = encrypt.get("Filter")
+    revision = encrypt.get("R")
+    version = encrypt.get("V", 0)
+    if handler != "Standard":
+        return _result(KIND_ENCRYPTED, algorithm=str(handler), revision=revision)
+    if not isinstance(revision, int) or not isinstance(version, int):
+        raise _Unknown("加密字典缺少 /R 或 /V")
+
+    if version >= 5:
+        algorithm, key_bits = "AES", 256
+    elif version == 4:
+        filters = encrypt.get("CF") if isinstance(encrypt.get("CF"), dict) else {}
+        stream_filter = encrypt.get("StmF", "Identity")
+        if stream_filter == "Identity":
+            stream_filter = encrypt.get("StrF", "Identity")
+        method = filters.get(stream_filter, {}).get("CFM", "None") if stream_filter != "Identity" else "None"
+        algorithm = {"AESV2": "AES", "V2": "RC4"}.get(method, "identity")
+        key_bits = 128
+    else:
+        algorithm = "RC4"
+        length = encrypt.get("Length", 40)
+        key_bits = 40 if version < 2 or not isinstance(length, int) else length
+    name = f"{algorithm}-{key_bits}" if algorithm != "identity" else algorithm
+
+    check = _PasswordCheck(encrypt, revision, key_bits // 8, trailer)
+    result = _result(None, algorithm=name, revision=revision, key_bits=key_bits, fingerprint=check.fingerprint)
+    result['password_check'] = check if check.supported else None
+    known = known_kinds.get(check.fingerprint) if known_kinds is not None else None
+    if known is not None:
+        kind = known
+    elif not check.supported:
+        kind = KIND_ENCRYPTED
+    elif check.user(b""):
+        kind = KIND_OWNER_ONLY
+    elif check.owner(b""):
+        kind = KIND_EMPTY_OWNER
+    else:
+        kind = KIND_USER_PASSWORD
+    result['kind'] = kind
+    return result
+
+
+def _result(kind, algorithm=None, revision=None, key_bits=None, reason=None, fingerprint=None):
+    return {'kind': kind, 'algorithm': algorithm, 'revision': revision, 'key_bits': key_bits,
+            'reason': reason, 'fingerprint': fingerprint}
+
+
+def sniff_stream(stream, password_check=False, known_kinds=None):
+    """只读取文件头、尾部、交叉引用和加密字典判断加密情况，不完整解析PDF
+
+    返回 {'kind', 'algorithm', 'revision', 'key_bits', 'reason', 'fingerprint'}；
+    kind 为 unknown 时需要用 pikepdf 完整打开才能判断，reason 说明原因。
+    fingerprint 是加密字典的摘要，相同时同一密码的校验结果也相同。
+    password_check 为 True 时结果中另有 'password_check'，可用 matches(密码字节) 直接校验候选密码，
+    无法在 Python 中校验时为 None。known_kinds 见 classify_encryption。读取失败时抛出 OSError。
+    """
+    try:
+        result = _Sniffer(stream, known_kinds).classify()
+    except _Unknown as e:
+        result = _result(KIND_UNKNOWN, reason=str(e))
+    except (_Truncated, IndexError, ValueError, TypeError, AttributeError, zlib.error, RecursionError):
+        result = _result(KIND_UNKNOWN, reason="结构不符合预期")
+    check = result.pop('password_check', None)
+    if password_check:
+        result['password_check'] = check
+    return result
+
+
+def sniff_source(source, password_check=False, known_kinds=None):
+    """对 InputSource 快速分类：已读入内存的直接使用，否则只读取文件的少量片段"""
+    target = source.open()
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, 'rb') as f:
+            return sniff_stream(f, password_check, known_kinds)
+    return sniff_stream(target, password_check, known_kinds)
+
+
+def sniff_file(file_path):
+    with InputSource(str(file_path)) as source:
+        return sniff_source(source)
+
+
+def _init_inventory_worker():
+    # Ctrl+C 由主进程处理
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _inventory_sniff(file_path):
+    try:
+        return sniff_file(file_path)
+    except (OSError, KeyError, ValueError) as e:
+        return _result(KIND_UNKNOWN, reason=f"读取失败: {e}")
+
+
+def inventory(file_paths, workers=1, chunk_size=32):
+    """并行快速分类大量文件，按输入顺序产出 (文件路径, 分类结果)
+
+    每个文件只读取几KB，但空密码校验在 Python 中计算，因此多核时用多进程并行。
+    """
+    if workers <= 1:
+        for file_path in file_paths:
+            yield file_path, _inventory_sniff(file_path)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_inventory_worker)
+    try:
+        yield from zip(file_paths, executor.map(_inventory_sniff, file_paths, chunksize=chunk_size))
+    finally:
+        # 提前结束（如 Ctrl+C）时不再处理排队中的文件
+        executor.shutdown(cancel_futures=True)
+
+
+class InventoryStats:
+    """汇总快速分类结果：各类型和各加密算法的文件数"""
+
+    def __init__(self):
+        self.total = 0
+        self.kinds = Counter()
+        self.algorithms = Counter()
+
+    def add(self, result):
+        self.total += 1
+        self.kinds[result['kind']] += 1
+        if result['algorithm']:
+            self.algorithms[result['algorithm']] += 1
+
+    def as_dict(self):
+        return {'total': self.total, 'kinds': dict(self.kinds), 'algorithms': dict(self.algorithms)}
@@ -0,0 +1,404 @@
+import io
+import os
+import time
+import secrets
+import warnings
+from pathlib import Path
+from datetime import datetime
+from core.pdf_io import (InputSource, DEFAULT_INPUT_MODE, ARCHIVE_OUTPUTS, DEFAULT_ARCHIVE_OUTPUT,
+                         atomic_output, input_size)
+from core.pdf_sniff import sniff_source, KIND_UNENCRYPTED, KIND_OWNER_ONLY, KIND_EMPTY_OWNER, KIND_USER_PASSWORD
+from core.key_cache import KeyCache
+from utils.file_utils import split_archive_path
+
+# 未加密文件用密码打开时pikepdf会告警，这里的单次打开流程有意如此
+warnings.filterwarnings("ignore", message="A password was provided", category=UserWarning)
+
+
+STATUS_UNLOCKED = "unlocked"
+STATUS_COPIED = "copied"
+STATUS_SKIPPED = "skipped"
+STATUS_WRONG_PASSWORD = "wrong_password"
+STATUS_ERROR = "error"
+STATUS_TIMEOUT = "timeout"
+STATUS_RESOURCE_LIMIT = "resource_limit"
+STATUS_VERIFY_FAILED = "verify_failed"
+
+SUCCESS_STATUSES = {STATUS_UNLOCKED, STATUS_COPIED, STATUS_SKIPPED}
+
+# 单个文件的处理阶段：整块读取输入、解析并校验密码、解密并保存、后台写出、复制未加密文件、保存后校验输出
+STAGES = ("read", "open", "save", "write", "copy", "verify")
+
+# 输出保存方式：名称 -> pikepdf.Pdf.save 的参数，枚举参数以成员名表示，由 save_options() 转换
+SAVE_PROFILES = {
+    'standard': {},
+    'fast': dict(compress_streams=False, stream_decode_level="none", object_stream_mode="preserve"),
+    'compact': dict(compress_streams=True, recompress_flate=True,
+                    stream_decode_level="generalized", object_stream_mode="generate"),
+    'linearized': dict(linearize=True),
+}
+_SAVE_OPTION_ENUMS = {'stream_decode_level': "StreamDecodeLevel", 'object_stream_mode': "ObjectStreamMode"}
+SAVE_PROFILE_LABELS = {
+    'standard': "标准",
+    'fast': "最快（数据流原样写出，不重新压缩）",
+    'compact': "最小体积（对象流 + 重新压缩）",
+    'linearized': "网页优化（线性化）",
+}
+DEFAULT_SAVE_PROFILE = "standard"
+
+pikepdf = None
+
+
+def load_pikepdf():
+    """第一次真正处理文件时才导入 pikepdf，导入本模块、启动界面和查看命令行帮助都无需加载它"""
+    global pikepdf
+    if pikepdf is None:
+        import pikepdf as module
+        pikepdf = module
+    return pikepdf
+
+
+def save_options(profile):
+    """保存方式对应的 pikepdf.Pdf.save 参数"""
+    load_pikepdf()
+    options = dict(SAVE_PROFILES[profile])
+    for name, enum_name in _SAVE_OPTION_ENUMS.items():
+        if name in options:
+            options[name] = getattr(getattr(pikepdf, enum_name), options[name])
+    return options
+
+
+def build_result(file_path, status, message, output_file="未生成", error=None, **extra):
+    """构造统一的结果记录，status 为与界面语言无关的结构化状态码"""
+    result = {
+        'file_path': file_path,
+        'original_file': display_name(file_path),
+        'output_file': output_file,
+        'status': status,
+        'success': status in SUCCESS_STATUSES,
+        'message': message,
+        'error': error,
+        'open_count': 0,
+        'attempts': 0,
+        'password_index': None,
+        'encrypted': None,
+        'duration': 0.0,
+        'read_time': 0.0,
+        'open_time': 0.0,
+        'save_time': 0.0,
+        'write_time': 0.0,
+        'copy_time': 0.0,
+        'verify_time': 0.0,
+        'bytes_written': 0,
+        'file_size': input_size(file_path),
+        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+    result.update(extra)
+    return result
+
+
+def display_name(file_path):
+    """清单和日志中显示的文件名，压缩包成员显示为“压缩包名/成员路径”"""
+    member = split_archive_path(file_path)
+    if member is None:
+        return os.path.basename(file_path)
+    return f"{os.path.basename(member[0])}/{member[1]}"
+
+
+def error_result(file_path, exc):
+    filename = os.path.basename(file_path)
+    return build_result(file_path, STATUS_ERROR, f"处理错误: {str(exc)}",
+                        error=f"处理 {filename} 时出错: {str(exc)}")
+
+
+def write_failed(result, exc):
+    """后台写出失败时把已解密的结果改为错误"""
+    result.update(status=STATUS_ERROR, success=False, output_file="未生成", bytes_written=0,
+                  message=f"写出失败: {str(exc)}",
+                  error=f"写出 {result['original_file']} 时出错: {str(exc)}")
+    return result
+
+
+def verify_failed(result, reason):
+    """保存后校验未通过时把结果改为校验失败，输出文件保留以便检查"""
+    result.update(status=STATUS_VERIFY_FAILED, success=False, message=f"输出校验失败: {reason}",
+                  error=f"校验 {result['original_file']} 的输出时出错: {reason}")
+    return result
+
+
+def unique_passwords(passwords):
+    """去除重复的候选密码，保持原有顺序"""
+    return list(dict.fromkeys(passwords))
+
+
+class PDFUnlocker:
+    """单个PDF文件的解密逻辑（不依赖Qt，可在子进程中运行）"""
+
+    def __init__(self, passwords, output_dir, prefix,
+                 skip_unencrypted=True, password_type="打开密码",
+                 preserve_restrictions=False, save_profile=DEFAULT_SAVE_PROFILE,
+                 input_mode=DEFAULT_INPUT_MODE, write_behind=False,
+                 archive_output=DEFAULT_ARCHIVE_OUTPUT, sniff=True, key_cache=True):
+        if save_profile not in SAVE_PROFILES:
+            raise ValueError(f"未知的保存方式: {save_profile}")
+        if archive_output not in ARCHIVE_OUTPUTS:
+            raise ValueError(f"未知的压缩包输出方式: {archive_output}")
+        self.passwords = unique_passwords([passwords] if isinstance(passwords, str) else passwords) or [""]
+        self.output_dir = Path(output_dir)
+        self.prefix = prefix
+        self.skip_unencrypted = skip_unencrypted
+        self.password_type = password_type
+        self.preserve_restrictions = preserve_restrictions
+        self.save_profile = save_profile
+        self.input_mode = input_mode
+        # 为 True 时加密文件保存到内存，由 BatchProcessor 的后台写出队列落盘
+        self.write_behind = write_behind
+        self.archive_output = archive_output
+        # 为 True 时先读取文件尾部快速分类：未加密文件不再完整解析，空密码可打开的文件不再逐个尝试候选密码
+        self.sniff = sniff
+        # 按加密字典指纹复用密码校验结果，依赖快速分类得到的指纹
+        self.key_cache = KeyCache(self.passwords) if sniff and key_cache else None
+
+    def process_file(self, file_path, password_order=None, data=None):
+        """处理单个文件；data 为预读阶段已读入的文件内容"""
+        filename = os.path.basename(file_path)
+        if password_order is None:
+            password_order = range(len(self.passwords))
+        start = time.perf_counter()
+        stats = {'open_count': 0, 'attempts': 0, 'password_index': None, 'encrypted': None,
+                 'key_cache': None, 'page_count': None, 'read_time': 0.0, 'open_time': 0.0, 'save_time': 0.0, 'copy_time': 0.0}
+        self._output_data = None
+        self._output_file, self._output_archive = self.output_target(file_path, filename)
+        load_pikepdf()
+        try:
+            with InputSource(file_path, self.input_mode, data) as source:
+                stats['read_time'] = source.read_time
+                status, message, output_file = self.process_source(source, file_path, filename,
+                                                                   password_order, stats)
+        except Exception as e:
+            return dict(error_result(file_path, e), duration=time.perf_counter() - start, **stats)
+
+        extra = {}
+        bytes_written = 0
+        if self._output_data is not None:
+            # 后台写出或写入输出ZIP时由 BatchProcessor 在文件落盘后再产出结果
+            extra['_output_data'] = self._output_data
+            if self._output_archive is not None:
+                extra['_output_archive'] = self._output_archive
+            bytes_written = len(self._output_data)
+            self._output_data = None
+        elif output_file != "未生成":
+            bytes_written = os.path.getsize(self.output_dir / output_file)
+        return build_result(file_path, status, message, output_file,
+                            duration=time.perf_counter() - start, bytes_written=bytes_written,
+                            **stats, **extra)
+
+    def process_source(self, source, file_path, filename, password_order, stats):
+        sniffed = self.sniff_source(source, stats)
+        kind = sniffed['kind'] if sniffed else None
+        if kind == KIND_UNENCRYPTED:
+            stats['encrypted'] = False
+            return self.copy_unencrypted(source, stats)
+
+        pdf = None
+        # 空密码即可打开时不再尝试候选密码；保留权限限制需要原有的权限密码，仍按候选密码打开
+        if kind in (KIND_OWNER_ONLY, KIND_EMPTY_OWNER) and not self.preserve_restrictions:
+            pdf = self.try_open(source, "", stats)
+        try:
+            # 每个文件只解析一次：分类、解密和保存共用同一个Pdf对象，
+            # 只有候选密码错误时才会用下一个密码重新打开
+            if pdf is None:
+                pdf = self.open_with_candidates(source, password_order, stats, sniffed)
+        except pikepdf.PasswordError:
+            # 候选密码中没有权限密码时（保留权限限制或未能快速分类），只设置了权限密码的文件仍可用空密码打开，
+            # 输出的权限密码由 restriction_encryption 随机生成
+            if kind != KIND_USER_PASSWORD and "" not in self.passwords:
+                pdf = self.try_open(source, "", stats)
+            if pdf is None:
+                stats['encrypted'] = True
+                return self.get_failure_message()
+
+        with pdf:
+            stats['encrypted'] = pdf.is_encrypted
+            if not pdf.is_encrypted:
+                return self.copy_unencrypted(source, stats)
+            stage_start = time.perf_counter()
+            # 保存后校验时与输出的页数比较
+            stats['page_count'] = len(pdf.pages)
+            if stats['password_index'] is None:
+                # 用空密码打开：空密码不是打开密码时说明它是（为空的）权限密码，原文件设置了打开密码
+                result = self.process_encrypted(pdf, filename, user_password=not pdf.user_password_matched)
+            else:
+                result = self.process_encrypted(pdf, filename, self.passwords[stats['password_index']])
+            stats['save_time'] = time.perf_counter() - stage_start
+        return result
+
+    def sniff_source(self, source, stats):
+        if not self.sniff:
+            return None
+        start = time.perf_counter()
+        if self.key_cache is None:
+            sniffed = sniff_source(source)
+        else:
+            sniffed = sniff_source(source, password_check=True, known_kinds=self.key_cache.kinds)
+            if sniffed['fingerprint']:
+                stats['key_cache'] = self.key_cache.remember(sniffed['fingerprint'], sniffed['kind'])
+        stats['open_time'] += time.perf_counter() - start
+        return sniffed
+
+    def copy_unencrypted(self, source, stats):
+        stats['attempts'] = 0
+        stats['password_index'] = None
+        stage_start = time.perf_counter()
+        result = self.process_unencrypted(source)
+        stats['copy_time'] = time.perf_counter() - stage_start
+        return result
+
+    def job_settings(self):
+        return {
+            'output_dir': str(self.output_dir),
+            'prefix': self.prefix,
+            'skip_unencrypted': self.skip_unencrypted,
+            'password_type': self.password_type,
+            'preserve_restrictions': self.preserve_restrictions,
+            'save_profile': self.save_profile,
+            'input_mode': self.input_mode,
+            'write_behind': self.write_behind,
+            'archive_output': self.archive_output,
+        }
+
+    def settings_key(self):
+        """影响输出结果的设置，设置变化后缓存的结果不再有效"""
+        return (f"{self.prefix}|{int(self.skip_unencrypted)}|{int(self.preserve_restrictions)}"
+                f"|{self.save_profile}|{self.archive_output}")
+
+    def output_target(self, file_path, filename):
+        """输出文件相对输出目录的路径，以及压缩包成员所写入的输出ZIP名（其他情况为 None）
+
+        压缩包成员按包内路径输出到 <前缀><压缩包名>.zip 或 <前缀><压缩包名> 文件夹中。
+        """
+        member = split_archive_path(file_path)
+        if member is None:
+            return f"{self.prefix}{filename}", None
+        archive_path, member_name = member
+        archive_name = os.path.basename(archive_path)
+        # 去掉 ..、绝对路径等成员名，输出不会落到目标文件夹之外
+        parts = [part for part in member_name.split('/') if part not in ('', '.', '..')]
+        if self.archive_output == "zip":
+            output_archive = f"{self.prefix}{archive_name}"
+            return os.path.join(output_archive, *parts), output_archive
+        return os.path.join(f"{self.prefix}{os.path.splitext(archive_name)[0]}", *parts), None
+
+    def output_path(self):
+        """输出文件的完整路径，按需创建压缩包成员的输出子文件夹"""
+        output_path = self.output_dir / self._output_file
+        if output_path.parent != self.output_dir:
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+        return output_path
+
+    def open_with_candidates(self, source, password_order, stats, sniffed=None):
+        fingerprint = sniffed['fingerprint'] if sniffed and self.key_cache is not None else None
+        rejected = []
+        if fingerprint:
+            start = time.perf_counter()
+            password_order, rejected = self.key_cache.candidates(fingerprint, password_order,
+                                                                 sniffed['password_check'])
+            stats['open_time'] += time.perf_counter() - start
+            stats['attempts'] += len(rejected)
+        for index in password_order:
+            stats['attempts'] += 1
+            pdf = self.try_open(source, self.passwords[index], stats)
+            if fingerprint:
+                self.key_cache.record(fingerprint, index, pdf is not None)
+            if pdf is not None:
+                stats['password_index'] = index
+                return pdf
+        # Python 中的校验与 qpdf 不一致时不能误报密码错误，被拒绝的密码再交给 pikepdf 确认
+        for index in rejected:
+            pdf = self.try_open(source, self.passwords[index], stats)
+            if pdf is not None:
+                self.key_cache.record(fingerprint, index, True)
+                stats['password_index'] = index
+                return pdf
+        raise pikepdf.PasswordError("所有候选密码均错误")
+
+    def try_open(self, source, password, stats):
+        """用指定密码打开，密码错误时返回 None"""
+        stats['open_count'] += 1
+        open_start = time.perf_counter()
+        try:
+            return self.open_pdf(source.open(), password)
+        except pikepdf.PasswordError:
+            return None
+        finally:
+            stats['open_time'] += time.perf_counter() - open_start
+
+    def open_pdf(self, file_or_stream, password):
+        return pikepdf.open(file_or_stream, password=password,
+                            allow_overwriting_input=False)
+
+    def process_unencrypted(self, source):
+        if self.skip_unencrypted:
+            return STATUS_SKIPPED, "文件未加密，已跳过", "未生成"
+
+        try:
+            if self._output_archive is not None:
+                self._output_data = source.read_bytes()
+            else:
+                source.copy_to(self.output_path())
+            return STATUS_COPIED, "文件未加密，已复制", self._output_file
+        except Exception as e:
+            return STATUS_ERROR, f"复制失败: {str(e)}", "未生成"
+
+    def process_encrypted(self, pdf, filename, password="", user_password=None):
+        """user_password 表示原文件是否设置了打开密码，未指定时按打开所用的密码判断"""
+        output_filename = self._output_file
+        if user_password is None:
+            user_password = pdf.user_password_matched
+        options = save_options(self.save_profile)
+        if self.preserve_restrictions:
+            # 重新加密输出时 pikepdf 不允许指定数据流解码级别
+            options.pop('stream_decode_level', None)
+            options['encryption'] = self.restriction_encryption(pdf, password)
+        try:
+            output_path = self.output_path() if self._output_archive is None else None
+            if self.write_behind or output_path is None:
+                buffer = io.BytesIO()
+                pdf.save(buffer, **options)
+                self._output_data = buffer.getvalue()
+            else:
+                atomic_output(output_path, lambda temp_path: pdf.save(temp_path, **options))
+        except Exception as e:
+            return STATUS_ERROR, f"处理错误: {str(e)}", "未生成"
+
+        if self.preserve_restrictions and user_password:
+            return STATUS_UNLOCKED, "打开密码已移除（保留原有权限限制）", output_filename
+        if self.preserve_restrictions:
+            return STATUS_UNLOCKED, "已解密，保留原有权限限制", output_filename
+        message_type = "打开密码" if user_password else "权限密码"
+        return STATUS_UNLOCKED, f"{message_type}已移除", output_filename
+
+    def restriction_encryption(self, pdf, password):
+        """去掉打开密码但保留原有的打印、复制等限制
+
+        权限限制需要权限密码才能生效：只有打开文件所用的正是权限密码时才沿用它；
+        用打开密码或空密码打开时生成随机密码，否则能打开原文件的人就能解除输出的限制。
+        加密版本和数据流加密算法沿用原文件（R5 已废弃，改用 R6）。
+        """
+        owner_password = password if password and pdf.owner_password_matched else secrets.token_urlsafe(24)
+        encryption = pdf.encryption
+        revision = 6 if encryption.R >= 5 else max(encryption.R, 2)
+        # pikepdf 只在 AES 加密时支持设置是否加密元数据，R2/R3 和 RC4 需显式关闭这两个选项
+        aes = revision == 6 or (revision == 4 and encryption.stream_method.name == "aes")
+        metadata = aes and bool(pdf.trailer.Encrypt.get('/EncryptMetadata', True))
+        return pikepdf.Encryption(owner=owner_password, user="", R=revision, allow=pdf.allow,
+                                  aes=aes, metadata=metadata)
+
+    def get_failure_message(self):
+        if len(self.passwords) > 1:
+            return STATUS_WRONG_PASSWORD, f"{len(self.passwords)} 个候选密码均错误", "未生成"
+        if self.password_type == "打开密码":
+            return STATUS_WRONG_PASSWORD, "打开密码错误", "未生成"
+        elif self.password_type == "只读密码锁（权限密码）":
+            return STATUS_WRONG_PASSWORD, "权限密码错误", "未生成"
+        return STATUS_WRONG_PASSWORD, "打开密码和权限密码都错误", "未生成"
@@ -1,209 +1,154 @@
-import os
-import shutil
+import time
+import threading
 from pathlib import Path
-from datetime import datetime
-from PyQt5.QtCore import QThread, pyqtSignal
-import pikepdf
+from PyQt5.QtCore import QThread, QTimer, pyqtSignal
+from core.api import create_batch
+from core.pdf_utils import DEFAULT_SAVE_PROFILE
+from core.pdf_io import DEFAULT_INPUT_MODE, DEFAULT_ARCHIVE_OUTPUT
+from core.scheduler import DEFAULT_SCHEDULE_ORDER
+from core.batch import FileFeed
+from core.report import ResultCollector
+from core.job_journal import open_job_journal
+from core.profiling import Profiler
 
 class PDFProcessingWorker(QThread):
+    """把 core.api 的批量处理结果转成Qt信号，处理逻辑本身不依赖Qt"""
+    THROUGHPUT_INTERVAL = 0.5
+    RESULT_FLUSH_INTERVAL = 100
+    
     progress_updated = pyqtSignal(int)
-    file_processed = pyqtSignal(str, bool, str)
+    files_processed = pyqtSignal(list)
     processing_finished = pyqtSignal()
     error_occurred = pyqtSignal(str)
     summary_generated = pyqtSignal(str)
+    throughput_updated = pyqtSignal(float, float)
+    bytes_progress = pyqtSignal(object, object, object)
     
-    def __init__(self, file_paths, password, output_dir, prefix, 
+    def __init__(self, file_paths, passwords, output_dir, prefix, 
                  skip_unencrypted=True, password_type="打开密码", 
-                 preserve_restrictions=False, generate_summary=True):
+                 preserve_restrictions=False, generate_summary=True, workers=1,
+                 use_cache=False, force_reprocess=False, resume_state=None,
+                 report_formats=(), profile=False, save_profile=DEFAULT_SAVE_PROFILE,
+                 input_mode=DEFAULT_INPUT_MODE, write_behind=False,
+                 order=DEFAULT_SCHEDULE_ORDER, memory_budget=0, file_timeout=0, memory_limit=0,
+                 dedup=False, archive_output=DEFAULT_ARCHIVE_OUTPUT, read_ahead=0, verify=None):
         super().__init__()
         self.file_paths = file_paths
-        self.password = password
+        self.feed = file_paths if isinstance(file_paths, FileFeed) else FileFeed(file_paths, closed=True)
+        self.passwords = passwords
         self.output_dir = Path(output_dir)
         self.prefix = prefix
         self.skip_unencrypted = skip_unencrypted
         self.password_type = password_type
         self.preserve_restrictions = preserve_restrictions
         self.generate_summary = generate_summary
-        self.processing_results = []
-        self._is_running = True
+        self.resume_state = resume_state
+        self.report_formats = report_formats
+        self.collector = None
+        self.profiler = Profiler(self.output_dir, cpu=profile, memory=profile)
+        self.profile_paths = []
+        self.batch = create_batch(passwords, output_dir, prefix, workers, use_cache=use_cache,
+                                  force=force_reprocess, write_queue_size=8 if write_behind else 0,
+                                  order=order, memory_budget=memory_budget, file_timeout=file_timeout,
+                                  memory_limit=memory_limit, dedup=dedup, read_ahead=read_ahead, verify=verify,
+                                  skip_unencrypted=skip_unencrypted, password_type=password_type,
+                                  preserve_restrictions=preserve_restrictions, save_profile=save_profile,
+                                  input_mode=input_mode, archive_output=archive_output)
+        self.unlocker = self.batch.unlocker
+        # 结果先攒在缓冲区，由主线程的定时器按批取走，界面不必为每个文件处理一次信号
+        self._pending_results = []
+        self._pending_lock = threading.Lock()
+        self._completed = 0
+        self._last_progress = -1
+        self._result_timer = QTimer(self)
+        self._result_timer.setInterval(self.RESULT_FLUSH_INTERVAL)
+        self._result_timer.timeout.connect(self.flush_results)
+        self.started.connect(self._result_timer.start)
+        self.finished.connect(self._result_timer.stop)
     
     def run(self):
-        total_files = len(self.file_paths)
-        
-        for i, file_path in enumerate(self.file_paths):
-            if not self._is_running:
-                break
-                
-            filename = os.path.basename(file_path)
-            success, message, output_file = self.process_file(file_path, filename)
-            
-            result = {
-                'original_file': filename,
-                'output_file': output_file,
-                'success': success,
-                'message': message,
-                'file_size': os.path.getsize(file_path) if os.path.exists(file_path) else 0,
-                'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
-            self.processing_results.append(result)
-            
-            self.file_processed.emit(filename, success, message)
-            self.progress_updated.emit(int((i + 1) / total_files * 100))
-            self.msleep(50)
-        
-        if self.generate_summary and self.processing_results:
-            summary_file = self.generate_summary_file()
-            if summary_file:
-                self.summary_generated.emit(summary_file)
-        
-        self.processing_finished.emit()
-    
-    def process_file(self, file_path, filename):
+        # 无论处理中出现什么异常，界面都要收到结束信号，否则会一直停留在处理状态
         try:
-            if not self.is_encrypted(file_path):
-                return self.process_unencrypted(file_path, filename)
-            else:
-                return self.process_encrypted(file_path, filename)
+            self.process_files()
         except Exception as e:
-            self.error_occurred.emit(f"处理 {filename} 时出错: {str(e)}")
-            return False, f"处理错误: {str(e)}", "未生成"
+            self.error_occurred.emit(f"处理中断: {str(e)}")
+        finally:
+            self.processing_finished.emit()
     
-    def is_encrypted(self, file_path):
+    def process_files(self):
+        resume = self.resume_state is not None
         try:
-            with pikepdf.open(file_path, allow_overwriting_input=False) as pdf:
-                return hasattr(pdf, 'trailer') and '/Encrypt' in pdf.trailer
-        except pikepdf.PasswordError:
-            return True
-        except Exception:
-            return False
-    
-    def process_unencrypted(self, file_path, filename):
-        if self.skip_unencrypted:
-            return True, "文件未加密，已跳过", "未生成"
+            self.collector = ResultCollector(self.output_dir, self.password_type, self.batch,
+                                             self.generate_summary, self.report_formats, resume)
+            self.batch.journal = open_job_journal(self.output_dir, self.feed,
+                                                  self.unlocker.job_settings(), resume)
+        except OSError as e:
+            self.error_occurred.emit(f"无法写入结果文件: {str(e)}")
+            return
         
-        output_filename = f"{self.prefix}{filename}"
-        output_path = self.output_dir / output_filename
-        try:
-            shutil.copy2(file_path, output_path)
-            return True, "文件未加密，已复制", output_filename
-        except Exception as e:
-            return False, f"复制失败: {str(e)}", "未生成"
-    
-    def process_encrypted(self, file_path, filename):
-        password_types = self.get_password_types()
+        if resume:
+            for result in self.resume_state.iter_results():
+                self.collector.replay(result)
         
-        for pwd_type in password_types:
-            try:
-                pdf = pikepdf.open(file_path, password=self.password, 
-                                  allow_overwriting_input=False)
-                
-                output_filename = f"{self.prefix}{filename}"
-                output_path = self.output_dir / output_filename
-                pdf.save(output_path)
-                pdf.close()
-                
-                message_type = "打开密码" if pwd_type == "user" else "权限密码"
-                return True, f"{message_type}已移除", output_filename
-                
-            except pikepdf.PasswordError:
-                continue
-            except Exception as e:
-                return False, f"处理错误: {str(e)}", "未生成"
+        if self.profiler.enabled:
+            self.profiler.start()
         
-        return self.get_failure_message()
-    
-    def get_password_types(self):
-        if self.password_type == "打开密码":
-            return ["user"]
-        elif self.password_type == "只读密码锁（权限密码）":
-            return ["owner"]
-        return ["user", "owner"]
+        # 文件结果和进度按批发送，处理速度只在间隔到期时发送
+        last_throughput = 0.0
+        try:
+            for i, result in enumerate(self.batch.run(self.feed)):
+                self.collector.add(result)
+                
+                with self._pending_lock:
+                    self._pending_results.append((result['original_file'], result['success'], result['message']))
+                    self._completed = i + 1
+                now = time.monotonic()
+                if now - last_throughput >= self.THROUGHPUT_INTERVAL:
+                    self.emit_throughput()
+                    last_throughput = now
+        finally:
+            # 中途出错时也为已完成的文件生成清单
+            self.flush_results()
+            self.emit_throughput()
+            
+            if self.profiler.enabled:
+                try:
+                    self.profile_paths = self.profiler.stop()
+                except OSError as e:
+                    self.error_occurred.emit(f"无法写入性能分析结果: {str(e)}")
+            
+            summary_file = self.generate_summary_file()
+            if summary_file:
+                self.summary_generated.emit(summary_file)
     
-    def get_failure_message(self):
-        if self.password_type == "打开密码":
-            return False, "打开密码错误", "未生成"
-        elif self.password_type == "只读密码锁（权限密码）":
-            return False, "权限密码错误", "未生成"
-        return False, "打开密码和权限密码都错误", "未生成"
+    def flush_results(self):
+        with self._pending_lock:
+            results, self._pending_results = self._pending_results, []
+            progress = int(self._completed / max(self.feed.total, 1) * 100)
+            progress_changed = progress != self._last_progress
+            self._last_progress = progress
+        if results:
+            self.files_processed.emit(results)
+        if progress_changed and self._completed:
+            self.progress_updated.emit(progress)
+    
+    def emit_throughput(self):
+        self.throughput_updated.emit(self.batch.files_per_second, self.batch.megabytes_per_second)
+        # 字节数可能超过 int32 范围，用 object 类型传递
+        self.bytes_progress.emit(self.batch.bytes_processed, self.batch.total_bytes, self.batch.eta_seconds)
     
     def generate_summary_file(self):
         try:
-            summary_path = self.output_dir / "已解锁文件清单.txt"
-            
-            with open(summary_path, 'w', encoding='utf-8') as f:
-                self.write_summary_header(f)
-                self.write_statistics(f)
-                self.write_file_details(f)
-                self.write_failed_files(f)
-                f.write("=" * 60 + "\n")
-                f.write("处理完成！\n")
-                f.write("=" * 60 + "\n")
-            
-            return str(summary_path)
+            return self.collector.finish()
         except Exception as e:
             self.error_occurred.emit(f"生成清单文件时出错: {str(e)}")
             return None
     
-    def write_summary_header(self, file):
-        file.write("=" * 60 + "\n")
-        file.write("移除PDF密码工具 - 处理结果清单\n")
-        file.write("=" * 60 + "\n\n")
-        file.write(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        file.write(f"输出目录: {self.output_dir}\n")
-        file.write(f"处理文件总数: {len(self.processing_results)}\n")
-        file.write(f"密码类型: {self.password_type}\n\n")
-    
-    def write_statistics(self, file):
-        successful = sum(1 for r in self.processing_results if r['success'])
-        failed = len(self.processing_results) - successful
-        skipped = sum(1 for r in self.processing_results if "已跳过" in r['message'])
-        
-        file.write("📊 处理统计:\n")
-        file.write(f"  成功处理: {successful} 个文件\n")
-        file.write(f"  处理失败: {failed} 个文件\n")
-        file.write(f"  跳过文件: {skipped} 个文件\n")
-        file.write("-" * 60 + "\n\n")
-    
-    def write_file_details(self, file):
-        file.write("📁 文件处理详情:\n\n")
-        
-        for i, result in enumerate(self.processing_results, 1):
-            status = self.get_status_icon(result)
-            file.write(f"{i}. {result['original_file']}\n")
-            file.write(f"   状态: {status}\n")
-            file.write(f"   结果: {result['message']}\n")
-            if result['output_file'] != "未生成":
-                file.write(f"   输出文件: {result['output_file']}\n")
-            file.write(f"   文件大小: {self.format_file_size(result['file_size'])}\n")
-            file.write(f"   处理时间: {result['timestamp']}\n\n")
+    def add_files(self, file_paths, sizes=None):
+        self.feed.add(file_paths, sizes)
     
-    def get_status_icon(self, result):
-        if "已跳过" in result['message']:
-            return "⏭️ 跳过"
-        return "✅ 成功" if result['success'] else "❌ 失败"
-    
-    def write_failed_files(self, file):
-        failed_files = [
-            r for r in self.processing_results 
-            if not r['success'] and "已跳过" not in r['message']
-        ]
-        
-        if failed_files:
-            file.write("⚠️ 失败文件列表:\n")
-            for fail in failed_files:
-                file.write(f"   - {fail['original_file']}: {fail['message']}\n")
-            file.write("\n")
-    
-    def format_file_size(self, size_bytes):
-        if size_bytes == 0:
-            return "0 B"
-        
-        size_names = ("B", "KB", "MB", "GB")
-        i = 0
-        while size_bytes >= 1024 and i < len(size_names) - 1:
-            size_bytes /= 1024
-            i += 1
-        return f"{size_bytes:.2f} {size_names[i]}"
+    def finish_input(self):
+        self.feed.close()
     
     def stop(self):
-        self._is_running = False
\ No newline at end of file
+        self.batch.stop()
\ No newline at end of file
@@ -0,0 +1,68 @@
+import io
+import cProfile
+import tracemalloc
+from pathlib import Path
+
+PROFILE_STATS_FILENAME = "profile.pstats"
+PROFILE_REPORT_FILENAME = "profile_report.txt"
+
+
+class Profiler:
+    """可选的性能分析钩子：cProfile 记录CPU耗时，tracemalloc 记录内存分配
+
+    cProfile 只分析调用 start() 的线程，多进程模式下子进程内的解密工作不在统计范围内，
+    分析解密本身时请将并行进程数设为 1。
+    """
+
+    TOP_COUNT = 30
+
+    def __init__(self, output_dir, cpu=False, memory=False):
+        self.output_dir = Path(output_dir)
+        self.cpu = cpu
+        self.memory = memory
+        self._profile = None
+        self._started_tracemalloc = False
+
+    @property
+    def enabled(self):
+        return self.cpu or self.memory
+
+    def start(self):
+        if self.cpu:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def stop(self):
+        """停止分析并写出结果，返回生成的文件路径列表"""
+        paths = []
+        report = io.StringIO()
+
+        if self._profile is not None:
+            self._profile.disable()
+            stats_path = self.output_dir / PROFILE_STATS_FILENAME
+            self._profile.dump_stats(stats_path)
+            paths.append(str(stats_path))
+            report.write("=== cProfile（按累计耗时排序）===\n")
+            import pstats
+            pstats.Stats(self._profile, stream=report).sort_stats("cumulative").print_stats(self.TOP_COUNT)
+            self._profile = None
+
+        if self._started_tracemalloc:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+            report.write("=== tracemalloc ===\n")
+            report.write(f"当前占用: {current / 1024 / 1024:.2f} MB，峰值: {peak / 1024 / 1024:.2f} MB\n\n")
+            for stat in snapshot.statistics("lineno")[:self.TOP_COUNT]:
+                report.write(f"{stat}\n")
+
+        if report.tell():
+            report_path = self.output_dir / PROFILE_REPORT_FILENAME
+            with open(report_path, 'w', encoding='utf-8') as f:
+                f.write(report.getvalue())
+            paths.append(str(report_path))
+        return paths
@@ -0,0 +1,207 @@
+import csv
+import json
+import heapq
+from collections import Counter
+from pathlib import Path
+from core.pdf_utils import STATUS_SKIPPED, STATUS_UNLOCKED, STAGES
+from core.summary import SummaryWriter
+from utils.file_utils import split_archive_path
+
+REPORT_BASENAME = "unlock_results"
+REPORT_FORMATS = ("jsonl", "csv")
+REPORT_FIELDS = [
+    'file_path', 'original_file', 'status', 'success', 'message', 'output_file',
+    'file_size', 'encrypted', 'password_index', 'attempts', 'open_count', 'key_cache', 'page_count',
+    'cached', 'dedup_of', 'output_archive', 'verified', 'duration', 'open_time', 'save_time', 'copy_time',
+    'verify_time', 'bytes_written',
+    'error', 'timestamp',
+]
+
+
+class RunningStats:
+    """处理过程中持续更新的汇总数据，内存占用与文件数量无关"""
+
+    SLOWEST_COUNT = 10
+
+    def __init__(self):
+        self.total = 0
+        self.successful = 0
+        self.status_counts = Counter()
+        self.open_count = 0
+        self.attempts = 0
+        self.tried_files = 0
+        # 加密字典指纹缓存：hit / miss -> 文件数
+        self.key_cache = Counter()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.unlocked_bytes_in = 0
+        self.unlocked_bytes_out = 0
+        self.stage_times = dict.fromkeys(STAGES, 0.0)
+        # 压缩包路径 -> [PDF成员数, 成功数]
+        self.archives = {}
+        self._slowest = []
+
+    def add(self, result):
+        self.total += 1
+        self.successful += 1 if result['success'] else 0
+        self.status_counts[result['status']] += 1
+        self.open_count += result.get('open_count', 0)
+        if result.get('attempts'):
+            self.attempts += result['attempts']
+            self.tried_files += 1
+        if result.get('key_cache'):
+            self.key_cache[result['key_cache']] += 1
+        self.bytes_in += result.get('file_size', 0)
+        self.bytes_out += result.get('bytes_written', 0)
+        if result['status'] == STATUS_UNLOCKED:
+            # 只统计重新保存的文件，用于比较不同保存方式的输出体积
+            self.unlocked_bytes_in += result.get('file_size', 0)
+            self.unlocked_bytes_out += result.get('bytes_written', 0)
+        member = split_archive_path(result['file_path'])
+        if member is not None:
+            counts = self.archives.setdefault(member[0], [0, 0])
+            counts[0] += 1
+            counts[1] += 1 if result['success'] else 0
+        if not result.get('cached'):
+            for stage in STAGES:
+                self.stage_times[stage] += result.get(f"{stage}_time", 0.0)
+            # 小根堆只保留耗时最长的若干个文件
+            entry = (result.get('duration', 0.0), result['file_path'])
+            if len(self._slowest) < self.SLOWEST_COUNT:
+                heapq.heappush(self._slowest, entry)
+            elif entry > self._slowest[0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    @property
+    def failed(self):
+        return self.total - self.successful
+
+    @property
+    def skipped(self):
+        return self.status_counts[STATUS_SKIPPED]
+
+    @property
+    def slowest(self):
+        """耗时最长的文件，按耗时从长到短排列的 (耗时, 文件路径)"""
+        return sorted(self._slowest, reverse=True)
+
+    @property
+    def average_attempts(self):
+        return self.attempts / self.tried_files if self.tried_files else 0.0
+
+    @property
+    def key_cache_hit_rate(self):
+        lookups = self.key_cache['hit'] + self.key_cache['miss']
+        return self.key_cache['hit'] / lookups if lookups else 0.0
+
+    def as_dict(self):
+        return {
+            'total': self.total,
+            'succeeded': self.successful,
+            'failed': self.failed,
+            'statuses': dict(self.status_counts),
+            'open_count': self.open_count,
+            'average_attempts': round(self.average_attempts, 2),
+            'key_cache': {'hits': self.key_cache['hit'], 'misses': self.key_cache['miss'],
+                          'hit_rate': round(self.key_cache_hit_rate, 3)},
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'unlocked_bytes_in': self.unlocked_bytes_in,
+            'unlocked_bytes_out': self.unlocked_bytes_out,
+            'stage_times': {stage: round(seconds, 3) for stage, seconds in self.stage_times.items()},
+            'archives': {path: {'members': total, 'succeeded': succeeded}
+                         for path, (total, succeeded) in self.archives.items()},
+        }
+
+
+class ResultReport:
+    """逐条写出机器可读的结果文件（JSONL/CSV）"""
+
+    FLUSH_INTERVAL = 100
+
+    def __init__(self, output_dir, formats=REPORT_FORMATS, append=False):
+        self.paths = {}
+        self._jsonl = None
+        self._csv_file = None
+        self._csv = None
+        self._unflushed = 0
+        mode = 'a' if append else 'w'
+        output_dir = Path(output_dir)
+
+        if "jsonl" in formats:
+            self.paths['jsonl'] = output_dir / f"{REPORT_BASENAME}.jsonl"
+            self._jsonl = open(self.paths['jsonl'], mode, encoding='utf-8')
+        if "csv" in formats:
+            self.paths['csv'] = output_dir / f"{REPORT_BASENAME}.csv"
+            write_header = not (append and self.paths['csv'].exists()
+                                and self.paths['csv'].stat().st_size > 0)
+            # utf-8-sig 便于在 Excel 中直接打开中文内容
+            self._csv_file = open(self.paths['csv'], mode, encoding='utf-8-sig' if write_header else 'utf-8',
+                                  newline='')
+            self._csv = csv.DictWriter(self._csv_file, REPORT_FIELDS, extrasaction='ignore')
+            if write_header:
+                self._csv.writeheader()
+
+    def write(self, result):
+        if self._jsonl is not None:
+            self._jsonl.write(json.dumps(result, ensure_ascii=False) + "\n")
+        if self._csv is not None:
+            self._csv.writerow(result)
+        self._unflushed += 1
+        if self._unflushed >= self.FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        for file in (self._jsonl, self._csv_file):
+            if file is not None:
+                file.flush()
+        self._unflushed = 0
+
+    def close(self):
+        for file in (self._jsonl, self._csv_file):
+            if file is not None:
+                file.close()
+        self._jsonl = None
+        self._csv_file = None
+        self._csv = None
+
+
+class ResultCollector:
+    """接收每个文件的处理结果：更新汇总、流式写出结果文件和清单详情"""
+
+    def __init__(self, output_dir, password_type, batch, generate_summary=True,
+                 report_formats=REPORT_FORMATS, resume=False):
+        self.stats = RunningStats()
+        self.summary = SummaryWriter(output_dir, password_type, batch, self.stats) if generate_summary else None
+        self.report = ResultReport(output_dir, report_formats, append=resume) if report_formats else None
+
+    def add(self, result):
+        self.stats.add(result)
+        if self.report is not None:
+            self.report.write(result)
+        if self.summary is not None:
+            self.summary.add(result)
+
+    def replay(self, result):
+        """恢复任务时重放已完成的结果，它们已写入之前的结果文件"""
+        self.stats.add(result)
+        if self.summary is not None:
+            self.summary.add(result)
+
+    def snapshot(self):
+        """持续运行时刷新结果文件并重新生成清单，之后仍可继续添加结果"""
+        if self.report is not None:
+            self.report.flush()
+        if self.summary is None or not self.stats.total:
+            return None
+        return self.summary.generate(final=False)
+
+    def finish(self):
+        if self.report is not None:
+            self.report.close()
+        if self.summary is None:
+            return None
+        if not self.stats.total:
+            self.summary.discard()
+            return None
+        return self.summary.generate()
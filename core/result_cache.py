@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import sqlite3
+from utils.file_utils import file_digest
+
+CACHE_FILENAME = ".pdf_unlock_cache.sqlite3"
+
+
+class ResultCache:
+    """持久化的处理结果索引，未变化且已处理过的文件无需再次打开"""
+
+    COMMIT_INTERVAL = 500
+
+    def __init__(self, db_path, settings_key="", use_hash=False,
+                 max_entries=200000, force=False):
+        self.db_path = str(db_path)
+        self.settings_key = settings_key
+        self.use_hash = use_hash
+        self.max_entries = max_entries
+        self.force = force
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._uncommitted = 0
+
+    def connect(self):
+        # 延迟到使用线程中再连接，sqlite3 连接不能跨线程使用
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    content_hash TEXT,
+                    settings_key TEXT NOT NULL,
+                    encrypted INTEGER,
+                    success INTEGER NOT NULL,
+                    output_file TEXT,
+                    record TEXT NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        return self._conn
+
+    def lookup(self, file_path, output_dir):
+        if self.force:
+            self.misses += 1
+            return None
+
+        row = None
+        try:
+            stat = os.stat(file_path)
+            row = self.connect().execute(
+                "SELECT size, mtime_ns, content_hash, settings_key, success, output_file, record "
+                "FROM results WHERE path = ?", (os.path.abspath(file_path),)
+            ).fetchone()
+        except OSError:
+            pass
+
+        if row is None or not self.is_reusable(row, stat, file_path, output_dir):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.touch(file_path)
+        record = json.loads(row[6])
+        record['cached'] = True
+        return record
+
+    def is_reusable(self, row, stat, file_path, output_dir):
+        size, mtime_ns, content_hash, settings_key, success, output_file, _ = row
+        if size != stat.st_size or mtime_ns != stat.st_mtime_ns:
+            return False
+        if settings_key != self.settings_key or not success:
+            return False
+        if output_file and output_file != "未生成" and not os.path.exists(os.path.join(output_dir, output_file)):
+            return False
+        if self.use_hash and content_hash != file_digest(file_path):
+            return False
+        return True
+
+    def touch(self, file_path):
+        self.connect().execute("UPDATE results SET last_used = ? WHERE path = ?",
+                               (time.time(), os.path.abspath(file_path)))
+        self.maybe_commit()
+
+    def store(self, result):
+        file_path = result['file_path']
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return
+        content_hash = file_digest(file_path) if self.use_hash else None
+        self.connect().execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns, content_hash,
+             self.settings_key, result.get('encrypted'), int(bool(result['success'])),
+             result['output_file'], json.dumps(result, ensure_ascii=False), time.time())
+        )
+        self.maybe_commit()
+
+    def maybe_commit(self):
+        self._uncommitted += 1
+        if self._uncommitted >= self.COMMIT_INTERVAL:
+            self._conn.commit()
+            self._uncommitted = 0
+
+    def evict(self):
+        conn = self.connect()
+        count = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM results WHERE path IN "
+                "(SELECT path FROM results ORDER BY last_used LIMIT ?)", (excess,))
+        return max(excess, 0)
+
+    def close(self):
+        if self._conn is None:
+            return
+        self.evict()
+        self._conn.commit()
+        self._conn.close()
+        self._conn = None
+        self._uncommitted = 0
@@ -0,0 +1,53 @@
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
+from utils.file_utils import iter_pdf_files
+
+
+class FolderScanWorker(QThread):
+    """在后台线程中扫描文件夹，分批发送找到的PDF文件及其大小"""
+    files_found = pyqtSignal(list, dict)
+    scan_progress = pyqtSignal(int)
+    scan_finished = pyqtSignal(int, bool)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, folder_path, include_subfolders=True, include_archives=False,
+                 chunk_size=500, flush_interval=0.3):
+        super().__init__()
+        self.folder_path = folder_path
+        self.include_subfolders = include_subfolders
+        self.include_archives = include_archives
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self.found_count = 0
+        self._is_running = True
+
+    def run(self):
+        chunk = {}
+        last_flush = time.monotonic()
+        try:
+            for file_path, size in iter_pdf_files(self.folder_path, self.include_subfolders, with_size=True,
+                                                  include_archives=self.include_archives):
+                if not self._is_running:
+                    break
+                chunk[file_path] = size
+                self.found_count += 1
+
+                # 按数量或时间间隔分批发送，既不阻塞界面也能及时显示结果
+                now = time.monotonic()
+                if len(chunk) >= self.chunk_size or now - last_flush >= self.flush_interval:
+                    self.flush(chunk)
+                    chunk = {}
+                    last_flush = now
+        except Exception as e:
+            self.error_occurred.emit(f"扫描文件夹时出错:\n{str(e)}")
+
+        self.flush(chunk)
+        self.scan_finished.emit(self.found_count, not self._is_running)
+
+    def flush(self, chunk):
+        if chunk:
+            self.files_found.emit(list(chunk), chunk)
+        self.scan_progress.emit(self.found_count)
+
+    def cancel(self):
+        self._is_running = False
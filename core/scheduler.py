@@ -0,0 +1,113 @@
+import heapq
+from core.pdf_io import input_size
+
+SCHEDULE_ORDERS = ("input", "largest_first", "smallest_first")
+SCHEDULE_ORDER_LABELS = {
+    'input': "按列表顺序",
+    'largest_first': "大文件优先（总用时最短）",
+    'smallest_first': "小文件优先（尽快看到结果）",
+}
+DEFAULT_SCHEDULE_ORDER = "input"
+
+
+class SizeScheduler:
+    """按文件大小安排处理顺序，并按内存预算限制同时处理的大文件
+
+    每个文件的内存占用按“文件大小 × 系数”估算，正在处理的文件估算总和不超过预算；
+    预算为 0 表示不限制。单个文件超过预算时仍会处理，但不与其他文件同时进行。
+    """
+
+    LOOKAHEAD = 64
+
+    def __init__(self, feed, order=DEFAULT_SCHEDULE_ORDER, memory_budget=0, memory_factor=2):
+        if order not in SCHEDULE_ORDERS:
+            raise ValueError(f"未知的处理顺序: {order}")
+        self.feed = feed
+        self.order = order
+        self.memory_budget = memory_budget
+        self.memory_factor = memory_factor
+        self.total_bytes = 0
+        self.queued_count = 0
+        self.in_flight_bytes = 0
+        self.exhausted = False
+        self._heap = []
+        self._sequence = 0
+        self._sizes = {}
+
+    def size_of(self, file_path):
+        size = self._sizes.get(file_path)
+        if size is None:
+            size = self.feed.sizes.get(file_path)
+            if size is None:
+                size = input_size(file_path)
+            self._sizes[file_path] = size
+        return size
+
+    def cost_of(self, file_path):
+        return self.size_of(file_path) * self.memory_factor
+
+    def next(self, timeout=None):
+        """返回下一个可以开始处理的文件
+
+        暂无文件或内存预算已满时返回 None，所有文件都已取出且输入已关闭时返回 feed.DONE。
+        """
+        if not self.exhausted:
+            self._pull(0 if self._heap else timeout)
+        if not self._heap:
+            return self.feed.DONE if self.exhausted else None
+
+        entry = self._pop_fitting()
+        if entry is None:
+            return None
+        file_path = entry[-1]
+        self.in_flight_bytes += self.cost_of(file_path)
+        return file_path
+
+    def finished(self, file_path):
+        self.in_flight_bytes = max(0, self.in_flight_bytes - self.cost_of(file_path))
+
+    @property
+    def pending_count(self):
+        return len(self._heap)
+
+    def _pull(self, timeout):
+        # 把输入队列中已有的文件全部移入堆中，之后追加的文件在下次调用时加入
+        file_path = self.feed.get(timeout)
+        while file_path is not None:
+            if file_path is self.feed.DONE:
+                self.exhausted = True
+                return
+            self._push(file_path)
+            file_path = self.feed.get(0)
+
+    def _push(self, file_path):
+        size = self.size_of(file_path)
+        self.total_bytes += size
+        self.queued_count += 1
+        self._sequence += 1
+        if self.order == "largest_first":
+            key = -size
+        elif self.order == "smallest_first":
+            key = size
+        else:
+            key = 0
+        heapq.heappush(self._heap, (key, self._sequence, file_path))
+
+    def _fits(self, file_path):
+        if not self.memory_budget or not self.in_flight_bytes:
+            return True
+        return self.in_flight_bytes + self.cost_of(file_path) <= self.memory_budget
+
+    def _pop_fitting(self):
+        """取出排在最前且放得进内存预算的文件，大文件等待时较小的文件可以先开始"""
+        skipped = []
+        entry = None
+        while self._heap and len(skipped) < self.LOOKAHEAD:
+            candidate = heapq.heappop(self._heap)
+            if self._fits(candidate[-1]):
+                entry = candidate
+                break
+            skipped.append(candidate)
+        for candidate in skipped:
+            heapq.heappush(self._heap, candidate)
+        return entry
@@ -0,0 +1,418 @@
+import os
+import json
+import time
+import shutil
+import secrets
+import tempfile
+import ipaddress
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, quote, unquote
+from core.pdf_utils import PDFUnlocker, error_result, unique_passwords, SAVE_PROFILES, DEFAULT_SAVE_PROFILE
+from core.pdf_io import DEFAULT_INPUT_MODE
+from utils.file_utils import is_pdf_file
+
+UPLOAD_NAME = "upload.pdf"
+OUTPUT_PREFIX = "unlocked_"
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+
+
+def _process_job(unlocker, file_path):
+    return unlocker.process_file(file_path)
+
+
+class ServiceFull(Exception):
+    """排队的任务已达上限"""
+
+
+class Job:
+    def __init__(self, job_id, job_dir, input_path, source):
+        self.id = job_id
+        self.dir = job_dir
+        self.input_path = input_path
+        self.source = source
+        self.created = time.time()
+        self.finished = None
+        self.future = None
+        self.result = None
+
+    @property
+    def state(self):
+        if self.result is not None:
+            return JOB_DONE
+        return JOB_RUNNING if self.future is not None and self.future.running() else JOB_QUEUED
+
+    @property
+    def output_path(self):
+        if self.result is None or not self.result['success'] or self.result['output_file'] == "未生成":
+            return None
+        return os.path.join(self.dir, self.result['output_file'])
+
+    def as_dict(self):
+        info = {'id': self.id, 'state': self.state, 'source': self.source,
+                'created': self.created, 'finished': self.finished}
+        if self.result is not None:
+            info.update({field: self.result.get(field) for field in
+                         ('status', 'success', 'message', 'encrypted', 'password_index', 'attempts',
+                          'file_size', 'bytes_written', 'duration')})
+            info['output'] = f"/jobs/{self.id}/output" if self.output_path else None
+        return info
+
+
+class UnlockService:
+    """本地解密服务的任务队列：固定数量的工作进程，排队任务有上限，满时拒绝新任务
+
+    每个任务有独立的工作目录，上传的文件和输出文件都保存在其中，
+    完成的任务保留 job_ttl 秒或直到被删除。
+    """
+
+    RATE_WINDOW = 60.0
+
+    def __init__(self, work_dir=None, workers=1, max_queue=16, default_passwords=(),
+                 save_profile=DEFAULT_SAVE_PROFILE, input_mode=DEFAULT_INPUT_MODE,
+                 allow_local_paths=False, max_upload_size=512 * 1024 * 1024, job_ttl=3600):
+        self._own_work_dir = work_dir is None
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix="pdf_unlock_service_")
+        os.makedirs(self.work_dir, exist_ok=True)
+        self.workers = max(1, int(workers))
+        self.max_queue = max(0, int(max_queue))
+        self.default_passwords = list(default_passwords)
+        self.save_profile = save_profile
+        self.input_mode = input_mode
+        self.allow_local_paths = allow_local_paths
+        self.max_upload_size = max_upload_size
+        self.job_ttl = job_ttl
+        self.start_time = time.perf_counter()
+        self.completed_count = 0
+        self.failed_count = 0
+        self.rejected_count = 0
+        self.bytes_processed = 0
+        self._jobs = {}
+        self._active = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    @property
+    def capacity(self):
+        """同时接受的任务数：正在处理的加上排队的"""
+        return self.workers + self.max_queue
+
+    def reserve(self):
+        """为新任务占一个位置，队列已满时抛出 ServiceFull"""
+        with self._lock:
+            if self._active >= self.capacity:
+                self.rejected_count += 1
+                raise ServiceFull()
+            self._active += 1
+
+    def release(self):
+        with self._lock:
+            self._active -= 1
+
+    def new_job_dir(self):
+        job_id = secrets.token_hex(8)
+        job_dir = os.path.join(self.work_dir, job_id)
+        os.makedirs(job_dir)
+        return job_id, job_dir
+
+    def submit(self, job_id, job_dir, input_path, passwords, source, save_profile=None):
+        """提交已占好位置的任务（见 reserve()）"""
+        passwords = unique_passwords(list(passwords) + self.default_passwords)
+        unlocker = PDFUnlocker(passwords, job_dir, OUTPUT_PREFIX, skip_unencrypted=False,
+                               password_type="两种密码都尝试", save_profile=save_profile or self.save_profile,
+                               input_mode=self.input_mode)
+        job = Job(job_id, job_dir, input_path, source)
+        with self._lock:
+            try:
+                job.future = self._executor.submit(_process_job, unlocker, input_path)
+            except BrokenProcessPool:
+                # 工作进程异常退出后进程池不可再用，换一个新的；在锁内替换，并发的请求不会各自新建进程池
+                self._executor.shutdown(wait=False)
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                job.future = self._executor.submit(_process_job, unlocker, input_path)
+            self._jobs[job_id] = job
+        job.future.add_done_callback(lambda future: self._finish(job, future))
+        return job
+
+    def _finish(self, job, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            result = error_result(job.input_path, e)
+        with self._lock:
+            job.result = result
+            job.finished = time.time()
+            self._active -= 1
+            self.completed_count += 1
+            self.failed_count += 0 if result['success'] else 1
+            self.bytes_processed += result.get('file_size', 0)
+            self._recent.append((time.perf_counter(), result.get('file_size', 0)))
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def delete(self, job_id):
+        """删除已完成的任务及其文件，任务不存在或尚未完成时返回 False"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.result is None:
+                return False
+            del self._jobs[job_id]
+        shutil.rmtree(job.dir, ignore_errors=True)
+        return True
+
+    def expire(self):
+        """清理超过保留时间的已完成任务"""
+        deadline = time.time() - self.job_ttl
+        with self._lock:
+            expired = [job for job in self._jobs.values() if job.finished is not None and job.finished < deadline]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            shutil.rmtree(job.dir, ignore_errors=True)
+        return len(expired)
+
+    def metrics(self):
+        now = time.perf_counter()
+        with self._lock:
+            while self._recent and now - self._recent[0][0] > self.RATE_WINDOW:
+                self._recent.popleft()
+            # 进程池会预先把少量任务放入调用队列，它们也被标记为运行中
+            running = min(self.workers, sum(1 for job in self._jobs.values() if job.state == JOB_RUNNING))
+            elapsed = max(now - self.start_time, 1e-9)
+            window = min(self.RATE_WINDOW, elapsed)
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'active': self._active,
+                'running': running,
+                'queued': self._active - running,
+                'jobs_retained': len(self._jobs),
+                'completed': self.completed_count,
+                'failed': self.failed_count,
+                'rejected': self.rejected_count,
+                'uptime_seconds': round(elapsed, 1),
+                'files_per_second': round(self.completed_count / elapsed, 3),
+                'megabytes_per_second': round(self.bytes_processed / elapsed / (1024 * 1024), 3),
+                'recent_files_per_second': round(len(self._recent) / window, 3),
+                'recent_megabytes_per_second': round(sum(size for _, size in self._recent) / window
+                                                     / (1024 * 1024), 3),
+            }
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if self._own_work_dir:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+class UnlockRequestHandler(BaseHTTPRequestHandler):
+    """HTTP 接口
+
+    POST   /jobs              提交任务：请求体为PDF（密码放在 X-PDF-Password 头中，文件名可放在 X-Filename 头中），
+                              或 JSON {"path": 本地路径, "password": 字符串, "passwords": [字符串, ...]}
+                              （按本地路径提交需开启 allow_local_paths）
+    GET    /jobs/<id>         任务状态和结果
+    GET    /jobs/<id>/output  下载解密后的文件
+    DELETE /jobs/<id>         删除已完成的任务及其文件
+    GET    /metrics           吞吐量和队列深度
+    """
+
+    server_version = "PDFUnlockService/1.0"
+    COPY_CHUNK_SIZE = 1024 * 1024
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        parts = self.path_parts()
+        if parts == ["metrics"]:
+            return self.send_json(200, self.service.metrics())
+        if parts == ["health"]:
+            return self.send_json(200, {'status': "ok"})
+        if len(parts) in (2, 3) and parts[0] == "jobs":
+            self.service.expire()
+            job = self.service.get(parts[1])
+            if job is None:
+                return self.send_error_json(404, "任务不存在或已过期")
+            if len(parts) == 2:
+                return self.send_json(200, job.as_dict())
+            if parts[2] == "output":
+                return self.send_output(job)
+        self.send_error_json(404, "未知的接口")
+
+    def do_DELETE(self):
+        parts = self.path_parts()
+        if len(parts) == 2 and parts[0] == "jobs":
+            job = self.service.get(parts[1])
+            if job is None:
+                return self.send_error_json(404, "任务不存在或已过期")
+            if not self.service.delete(parts[1]):
+                return self.send_error_json(409, "任务尚未完成")
+            return self.send_json(200, {'id': parts[1], 'deleted': True})
+        self.send_error_json(404, "未知的接口")
+
+    def do_POST(self):
+        if self.path_parts() != ["jobs"]:
+            return self.send_error_json(404, "未知的接口")
+        length = self.headers.get("Content-Length")
+        if length is None:
+            return self.send_error_json(411, "需要 Content-Length")
+        try:
+            length = int(length)
+        except ValueError:
+            return self.send_error_json(400, "Content-Length 无效")
+        if length > self.service.max_upload_size:
+            return self.send_error_json(413, f"上传文件超过 {self.service.max_upload_size} 字节的上限")
+
+        self.service.expire()
+        try:
+            self.service.reserve()
+        except ServiceFull:
+            # 不读取请求体直接拒绝，并关闭连接，客户端稍后重试
+            self.close_connection = True
+            return self.send_error_json(429, "任务队列已满，请稍后重试", {"Retry-After": "1"})
+
+        submitted = False
+        try:
+            if self.headers.get_content_type() == "application/json":
+                submitted = self.submit_path(length)
+            else:
+                submitted = self.submit_upload(length)
+        finally:
+            if not submitted:
+                self.service.release()
+
+    def submit_path(self, length):
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self.send_error_json(400, "请求体不是有效的 JSON")
+            return False
+        if not isinstance(request, dict):
+            self.send_error_json(400, "请求体应为 JSON 对象")
+            return False
+        if not self.service.allow_local_paths:
+            self.send_error_json(403, "服务未允许按本地路径提交文件")
+            return False
+        file_path = request.get("path")
+        if not isinstance(file_path, str) or not os.path.isfile(file_path):
+            self.send_error_json(400, "path 不是存在的文件")
+            return False
+        passwords = request.get("passwords")
+        if passwords is None:
+            passwords = []
+        if not isinstance(passwords, list) or not all(isinstance(item, str) for item in passwords):
+            self.send_error_json(400, "passwords 应为字符串数组")
+            return False
+        password = request.get("password")
+        if password is not None and not isinstance(password, str):
+            self.send_error_json(400, "password 应为字符串")
+            return False
+        if password:
+            passwords = [password] + passwords
+        save_profile = request.get("save_profile")
+        if save_profile is not None and save_profile not in SAVE_PROFILES:
+            self.send_error_json(400, f"未知的保存方式: {save_profile}")
+            return False
+
+        job_id, job_dir = self.service.new_job_dir()
+        job = self.service.submit(job_id, job_dir, os.path.abspath(file_path), passwords,
+                                  os.path.abspath(file_path), save_profile)
+        self.send_json(202, job.as_dict(), {"Location": f"/jobs/{job.id}"})
+        return True
+
+    def submit_upload(self, length):
+        save_profile = self.headers.get("X-Save-Profile")
+        if save_profile is not None and save_profile not in SAVE_PROFILES:
+            self.send_error_json(400, f"未知的保存方式: {save_profile}")
+            return False
+        # 非 ASCII 文件名按 URL 编码放在 X-Filename 头中
+        filename = os.path.basename(unquote(self.headers.get("X-Filename") or "")) or UPLOAD_NAME
+        if not is_pdf_file(filename):
+            filename += ".pdf"
+        job_id, job_dir = self.service.new_job_dir()
+        input_path = os.path.join(job_dir, filename)
+        try:
+            # 边接收边写入文件，内存占用与上传大小无关
+            remaining = length
+            with open(input_path, 'wb') as f:
+                while remaining:
+                    chunk = self.rfile.read(min(self.COPY_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise ConnectionError("上传未完成连接即断开")
+                    f.write(chunk)
+                    remaining -= len(chunk)
+        except (OSError, ConnectionError):
+            shutil.rmtree(job_dir, ignore_errors=True)
+            self.close_connection = True
+            return False
+
+        password = self.headers.get("X-PDF-Password")
+        job = self.service.submit(job_id, job_dir, input_path, [password] if password else [],
+                                  filename, save_profile)
+        self.send_json(202, job.as_dict(), {"Location": f"/jobs/{job.id}"})
+        return True
+
+    def send_output(self, job):
+        if job.result is None:
+            return self.send_error_json(409, "任务尚未完成")
+        output_path = job.output_path
+        if output_path is None or not os.path.isfile(output_path):
+            return self.send_error_json(404, f"没有输出文件: {job.result['message']}")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(os.path.getsize(output_path)))
+        self.send_header("Content-Disposition",
+                         f"attachment; filename*=UTF-8''{quote(os.path.basename(job.result['output_file']))}")
+        self.end_headers()
+        with open(output_path, 'rb') as f:
+            shutil.copyfileobj(f, self.wfile, self.COPY_CHUNK_SIZE)
+
+    def path_parts(self):
+        return [part for part in urlsplit(self.path).path.split("/") if part]
+
+    def send_json(self, code, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, code, message, headers=None):
+        self.send_json(code, {'error': message}, headers)
+
+
+class UnlockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service, quiet=False):
+        super().__init__(address, UnlockRequestHandler)
+        # 服务没有身份验证，允许按本机路径提交时其他机器也能借此读取并下载本机的任意PDF
+        if service.allow_local_paths and not is_loopback(self.server_address[0]):
+            self.server_close()
+            raise ValueError("允许按本机路径提交文件时服务只能监听本机地址（如 127.0.0.1）")
+        self.service = service
+        self.quiet = quiet
+
+
+def is_loopback(host):
+    try:
+        return ipaddress.ip_address(host.split('%')[0]).is_loopback
+    except ValueError:
+        return False
@@ -0,0 +1,256 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from datetime import datetime
+from core.pdf_io import atomic_output, ARCHIVE_OUTPUT_LABELS
+from core.pdf_utils import (STATUS_SKIPPED, STATUS_TIMEOUT, STATUS_RESOURCE_LIMIT, STATUS_VERIFY_FAILED,
+                            SAVE_PROFILE_LABELS)
+from core.verifier import describe_verify_spec
+from utils.string_utils import format_file_size
+
+SUMMARY_FILENAME = "已解锁文件清单.txt"
+
+STAGE_LABELS = {
+    'read': "整块读取输入",
+    'open': "解析/校验密码",
+    'save': "解密并保存",
+    'write': "后台写出",
+    'copy': "复制未加密文件",
+    'verify': "保存后校验（后台）",
+}
+
+PIPELINE_STAGE_LABELS = {
+    'read': "读取（预读跟不上解密）",
+    'decrypt': "解密",
+    'write': "写出（写出队列经常满）",
+}
+
+
+class SummaryWriter:
+    """生成“已解锁文件清单.txt”处理结果清单
+
+    文件详情在处理过程中逐条写入临时文件，统计信息来自运行中的汇总数据，
+    因此生成清单所需内存不随文件数量增长。
+    """
+
+    def __init__(self, output_dir, password_type, batch, stats):
+        self.output_dir = Path(output_dir)
+        self.password_type = password_type
+        self.batch = batch
+        self.stats = stats
+        self.details_path = None
+        self.failed_path = None
+        self._details = None
+        self._failed = None
+        self._detail_count = 0
+
+    def add(self, result):
+        if self._details is None:
+            # 每次运行各用一组临时文件，共用输出目录的多个运行互不覆盖
+            self._details = self.open_section(".summary_details_")
+            self.details_path = Path(self._details.name)
+            self._failed = self.open_section(".summary_failed_")
+            self.failed_path = Path(self._failed.name)
+
+        self._detail_count += 1
+        self.write_file_detail(self._details, self._detail_count, result)
+        if not result['success']:
+            self._failed.write(f"   - {result['original_file']}: {result['message']}\n")
+
+    def generate(self, final=True):
+        """生成清单；final 为 False 时只是中途快照，之后仍可继续添加结果"""
+        summary_path = self.output_dir / SUMMARY_FILENAME
+        if final:
+            self.close_sections()
+        else:
+            self.flush_sections()
+        # 先写临时文件再替换，定期重新生成时读取方不会看到写了一半的清单
+        atomic_output(summary_path, lambda temp_path: self.write_summary(temp_path, final))
+
+        if final:
+            self.discard()
+        return str(summary_path)
+
+    def write_summary(self, path, final=True):
+        with open(path, 'w', encoding='utf-8') as f:
+            self.write_summary_header(f)
+            self.write_statistics(f)
+            self.write_stage_statistics(f)
+            self.write_archive_statistics(f)
+            f.write("📁 文件处理详情:\n\n")
+            self.copy_section(self.details_path, f)
+            if self.stats.failed:
+                f.write("⚠️ 失败文件列表:\n")
+                self.copy_section(self.failed_path, f)
+                f.write("\n")
+            f.write("=" * 60 + "\n")
+            f.write("处理完成！\n" if final else "持续处理中，清单会定期更新\n")
+            f.write("=" * 60 + "\n")
+
+    def flush_sections(self):
+        for section in (self._details, self._failed):
+            if section is not None:
+                section.flush()
+
+    def close_sections(self):
+        for section in (self._details, self._failed):
+            if section is not None:
+                section.close()
+        self._details = None
+        self._failed = None
+
+    def open_section(self, prefix):
+        return tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=self.output_dir,
+                                           prefix=prefix, suffix=".tmp", delete=False)
+
+    def copy_section(self, section_path, file):
+        if section_path is not None and section_path.exists():
+            with open(section_path, 'r', encoding='utf-8') as section:
+                shutil.copyfileobj(section, file)
+
+    def discard(self):
+        self.close_sections()
+        for section_path in (self.details_path, self.failed_path):
+            if section_path is not None and section_path.exists():
+                os.remove(section_path)
+        self.details_path = None
+        self.failed_path = None
+
+    def write_summary_header(self, file):
+        file.write("=" * 60 + "\n")
+        file.write("移除PDF密码工具 - 处理结果清单\n")
+        file.write("=" * 60 + "\n\n")
+        file.write(f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        file.write(f"输出目录: {self.output_dir}\n")
+        file.write(f"处理文件总数: {self.stats.total}\n")
+        file.write(f"密码类型: {self.password_type}\n")
+        file.write(f"候选密码数: {self.batch.ranker.candidate_count}\n")
+        file.write(f"保存方式: {SAVE_PROFILE_LABELS[self.batch.unlocker.save_profile]}"
+                   f"{'，保留原有权限限制' if self.batch.unlocker.preserve_restrictions else ''}\n\n")
+
+    def write_statistics(self, file):
+        stats = self.stats
+
+        file.write("📊 处理统计:\n")
+        file.write(f"  成功处理: {stats.successful} 个文件\n")
+        file.write(f"  处理失败: {stats.failed} 个文件\n")
+        file.write(f"  跳过文件: {stats.skipped} 个文件\n")
+        if stats.status_counts[STATUS_TIMEOUT]:
+            file.write(f"  处理超时: {stats.status_counts[STATUS_TIMEOUT]} 个文件\n")
+        if stats.status_counts[STATUS_RESOURCE_LIMIT]:
+            file.write(f"  超出内存上限: {stats.status_counts[STATUS_RESOURCE_LIMIT]} 个文件\n")
+        verifier = self.batch.verifier
+        if verifier is not None:
+            file.write(f"  保存后校验: 校验 {verifier.verified + verifier.failed} 个输出，"
+                       f"未通过 {verifier.failed} 个（{describe_verify_spec(self.batch.verify)}）\n")
+        file.write(f"  PDF解析次数: {stats.open_count} 次 "
+                   f"(平均 {stats.open_count / max(stats.total, 1):.2f} 次/文件)\n")
+        self.write_password_statistics(file)
+        if self.batch.cache is not None:
+            cache = self.batch.cache
+            file.write(f"  增量缓存: 命中 {cache.hits} 个，未命中 {cache.misses} 个\n")
+        if self.batch.dedup is not None:
+            dedup = self.batch.dedup
+            links = "，".join(f"{method} {count} 个" for method, count in dedup.link_counts.items())
+            file.write(f"  内容去重: {dedup.duplicate_count} 个重复文件，节省处理 {format_file_size(dedup.saved_bytes)}"
+                       f"{f'（输出: {links}）' if links else ''}\n")
+        file.write(f"  并行进程: {self.batch.workers} 个\n")
+        file.write(f"  总用时: {self.batch.elapsed:.2f} 秒\n")
+        file.write(f"  处理速度: {self.batch.files_per_second:.2f} 个文件/秒，"
+                   f"{self.batch.megabytes_per_second:.2f} MB/秒\n")
+        file.write("-" * 60 + "\n\n")
+
+    def write_stage_statistics(self, file):
+        stats = self.stats
+        stage_total = sum(stats.stage_times.values())
+        if not stage_total:
+            return
+
+        # 多进程时各阶段耗时为所有进程之和，可能超过总用时
+        file.write("⏱️ 阶段耗时:\n")
+        for stage, seconds in stats.stage_times.items():
+            file.write(f"  {STAGE_LABELS[stage]}: {seconds:.2f} 秒 ({seconds / stage_total:.1%})\n")
+        file.write(f"  读取数据: {format_file_size(stats.bytes_in)}，"
+                   f"写出数据: {format_file_size(stats.bytes_out)}\n")
+        writer = self.batch.writer
+        if writer is not None:
+            file.write(f"  写出队列: 共写出 {format_file_size(writer.bytes_written)}，用时 {writer.write_time:.2f} 秒，"
+                       f"等待写出队列 {writer.wait_time:.2f} 秒\n")
+        self.write_pipeline_statistics(file)
+        if self.batch.verifier is not None:
+            file.write(f"  校验队列: 等待校验队列 {self.batch.verifier.wait_time:.2f} 秒\n")
+        if stats.unlocked_bytes_in:
+            file.write(f"  已解密文件体积: 原文件的 {stats.unlocked_bytes_out / stats.unlocked_bytes_in:.1%}\n")
+
+        file.write(f"  最慢的 {len(stats.slowest)} 个文件:\n")
+        for duration, file_path in stats.slowest:
+            file.write(f"    {duration:.3f} 秒  {file_path}\n")
+        file.write("-" * 60 + "\n\n")
+
+    def write_pipeline_statistics(self, file):
+        status = self.batch.pipeline_status()
+        if status is None:
+            return
+        if 'read' in status:
+            read = status['read']
+            file.write(f"  预读队列: 深度 {read['depth']}，平均 {read['average_queued']:.2f} 个，"
+                       f"峰值 {read['peak_queued']} 个，读取 {read['read_seconds']:.2f} 秒，"
+                       f"解密等待读取 {read['wait_seconds']:.2f} 秒，等待内存额度 {read['stall_seconds']:.2f} 秒\n")
+        if 'write' in status:
+            write = status['write']
+            file.write(f"  写出队列占用: 深度 {write['depth']}，平均 {write['average_queued']:.2f} 个，"
+                       f"峰值 {write['peak_queued']} 个\n")
+        file.write(f"  缓冲数据: 峰值 {format_file_size(status['peak_buffered_bytes'])}，"
+                   f"上限 {format_file_size(status['memory_limit'])}；"
+                   f"瓶颈: {PIPELINE_STAGE_LABELS[status['bottleneck']]}\n")
+
+    def write_archive_statistics(self, file):
+        if not self.stats.archives:
+            return
+        file.write("📦 压缩包:\n")
+        file.write(f"  输出方式: {ARCHIVE_OUTPUT_LABELS[self.batch.unlocker.archive_output]}\n")
+        for archive_path, (total, succeeded) in self.stats.archives.items():
+            file.write(f"  {archive_path}: {total} 个PDF，成功 {succeeded} 个，失败 {total - succeeded} 个\n")
+        file.write("-" * 60 + "\n\n")
+
+    def write_password_statistics(self, file):
+        if not self.stats.tried_files:
+            return
+        file.write(f"  平均尝试密码: {self.stats.average_attempts:.2f} 次/加密文件\n")
+        key_cache = self.stats.key_cache
+        if key_cache:
+            file.write(f"  加密字典缓存: 命中 {key_cache['hit']} 个，未命中 {key_cache['miss']} 个"
+                       f"（命中率 {self.stats.key_cache_hit_rate:.1%}）\n")
+
+        hits = self.batch.ranker.hits
+        if len(hits) > 1:
+            used = ", ".join(f"#{i + 1}: {count}" for i, count in enumerate(hits) if count)
+            file.write(f"  候选密码命中: {used or '无'}\n")
+
+    def write_file_detail(self, file, index, result):
+        status = self.get_status_icon(result)
+        file.write(f"{index}. {result['original_file']}\n")
+        file.write(f"   状态: {status}\n")
+        file.write(f"   结果: {result['message']}{'（缓存）' if result.get('cached') else ''}\n")
+        if result.get('dedup_of'):
+            file.write(f"   内容重复: 与 {result['dedup_of']} 相同，未重复解密"
+                       f"{'，输出方式: ' + result['dedup_link'] if result.get('dedup_link') else ''}\n")
+        if result['output_file'] != "未生成":
+            file.write(f"   输出文件: {result['output_file']}\n")
+        if result.get('password_index') is not None:
+            file.write(f"   使用密码: 候选密码 #{result['password_index'] + 1} "
+                       f"(尝试 {result['attempts']} 次)\n")
+        file.write(f"   文件大小: {format_file_size(result['file_size'])}\n")
+        file.write(f"   处理时间: {result['timestamp']}\n\n")
+
+    def get_status_icon(self, result):
+        if result['status'] == STATUS_SKIPPED:
+            return "⏭️ 跳过"
+        if result['status'] == STATUS_TIMEOUT:
+            return "⏱️ 超时"
+        if result['status'] == STATUS_RESOURCE_LIMIT:
+            return "🧱 超出内存上限"
+        if result['status'] == STATUS_VERIFY_FAILED:
+            return "⚠️ 输出校验失败"
+        return "✅ 成功" if result['success'] else "❌ 失败"
@@ -0,0 +1,165 @@
+import os
+import sys
+import time
+import signal
+import multiprocessing
+from multiprocessing.connection import wait
+from core.pdf_utils import (build_result, error_result, STATUS_ERROR, STATUS_TIMEOUT,
+                            STATUS_RESOURCE_LIMIT)
+
+try:
+    _PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+# 进程内存通过 /proc/<pid>/statm 读取，其他平台无法限制单个工作进程的内存
+MEMORY_LIMIT_SUPPORTED = sys.platform.startswith("linux")
+
+
+def _supervised_worker(unlocker, conn):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        file_path, password_order = task
+        try:
+            result = unlocker.process_file(file_path, password_order)
+        except MemoryError:
+            result = build_result(file_path, STATUS_RESOURCE_LIMIT, "内存不足，无法处理")
+        except Exception as e:
+            result = error_result(file_path, e)
+        conn.send(result)
+
+
+def process_rss(pid):
+    """读取进程当前的常驻内存（字节），不支持的平台返回 None"""
+    try:
+        with open(f"/proc/{pid}/statm", 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class _WorkerProcess:
+    def __init__(self, unlocker):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_supervised_worker, args=(unlocker, child_conn),
+                                               daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.file_path = None
+        self.started = 0.0
+
+    @property
+    def busy(self):
+        return self.file_path is not None
+
+    def submit(self, file_path, password_order):
+        self.conn.send((file_path, password_order))
+        self.file_path = file_path
+        self.started = time.perf_counter()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class SupervisedPool:
+    """受监控的工作进程池：每个进程同一时间只处理一个文件
+
+    文件处理超过时间限制或进程内存超过上限时直接终止该进程并换用新进程，
+    记录为 timeout / resource_limit 结果，其余文件继续处理。
+    工作进程意外退出（如 qpdf 崩溃）时该文件记录为错误，同样不影响其他文件。
+    内存上限通过 /proc 读取，目前仅在 Linux 上生效。
+    """
+
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, unlocker, workers=1, timeout=0, memory_limit=0):
+        self.unlocker = unlocker
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.killed_count = 0
+        self._processes = []
+
+    @property
+    def busy_count(self):
+        return sum(1 for worker in self._processes if worker.busy)
+
+    @property
+    def has_idle(self):
+        return self.busy_count < self.workers
+
+    def submit(self, file_path, password_order):
+        worker = next((w for w in self._processes if not w.busy), None)
+        if worker is None:
+            worker = _WorkerProcess(self.unlocker)
+            self._processes.append(worker)
+        worker.submit(file_path, password_order)
+
+    def poll(self, timeout=None):
+        """等待已完成或被终止的文件，返回其结果列表"""
+        busy = [worker for worker in self._processes if worker.busy]
+        if not busy:
+            return []
+        wait_time = self.POLL_INTERVAL if timeout is None else min(timeout, self.POLL_INTERVAL)
+        ready = wait([worker.conn for worker in busy], timeout=wait_time)
+
+        results = []
+        for worker in busy:
+            if worker.conn in ready:
+                try:
+                    results.append(worker.conn.recv())
+                    worker.file_path = None
+                except (EOFError, OSError):
+                    worker.process.join(timeout=1)
+                    results.append(self._replace(worker, STATUS_ERROR,
+                                                 f"工作进程异常退出（退出码 {worker.process.exitcode}）"))
+                continue
+            elapsed = time.perf_counter() - worker.started
+            if self.timeout and elapsed > self.timeout:
+                results.append(self._replace(worker, STATUS_TIMEOUT,
+                                             f"处理超时（超过 {self.timeout:g} 秒），已终止"))
+            elif self.memory_limit:
+                rss = process_rss(worker.process.pid)
+                if rss is not None and rss > self.memory_limit:
+                    results.append(self._replace(
+                        worker, STATUS_RESOURCE_LIMIT,
+                        f"内存占用超过 {self.memory_limit / 1024 / 1024:.0f} MB，已终止"))
+        return results
+
+    def _replace(self, worker, status, message):
+        file_path = worker.file_path
+        duration = time.perf_counter() - worker.started
+        worker.kill()
+        self._processes.remove(worker)
+        self.killed_count += 1
+        filename = os.path.basename(file_path)
+        return build_result(file_path, status, message, error=f"{filename}: {message}",
+                            duration=duration)
+
+    def shutdown(self, kill=False):
+        """关闭所有工作进程；kill 为 True 时不等待正在处理的文件"""
+        for worker in self._processes:
+            if kill and worker.busy:
+                worker.kill()
+            else:
+                worker.close()
+        self._processes = []
@@ -0,0 +1,188 @@
+import io
+import time
+import threading
+from collections import deque
+from core.pdf_utils import STATUS_UNLOCKED, load_pikepdf, verify_failed
+
+VERIFY_ALL = "all"
+# 界面中可选的抽样设置，None 表示不校验
+VERIFY_SAMPLE_LABELS = {
+    None: "不校验",
+    VERIFY_ALL: "校验全部输出",
+    "10": "每 10 个输出抽查 1 个",
+    "10%": "抽查 10% 的输出",
+}
+
+
+def parse_verify_spec(spec):
+    """解析抽样设置，返回 (每 N 个抽 1 个, 抽查百分比)，两者只有一个不为 None
+
+    "all" 表示全部校验，"10" 表示每 10 个输出抽查 1 个，"25%" 表示抽查 25% 的输出。
+    """
+    text = str(spec).strip().lower()
+    try:
+        if text == VERIFY_ALL:
+            return 1, None
+        if text.endswith("%"):
+            percent = float(text[:-1])
+            if 0 < percent <= 100:
+                return None, percent
+        else:
+            every = int(text)
+            if every >= 1:
+                return every, None
+    except ValueError:
+        pass
+    raise ValueError(f"无效的校验抽样设置: {spec}（可用 all、每 N 个抽 1 个的 N 或百分比如 10%）")
+
+
+def describe_verify_spec(spec):
+    every, percent = parse_verify_spec(spec)
+    if percent is not None:
+        return f"抽查 {percent:g}%"
+    return "全部校验" if every == 1 else f"每 {every} 个抽查 1 个"
+
+
+class VerifySampler:
+    """按抽样设置决定哪些输出需要校验，第一个输出总是校验"""
+
+    def __init__(self, spec=VERIFY_ALL):
+        self.every, self.percent = parse_verify_spec(spec)
+        self._count = 0
+        # 百分比抽样时每个输出累积 percent 点，满 100 点抽查一个，抽查数量均匀分布
+        self._credit = 100.0
+
+    def take(self):
+        if self.percent is None:
+            selected = self._count % self.every == 0
+            self._count += 1
+            return selected
+        selected = self._credit >= 100
+        if selected:
+            self._credit -= 100
+        self._credit += self.percent
+        return selected
+
+
+def verify_output(source, expected_pages=None, allow_encryption=False):
+    """不用密码重新打开输出，检查加密字典、页数和结构告警；通过时返回 None，否则返回失败原因
+
+    source 为输出文件路径或输出数据；allow_encryption 为 True 时（保留权限限制）允许输出仍带有
+    /Encrypt，但必须不用密码就能打开。
+    """
+    pikepdf = load_pikepdf()
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    try:
+        with pikepdf.open(source) as pdf:
+            if not allow_encryption and (pdf.is_encrypted or '/Encrypt' in pdf.trailer):
+                return "输出仍带有加密字典 /Encrypt"
+            page_count = len(pdf.pages)
+            # qpdf 修复损坏的交叉引用表等问题时只告警不报错，截断或写坏的输出由此发现
+            warnings = pdf.get_warnings()
+    except pikepdf.PasswordError:
+        return "输出仍需要密码才能打开"
+    except Exception as e:
+        return f"无法重新打开输出: {str(e)}"
+    if expected_pages is not None and page_count != expected_pages:
+        return f"页数不一致，原文件 {expected_pages} 页，输出 {page_count} 页"
+    if warnings:
+        return f"输出结构损坏: {warnings[0]}"
+    return None
+
+
+class OutputVerifier:
+    """后台线程在输出保存后重新打开并校验，校验与后续文件的解密同时进行
+
+    与 WriteBehindQueue 相同：队列满时 submit() 阻塞等待（计入 wait_time），
+    completed()/drain() 在校验完成后才交回结果，任务日志和缓存因此记录的是校验后的状态。
+    """
+
+    def __init__(self, spec=VERIFY_ALL, max_pending=8, allow_encryption=False):
+        self.sampler = VerifySampler(spec)
+        self.max_pending = max(1, max_pending)
+        self.allow_encryption = allow_encryption
+        self.verified = 0
+        self.failed = 0
+        self.verify_time = 0.0
+        self.wait_time = 0.0
+        self._queue = deque()
+        self._done = deque()
+        self._pending = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="pdf-verify", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def wants(self, result):
+        """是否校验该结果：只抽查本次重新保存的输出，缓存结果和内容重复的副本不校验"""
+        if result['status'] != STATUS_UNLOCKED or result.get('cached') or result.get('dedup_of'):
+            return False
+        return self.sampler.take()
+
+    def submit(self, source, result):
+        """source 为输出文件路径，写入输出ZIP的成员为其数据"""
+        start = time.perf_counter()
+        with self._condition:
+            while self._pending >= self.max_pending:
+                self._condition.wait()
+            self._queue.append((source, result))
+            self._pending += 1
+            self._condition.notify_all()
+        self.wait_time += time.perf_counter() - start
+
+    def completed(self):
+        """取出已校验的结果列表，不阻塞"""
+        results = []
+        while self._done:
+            results.append(self._done.popleft())
+        return results
+
+    def drain(self):
+        """等待队列中的输出全部校验完，返回剩余的结果"""
+        start = time.perf_counter()
+        with self._condition:
+            while self._pending:
+                self._condition.wait()
+        self.wait_time += time.perf_counter() - start
+        return self.completed()
+
+    def close(self):
+        if self._closed:
+            return self.completed()
+        results = self.drain()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        return results
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                source, result = self._queue.popleft()
+
+            start = time.perf_counter()
+            reason = verify_output(source, result.get('page_count'), self.allow_encryption)
+            elapsed = time.perf_counter() - start
+            result['verify_time'] = elapsed
+            result['verified'] = reason is None
+            self.verify_time += elapsed
+            if reason is None:
+                self.verified += 1
+            else:
+                self.failed += 1
+                verify_failed(result, reason)
+
+            with self._condition:
+                self._done.append(result)
+                self._pending -= 1
+                self._condition.notify_all()
@@ -0,0 +1,316 @@
+import os
+import sys
+import time
+import struct
+import select
+import threading
+from utils.file_utils import is_pdf_file
+
+# inotify 事件掩码（见 <sys/inotify.h>）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    """通过 ctypes 调用 Linux inotify，只在目录变化时唤醒，无需反复扫描"""
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._get_errno = ctypes.get_errno
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = self._get_errno()
+            raise OSError(errno, f"inotify 初始化失败: {os.strerror(errno)}")
+        self._folders = {}
+        self.folders = set()
+
+    def add_watch(self, folder):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+        if wd < 0:
+            errno = self._get_errno()
+            raise OSError(errno, os.strerror(errno), folder)
+        self._folders[wd] = folder
+        self.folders.add(folder)
+
+    def read(self, timeout):
+        """等待事件，返回 (路径, 掩码) 列表；队列溢出时路径为 None"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += _EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                events.append((None, mask))
+            elif mask & IN_IGNORED:
+                self.folders.discard(self._folders.pop(wd, None))
+            elif wd in self._folders:
+                folder = self._folders[wd]
+                events.append((os.path.join(folder, os.fsdecode(name)) if name else folder, mask))
+        return events
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class FolderWatcher:
+    """监视文件夹中新增或修改的PDF，文件停止变化后才交给处理
+
+    Linux 上使用 inotify 接收目录事件，并每隔 rescan_interval 秒完整扫描一次作为兜底；
+    其他平台或 inotify 不可用时每隔 poll_interval 秒扫描一次。
+    文件大小和修改时间在 settle_time 秒内不再变化才视为写入完成。
+    """
+
+    CHECK_INTERVAL = 0.25
+
+    def __init__(self, folders, include_subfolders=True, exclude=(), settle_time=2.0,
+                 poll_interval=2.0, rescan_interval=60.0, use_inotify=True):
+        self.folders = [os.path.abspath(folder) for folder in folders]
+        self.include_subfolders = include_subfolders
+        self.exclude = {os.path.abspath(path) for path in exclude}
+        self.settle_time = settle_time
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.use_inotify = use_inotify and sys.platform.startswith("linux")
+        self.backend = None
+        self._inotify = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        # 路径 -> (大小, 修改时间, 最后一次变化的时间)
+        self._candidates = {}
+        # 已交给处理和已处理完的文件：路径 -> (大小, 修改时间)
+        self._queued = {}
+        self._processed = {}
+        self._changed = []
+
+    def run(self, on_ready):
+        """阻塞运行直到 stop()，写入完成的文件以 on_ready(路径列表, {路径: 大小}) 回调"""
+        self._open_backend()
+        interval = self.rescan_interval if self._inotify is not None else self.poll_interval
+        try:
+            self._scan()
+            next_scan = time.monotonic() + interval
+            while not self._stop.is_set():
+                now = time.monotonic()
+                timeout = max(0.0, next_scan - now)
+                if self._candidates:
+                    timeout = min(timeout, self.CHECK_INTERVAL)
+                if self._inotify is not None:
+                    self._handle_events(self._inotify.read(min(timeout, 1.0)))
+                else:
+                    self._stop.wait(timeout)
+
+                with self._lock:
+                    changed, self._changed = self._changed, []
+                for file_path in changed:
+                    self._observe(file_path, self._signature(file_path))
+
+                now = time.monotonic()
+                if now >= next_scan:
+                    self._scan()
+                    next_scan = now + interval
+                ready = self._settled(now)
+                if ready and not self._stop.is_set():
+                    on_ready(list(ready), ready)
+        finally:
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
+
+    def stop(self):
+        self._stop.set()
+
+    def done(self, file_path):
+        """文件处理完成；处理期间文件又被修改时重新等待它稳定"""
+        with self._lock:
+            signature = self._queued.pop(file_path, None)
+            if signature is None:
+                return
+            self._processed[file_path] = signature
+            self._changed.append(file_path)
+
+    @property
+    def pending_count(self):
+        return len(self._candidates)
+
+    def _open_backend(self):
+        self.backend = "polling"
+        if not self.use_inotify:
+            return
+        try:
+            self._inotify = Inotify()
+        except (OSError, AttributeError):
+            # 没有 libc 或 inotify 实例数已达上限时退回定期扫描
+            self._inotify = None
+            return
+        self.backend = "inotify"
+
+    def _watch(self, folder):
+        if self._inotify is None or folder in self._inotify.folders:
+            return
+        try:
+            self._inotify.add_watch(folder)
+        except OSError:
+            pass
+
+    def _is_excluded(self, path):
+        return any(path == excluded or path.startswith(excluded + os.sep) for excluded in self.exclude)
+
+    def _scan(self, folders=None):
+        """扫描文件夹：发现遗漏的事件、补上新目录的监视；完整扫描时清理已删除文件的记录"""
+        seen = set()
+        for folder in folders or self.folders:
+            pending_dirs = [folder]
+            while pending_dirs:
+                current = pending_dirs.pop()
+                if self._is_excluded(current):
+                    continue
+                self._watch(current)
+                try:
+                    with os.scandir(current) as entries:
+                        for entry in entries:
+                            try:
+                                if entry.is_dir(follow_symlinks=False):
+                                    if self.include_subfolders:
+                                        pending_dirs.append(entry.path)
+                                elif self._wanted(entry.name) and entry.is_file():
+                                    stat = entry.stat()
+                                    seen.add(entry.path)
+                                    self._observe(entry.path, (stat.st_size, stat.st_mtime_ns))
+                            except OSError:
+                                continue
+                except OSError:
+                    continue
+        if folders is not None:
+            return
+        with self._lock:
+            for file_path in [path for path in self._processed if path not in seen]:
+                del self._processed[file_path]
+
+    def _handle_events(self, events):
+        for file_path, mask in events:
+            if file_path is None:
+                # 事件队列溢出，可能漏掉了文件，立即完整扫描
+                self._scan()
+                continue
+            if self._is_excluded(file_path):
+                continue
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and self.include_subfolders:
+                    # 新目录中在添加监视之前就已存在的文件由扫描补上
+                    self._scan([file_path])
+                continue
+            if not self._wanted(os.path.basename(file_path)):
+                continue
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                with self._lock:
+                    self._processed.pop(file_path, None)
+                self._candidates.pop(file_path, None)
+                continue
+            self._observe(file_path, self._signature(file_path))
+
+    def _observe(self, file_path, signature):
+        if signature is None:
+            return
+        with self._lock:
+            if file_path in self._queued or self._processed.get(file_path) == signature:
+                return
+        previous = self._candidates.get(file_path)
+        if previous is None or previous[:2] != signature:
+            self._candidates[file_path] = signature + (time.monotonic(),)
+
+    def _settled(self, now):
+        ready = {}
+        wall_clock = time.time()
+        for file_path, (size, mtime_ns, changed_at) in list(self._candidates.items()):
+            signature = self._signature(file_path)
+            if signature is None:
+                del self._candidates[file_path]
+                continue
+            if signature != (size, mtime_ns):
+                self._candidates[file_path] = signature + (now,)
+                continue
+            # 修改时间已足够久远的文件（如启动前就存在的文件）再确认一次大小不变即可
+            if now - changed_at >= self.settle_time or wall_clock - mtime_ns / 1e9 >= self.settle_time:
+                del self._candidates[file_path]
+                with self._lock:
+                    self._queued[file_path] = signature
+                ready[file_path] = size
+        return ready
+
+    def _wanted(self, name):
+        # 跳过隐藏文件，包括输出时使用的 .xxx.partial 临时文件
+        return is_pdf_file(name) and not name.startswith(".")
+
+    def _signature(self, file_path):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+
+class RollingSummary:
+    """长期运行时每隔 interval 秒重新生成一次清单，而不是只在结束时生成"""
+
+    def __init__(self, collector, interval):
+        self.collector = collector
+        self.interval = interval
+        self.summary_file = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._written_total = 0
+        self._thread = None
+
+    def add(self, result):
+        with self._lock:
+            self.collector.add(result)
+
+    def start(self):
+        if self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="rolling-summary", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def write(self):
+        """自上次生成后有新结果时重新生成清单"""
+        with self._lock:
+            if self.collector.stats.total == self._written_total:
+                return None
+            self._written_total = self.collector.stats.total
+            self.summary_file = self.collector.snapshot()
+            return self.summary_file
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except Exception as e:
+                print(f"生成清单文件时出错: {str(e)}", file=sys.stderr)
@@ -3,13 +3,32 @@ from pathlib import Path
 from PyQt5.QtWidgets import *
 from PyQt5.QtCore import *
 from PyQt5.QtGui import *
-from gui.widgets import CheckableListWidget
+from gui.widgets import CheckableListView, BufferedLogView
 from core.pdf_worker import PDFProcessingWorker
+from core.scan_worker import FolderScanWorker
+from core.batch import FileFeed, default_worker_count
+from core.summary import SUMMARY_FILENAME
+from core.job_journal import JobJournal
+from core.report import REPORT_FORMATS
+from core.pdf_utils import unique_passwords, SAVE_PROFILE_LABELS
+from core.scheduler import SCHEDULE_ORDER_LABELS
+from core.pdf_io import ARCHIVE_OUTPUT_LABELS
+from core.verifier import VERIFY_SAMPLE_LABELS
+from core.supervisor import MEMORY_LIMIT_SUPPORTED
+from utils.file_utils import load_password_file, collect_pdf_files
+from utils.string_utils import format_file_size
 
 class PDFPasswordRemover(QMainWindow):
+    LOG_MAX_LINES = 5000
+    ERROR_MAX_LINES = 1000
+    
     def __init__(self):
         super().__init__()
         self.all_pdf_files = []
+        self.candidate_passwords = []
+        self.file_sizes = {}
+        self.error_count = 0
+        self.scan_worker = None
         self.setup_ui()
         self.setup_connections()
         
@@ -73,7 +92,7 @@ class PDFPasswordRemover(QMainWindow):
             QPushButton#scan_btn:hover {
                 background-color: #219653;
             }
-            QLineEdit, QListWidget {
+            QLineEdit, QListView {
                 border: 1px solid #d1d9e6;
                 border-radius: 4px;
                 padding: 5px;
@@ -101,10 +120,17 @@ class PDFPasswordRemover(QMainWindow):
         self.select_folder_btn.setObjectName("scan_btn")
         self.scan_subfolders_cb = QCheckBox("包含子文件夹")
         self.scan_subfolders_cb.setChecked(True)
+        self.scan_archives_cb = QCheckBox("包含ZIP压缩包")
+        self.scan_archives_cb.setChecked(False)
+        self.scan_archives_cb.setToolTip("把ZIP压缩包视为文件夹，直接在内存中处理其中的PDF，无需先解压")
+        self.cancel_scan_btn = QPushButton("⏹️ 取消扫描")
+        self.cancel_scan_btn.setEnabled(False)
         
         btn_layout.addWidget(self.select_files_btn)
         btn_layout.addWidget(self.select_folder_btn)
         btn_layout.addWidget(self.scan_subfolders_cb)
+        btn_layout.addWidget(self.scan_archives_cb)
+        btn_layout.addWidget(self.cancel_scan_btn)
         btn_layout.addStretch()
         
         path_layout = QHBoxLayout()
@@ -119,6 +145,9 @@ class PDFPasswordRemover(QMainWindow):
         self.selected_count_label = QLabel("已勾选: 0 个文件")
         info_layout.addWidget(self.file_count_label)
         info_layout.addWidget(self.selected_count_label)
+        self.scan_status_label = QLabel("")
+        self.scan_status_label.setStyleSheet("color: #27ae60;")
+        info_layout.addWidget(self.scan_status_label)
         info_layout.addStretch()
         
         layout.addLayout(btn_layout)
@@ -142,7 +171,7 @@ class PDFPasswordRemover(QMainWindow):
         control_layout.addWidget(self.clear_list_btn)
         control_layout.addStretch()
         
-        self.file_list_widget = CheckableListWidget()
+        self.file_list_widget = CheckableListView()
         self.file_list_widget.setAlternatingRowColors(True)
         
         layout.addLayout(control_layout)
@@ -168,32 +197,145 @@ class PDFPasswordRemover(QMainWindow):
         self.show_password_cb.stateChanged.connect(self.toggle_password_visibility)
         layout.addWidget(self.show_password_cb, 1, 2)
         
-        layout.addWidget(QLabel("输出文件夹:"), 2, 0)
+        layout.addWidget(QLabel("候选密码:"), 2, 0)
+        candidate_layout = QHBoxLayout()
+        self.password_list_label = QLabel("未导入密码列表")
+        self.password_list_label.setStyleSheet("color: #666;")
+        self.load_passwords_btn = QPushButton("导入密码列表")
+        self.load_passwords_btn.setToolTip("从文本文件导入多个候选密码（每行一个），处理时按命中率自动排序尝试")
+        self.clear_passwords_btn = QPushButton("清除")
+        candidate_layout.addWidget(self.password_list_label)
+        candidate_layout.addStretch()
+        candidate_layout.addWidget(self.load_passwords_btn)
+        candidate_layout.addWidget(self.clear_passwords_btn)
+        layout.addLayout(candidate_layout, 2, 1, 1, 2)
+        
+        layout.addWidget(QLabel("输出文件夹:"), 3, 0)
         self.output_path_edit = QLineEdit()
         self.output_path_edit.setText(str(Path.home() / "Unlocked_PDFs"))
-        layout.addWidget(self.output_path_edit, 2, 1)
+        layout.addWidget(self.output_path_edit, 3, 1)
         
         self.browse_output_btn = QPushButton("浏览")
-        layout.addWidget(self.browse_output_btn, 2, 2)
+        layout.addWidget(self.browse_output_btn, 3, 2)
         
-        layout.addWidget(QLabel("文件名前缀:"), 3, 0)
+        layout.addWidget(QLabel("文件名前缀:"), 4, 0)
         self.prefix_edit = QLineEdit()
         self.prefix_edit.setText("unlocked_")
-        layout.addWidget(self.prefix_edit, 3, 1)
+        layout.addWidget(self.prefix_edit, 4, 1)
         
         self.skip_unencrypted_cb = QCheckBox("自动跳过无密码文件")
         self.skip_unencrypted_cb.setChecked(True)
-        layout.addWidget(self.skip_unencrypted_cb, 4, 0, 1, 2)
+        layout.addWidget(self.skip_unencrypted_cb, 5, 0, 1, 2)
         
         self.preserve_restrictions_cb = QCheckBox("保留原始权限设置")
         self.preserve_restrictions_cb.setChecked(False)
         self.preserve_restrictions_cb.setToolTip("移除密码后仍保留原有的打印、复制等限制")
-        layout.addWidget(self.preserve_restrictions_cb, 4, 2)
+        layout.addWidget(self.preserve_restrictions_cb, 5, 2)
         
         self.generate_summary_cb = QCheckBox("生成已解锁文件清单")
         self.generate_summary_cb.setChecked(True)
         self.generate_summary_cb.setToolTip("在处理完成后生成一个清单文件")
-        layout.addWidget(self.generate_summary_cb, 5, 0, 1, 3)
+        layout.addWidget(self.generate_summary_cb, 6, 0, 1, 2)
+        
+        self.generate_report_cb = QCheckBox("生成机器可读结果 (JSONL/CSV)")
+        self.generate_report_cb.setChecked(True)
+        self.generate_report_cb.setToolTip("处理过程中逐条写出 unlock_results.jsonl 和 unlock_results.csv，包含结构化状态码")
+        layout.addWidget(self.generate_report_cb, 6, 2)
+        
+        layout.addWidget(QLabel("并行进程数:"), 7, 0)
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, max(64, default_worker_count()))
+        self.workers_spin.setValue(default_worker_count())
+        self.workers_spin.setToolTip("同时处理文件的进程数，设为1时在单线程中顺序处理")
+        layout.addWidget(self.workers_spin, 7, 1)
+        
+        self.use_cache_cb = QCheckBox("增量处理（跳过已处理且未变化的文件）")
+        self.use_cache_cb.setChecked(False)
+        self.use_cache_cb.setToolTip("在输出目录中记录处理结果，再次处理同一文件夹时跳过大小和修改时间未变化的文件")
+        layout.addWidget(self.use_cache_cb, 8, 0, 1, 2)
+        
+        self.force_reprocess_cb = QCheckBox("强制重新处理")
+        self.force_reprocess_cb.setChecked(False)
+        self.force_reprocess_cb.setToolTip("忽略已有记录，重新处理所有文件")
+        layout.addWidget(self.force_reprocess_cb, 8, 2)
+        
+        self.profile_cb = QCheckBox("记录性能分析数据 (cProfile/tracemalloc)")
+        self.profile_cb.setChecked(False)
+        self.profile_cb.setToolTip("在输出目录生成 profile.pstats 和 profile_report.txt，用于排查处理缓慢的原因；"
+                                   "会降低处理速度，多进程时只分析主进程")
+        layout.addWidget(self.profile_cb, 9, 0, 1, 3)
+        
+        layout.addWidget(QLabel("保存方式:"), 10, 0)
+        self.save_profile_combo = QComboBox()
+        for profile, label in SAVE_PROFILE_LABELS.items():
+            self.save_profile_combo.addItem(label, profile)
+        self.save_profile_combo.setToolTip("最快：处理速度最高；最小体积：输出文件更小但更耗时；"
+                                           "网页优化：便于浏览器边下载边显示")
+        layout.addWidget(self.save_profile_combo, 10, 1, 1, 2)
+        
+        self.network_io_cb = QCheckBox("网络盘优化（预读输入，后台写出输出）")
+        self.network_io_cb.setChecked(False)
+        self.network_io_cb.setToolTip("文件位于SMB/NFS等网络存储上时，减少小块随机读取，"
+                                      "单进程时还会在解密当前文件的同时读取后续文件，"
+                                      "写入延迟也不阻塞下一个文件的解密；会占用更多内存")
+        layout.addWidget(self.network_io_cb, 11, 0, 1, 3)
+        
+        layout.addWidget(QLabel("处理顺序:"), 12, 0)
+        self.order_combo = QComboBox()
+        for order, label in SCHEDULE_ORDER_LABELS.items():
+            self.order_combo.addItem(label, order)
+        self.order_combo.setToolTip("大小悬殊的文件混在一起时，调整顺序可以缩短总用时或更快看到结果")
+        layout.addWidget(self.order_combo, 12, 1)
+        
+        self.memory_budget_spin = QSpinBox()
+        self.memory_budget_spin.setRange(0, 1024 * 1024)
+        self.memory_budget_spin.setSingleStep(512)
+        self.memory_budget_spin.setPrefix("内存预算: ")
+        self.memory_budget_spin.setSuffix(" MB")
+        self.memory_budget_spin.setSpecialValueText("内存预算: 不限制")
+        self.memory_budget_spin.setToolTip("限制同时处理的大文件所需的估算内存，超出时大文件排队等待")
+        layout.addWidget(self.memory_budget_spin, 12, 2)
+        
+        layout.addWidget(QLabel("单文件限制:"), 13, 0)
+        self.file_timeout_spin = QSpinBox()
+        self.file_timeout_spin.setRange(0, 24 * 3600)
+        self.file_timeout_spin.setPrefix("超时: ")
+        self.file_timeout_spin.setSuffix(" 秒")
+        self.file_timeout_spin.setSpecialValueText("超时: 不限制")
+        self.file_timeout_spin.setToolTip("单个文件处理超过该时间时终止并记录为超时，其余文件继续处理")
+        layout.addWidget(self.file_timeout_spin, 13, 1)
+        
+        self.memory_limit_spin = QSpinBox()
+        self.memory_limit_spin.setRange(0, 1024 * 1024)
+        self.memory_limit_spin.setSingleStep(512)
+        self.memory_limit_spin.setPrefix("内存上限: ")
+        self.memory_limit_spin.setSuffix(" MB")
+        self.memory_limit_spin.setSpecialValueText("内存上限: 不限制")
+        self.memory_limit_spin.setToolTip("处理单个文件的进程内存超过该值时终止（仅 Linux），其余文件继续处理")
+        layout.addWidget(self.memory_limit_spin, 13, 2)
+        if not MEMORY_LIMIT_SUPPORTED:
+            self.memory_limit_spin.setVisible(False)
+        
+        self.dedup_cb = QCheckBox("相同内容的文件只解密一次")
+        self.dedup_cb.setChecked(False)
+        self.dedup_cb.setToolTip("按文件内容识别重复的PDF，副本的输出文件通过 reflink/硬链接/复制生成")
+        layout.addWidget(self.dedup_cb, 14, 0, 1, 3)
+        
+        layout.addWidget(QLabel("压缩包输出:"), 15, 0)
+        self.archive_output_combo = QComboBox()
+        for archive_output, label in ARCHIVE_OUTPUT_LABELS.items():
+            self.archive_output_combo.addItem(label, archive_output)
+        self.archive_output_combo.setToolTip("ZIP压缩包中的PDF解密后写入输出目录中的 <前缀><压缩包名>.zip，"
+                                             "或以压缩包命名的文件夹")
+        layout.addWidget(self.archive_output_combo, 15, 1, 1, 2)
+        
+        layout.addWidget(QLabel("保存后校验:"), 16, 0)
+        self.verify_combo = QComboBox()
+        for sample, label in VERIFY_SAMPLE_LABELS.items():
+            self.verify_combo.addItem(label, sample)
+        self.verify_combo.setToolTip("保存后在后台重新打开输出，检查能否不用密码打开、页数一致且不再带有加密字典，"
+                                     "未通过的文件记为“输出校验失败”；校验与后续文件的处理同时进行")
+        layout.addWidget(self.verify_combo, 16, 1, 1, 2)
         
         return group
     
@@ -205,8 +347,12 @@ class PDFPasswordRemover(QMainWindow):
         self.progress_bar.setTextVisible(True)
         layout.addWidget(self.progress_bar)
         
-        self.log_text = QTextEdit()
-        self.log_text.setReadOnly(True)
+        self.bytes_progress_label = QLabel("")
+        self.bytes_progress_label.setStyleSheet("color: #666;")
+        layout.addWidget(self.bytes_progress_label)
+        
+        # 日志只保留最近的若干行，并按固定间隔批量刷新，处理速度再快界面开销也不变
+        self.log_text = BufferedLogView(self.LOG_MAX_LINES)
         self.log_text.setMaximumHeight(120)
         self.log_text.setStyleSheet("""
             font-family: 'Consolas', 'Monaco', monospace;
@@ -215,6 +361,26 @@ class PDFPasswordRemover(QMainWindow):
         """)
         layout.addWidget(self.log_text)
         
+        # 错误集中显示在这里，不再为每个错误弹出对话框阻塞处理
+        error_header = QHBoxLayout()
+        self.error_count_label = QLabel("错误/失败: 0")
+        self.error_count_label.setStyleSheet("color: #c0392b; font-weight: bold;")
+        self.clear_errors_btn = QPushButton("清空错误列表")
+        error_header.addWidget(self.error_count_label)
+        error_header.addStretch()
+        error_header.addWidget(self.clear_errors_btn)
+        layout.addLayout(error_header)
+        
+        self.error_text = BufferedLogView(self.ERROR_MAX_LINES)
+        self.error_text.setMaximumHeight(80)
+        self.error_text.setStyleSheet("""
+            font-family: 'Consolas', 'Monaco', monospace;
+            font-size: 11px;
+            background-color: #fdf2f2;
+        """)
+        layout.addWidget(self.error_text)
+        self.set_error_panel_visible(False)
+        
         return group
     
     def create_control_buttons(self):
@@ -235,8 +401,13 @@ class PDFPasswordRemover(QMainWindow):
             background-color: #e74c3c;
         """)
         
+        self.resume_btn = QPushButton("🔁 恢复任务")
+        self.resume_btn.setMinimumHeight(45)
+        self.resume_btn.setToolTip("从输出目录中的任务日志继续上次中断的处理")
+        
         layout.addWidget(self.start_btn)
         layout.addWidget(self.stop_btn)
+        layout.addWidget(self.resume_btn)
         layout.addStretch()
         
         return layout
@@ -244,24 +415,54 @@ class PDFPasswordRemover(QMainWindow):
     def setup_connections(self):
         self.select_files_btn.clicked.connect(self.select_files)
         self.select_folder_btn.clicked.connect(self.select_folder)
+        self.cancel_scan_btn.clicked.connect(self.cancel_scan)
         self.select_all_btn.clicked.connect(lambda: self.file_list_widget.select_all(True))
         self.unselect_all_btn.clicked.connect(lambda: self.file_list_widget.select_all(False))
         self.invert_select_btn.clicked.connect(self.file_list_widget.invert_selection)
         self.clear_list_btn.clicked.connect(self.clear_file_list)
-        self.file_list_widget.itemChanged.connect(self.update_selection_count)
+        self.file_list_widget.checked_count_changed.connect(self.update_selection_count)
         self.browse_output_btn.clicked.connect(self.browse_output_path)
+        self.load_passwords_btn.clicked.connect(self.load_password_list)
+        self.clear_passwords_btn.clicked.connect(self.clear_password_list)
         self.start_btn.clicked.connect(self.start_processing)
+        self.resume_btn.clicked.connect(self.resume_job)
         self.stop_btn.clicked.connect(self.stop_processing)
+        self.clear_errors_btn.clicked.connect(self.clear_errors)
     
     def toggle_password_visibility(self, state):
         self.password_edit.setEchoMode(QLineEdit.Normal if state == Qt.Checked else QLineEdit.Password)
     
+    def load_password_list(self):
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "选择密码列表文件", str(Path.home()),
+            "文本文件 (*.txt);;所有文件 (*.*)"
+        )
+        if not file_path:
+            return
+        try:
+            passwords = load_password_file(file_path)
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"读取密码列表失败:\n{str(e)}")
+            return
+        self.candidate_passwords = unique_passwords(passwords)
+        self.password_list_label.setText(f"已导入 {len(self.candidate_passwords)} 个候选密码")
+        self.log(f"从 {os.path.basename(file_path)} 导入了 {len(self.candidate_passwords)} 个候选密码")
+    
+    def clear_password_list(self):
+        self.candidate_passwords = []
+        self.password_list_label.setText("未导入密码列表")
+    
+    def get_passwords(self):
+        passwords = [self.password_edit.text()] if self.password_edit.text().strip() else []
+        return unique_passwords(passwords + self.candidate_passwords)
+    
     def select_files(self):
         files, _ = QFileDialog.getOpenFileNames(
             self, "选择PDF文件", str(Path.home()), 
-            "PDF文件 (*.pdf);;所有文件 (*.*)"
+            "PDF文件 (*.pdf);;ZIP压缩包 (*.zip);;所有文件 (*.*)"
         )
         if files:
+            files = collect_pdf_files(files, include_archives=self.scan_archives_cb.isChecked())
             self.add_files_to_list(files)
             self.current_path_label.setText(f"已选择 {len(files)} 个文件")
     
@@ -279,61 +480,73 @@ class PDFPasswordRemover(QMainWindow):
         self.log(f"开始扫描文件夹: {folder_path}")
         self.log(f"输出路径已自动设置为: {output_path}")
         
-        try:
-            pdf_files = []
-            if include_subfolders:
-                for root, dirs, files in os.walk(folder_path):
-                    for file in files:
-                        if file.lower().endswith('.pdf'):
-                            pdf_files.append(os.path.join(root, file))
-            else:
-                for file in os.listdir(folder_path):
-                    if file.lower().endswith('.pdf'):
-                        pdf_files.append(os.path.join(folder_path, file))
-            
-            if pdf_files:
-                self.add_files_to_list(pdf_files)
-                self.log(f"扫描完成，找到 {len(pdf_files)} 个PDF文件")
-            else:
-                self.log("未找到PDF文件")
-                QMessageBox.information(self, "扫描结果", "该文件夹中未找到PDF文件")
-                
-        except Exception as e:
-            self.log(f"扫描错误: {str(e)}")
-            QMessageBox.critical(self, "扫描错误", f"扫描文件夹时出错:\n{str(e)}")
+        self.scan_worker = FolderScanWorker(folder_path, include_subfolders, self.scan_archives_cb.isChecked())
+        self.scan_worker.files_found.connect(self.on_files_found)
+        self.scan_worker.scan_progress.connect(self.on_scan_progress)
+        self.scan_worker.scan_finished.connect(self.on_scan_finished)
+        self.scan_worker.error_occurred.connect(self.on_scan_error)
+        self.set_scanning_state(True)
+        self.scan_worker.start()
     
-    def add_files_to_list(self, files):
-        added_count = 0
-        existing_files = self.get_all_files_in_list()
-        
-        for file_path in files:
-            if file_path not in existing_files:
-                file_name = os.path.basename(file_path)
-                self.file_list_widget.add_checkable_item(f"📄 {file_name}", file_path)
-                self.all_pdf_files.append(file_path)
-                added_count += 1
-        
+    def is_scanning(self):
+        return self.scan_worker is not None and self.scan_worker.isRunning()
+    
+    def set_scanning_state(self, scanning):
+        processing = self.is_processing()
+        self.select_files_btn.setEnabled(not scanning and not processing)
+        self.select_folder_btn.setEnabled(not scanning and not processing)
+        self.clear_list_btn.setEnabled(not scanning)
+        self.cancel_scan_btn.setEnabled(scanning)
+    
+    def cancel_scan(self):
+        if self.is_scanning():
+            self.scan_worker.cancel()
+            self.log("正在取消扫描...")
+    
+    def on_files_found(self, file_paths, sizes):
+        self.file_sizes.update(sizes)
+        added_files = self.add_files_to_list(file_paths, log_added=False)
+        # 扫描与处理同时进行时，新找到的文件直接加入处理队列
+        if added_files and self.is_processing() and not self.worker.feed.closed:
+            self.worker.add_files(added_files, {path: sizes[path] for path in added_files})
+    
+    def on_scan_progress(self, found_count):
+        self.scan_status_label.setText(f"扫描中… 已找到 {found_count} 个PDF文件")
+    
+    def on_scan_finished(self, found_count, cancelled):
+        self.set_scanning_state(False)
+        self.scan_status_label.setText("")
+        if self.is_processing():
+            self.worker.finish_input()
+        
+        if cancelled:
+            self.log(f"扫描已取消，已找到 {found_count} 个PDF文件")
+        elif found_count:
+            self.log(f"扫描完成，找到 {found_count} 个PDF文件")
+        else:
+            self.log("未找到PDF文件")
+            QMessageBox.information(self, "扫描结果", "该文件夹中未找到PDF文件")
+    
+    def on_scan_error(self, error_msg):
+        self.log(f"扫描错误: {error_msg}")
+        QMessageBox.critical(self, "扫描错误", error_msg)
+    
+    def add_files_to_list(self, files, log_added=True):
+        added_files = self.file_list_widget.add_files(files)
+        self.all_pdf_files.extend(added_files)
         self.update_file_count()
         
-        if added_count > 0:
-            self.status_bar.showMessage(f"添加了 {added_count} 个新文件")
-            self.log(f"添加了 {added_count} 个文件到列表")
-    
-    def get_all_files_in_list(self):
-        files = []
-        for i in range(self.file_list_widget.count()):
-            item = self.file_list_widget.item(i)
-            files.append(item.data(Qt.UserRole))
-        return files
+        if added_files and log_added:
+            self.status_bar.showMessage(f"添加了 {len(added_files)} 个新文件")
+            self.log(f"添加了 {len(added_files)} 个文件到列表")
+        return added_files
     
     def update_file_count(self):
         total = self.file_list_widget.count()
-        checked = len(self.file_list_widget.get_checked_files())
         self.file_count_label.setText(f"已选择: {total} 个文件")
-        self.selected_count_label.setText(f"已勾选: {checked} 个文件")
+        self.update_selection_count(self.file_list_widget.checked_count())
     
-    def update_selection_count(self):
-        checked = len(self.file_list_widget.get_checked_files())
+    def update_selection_count(self, checked):
         self.selected_count_label.setText(f"已勾选: {checked} 个文件")
     
     def clear_file_list(self):
@@ -345,6 +558,7 @@ class PDFPasswordRemover(QMainWindow):
             if reply == QMessageBox.Yes:
                 self.file_list_widget.clear()
                 self.all_pdf_files.clear()
+                self.file_sizes.clear()
                 self.update_file_count()
                 self.current_path_label.setText("未选择")
                 self.status_bar.showMessage("文件列表已清空")
@@ -359,17 +573,36 @@ class PDFPasswordRemover(QMainWindow):
     
     def log(self, message):
         timestamp = QDateTime.currentDateTime().toString("hh:mm:ss")
-        self.log_text.append(f"[{timestamp}] {message}")
-        self.log_text.verticalScrollBar().setValue(
-            self.log_text.verticalScrollBar().maximum()
-        )
+        self.log_text.append_line(f"[{timestamp}] {message}")
+    
+    def add_error(self, message):
+        self.add_errors([message])
+    
+    def add_errors(self, messages):
+        timestamp = QDateTime.currentDateTime().toString("hh:mm:ss")
+        for message in messages:
+            self.error_text.append_line(f"[{timestamp}] {message}")
+        self.error_count += len(messages)
+        self.error_count_label.setText(f"错误/失败: {self.error_count}")
+        self.set_error_panel_visible(True)
+    
+    def clear_errors(self):
+        self.error_text.clear()
+        self.error_count = 0
+        self.error_count_label.setText("错误/失败: 0")
+        self.set_error_panel_visible(False)
+    
+    def set_error_panel_visible(self, visible):
+        self.error_count_label.setVisible(visible)
+        self.clear_errors_btn.setVisible(visible)
+        self.error_text.setVisible(visible)
     
     def validate_inputs(self):
-        if not self.file_list_widget.get_checked_files():
+        if self.file_list_widget.checked_count() == 0:
             QMessageBox.warning(self, "警告", "请先勾选要处理的文件")
             return False
-        if not self.password_edit.text().strip():
-            QMessageBox.warning(self, "警告", "请输入PDF密码")
+        if not self.get_passwords():
+            QMessageBox.warning(self, "警告", "请输入PDF密码或导入密码列表")
             return False
         return True
     
@@ -385,42 +618,134 @@ class PDFPasswordRemover(QMainWindow):
             QMessageBox.critical(self, "错误", f"无法创建输出目录:\n{str(e)}")
             return
         
-        self.set_processing_state(True)
-        files_to_process = self.file_list_widget.get_checked_files()
+        files_to_process = FileFeed(self.file_list_widget.get_checked_files(),
+                                    closed=not self.is_scanning(), sizes=dict(self.file_sizes))
+        if not files_to_process.closed:
+            self.log("扫描仍在进行，新找到的文件将自动加入处理队列")
         
+        self.start_worker(files_to_process)
+    
+    def resume_job(self):
+        output_path = self.output_path_edit.text()
+        if not JobJournal.exists(output_path):
+            QMessageBox.warning(self, "警告", f"输出目录中没有可恢复的任务:\n{output_path}")
+            return
+        if not self.get_passwords():
+            QMessageBox.warning(self, "警告", "请输入PDF密码或导入密码列表")
+            return
+        
+        try:
+            state = JobJournal.load(output_path)
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"读取任务日志失败:\n{str(e)}")
+            return
+        
+        self.apply_job_settings(state.settings)
+        self.add_files_to_list(state.input_files, log_added=False)
+        pending_files = state.pending_files
+        self.log(f"恢复任务: 共 {len(state.input_files)} 个文件，"
+                 f"已完成 {len(state.completed)} 个，剩余 {len(pending_files)} 个")
+        self.start_worker(FileFeed(pending_files, closed=True), state)
+    
+    def apply_job_settings(self, settings):
+        if 'prefix' in settings:
+            self.prefix_edit.setText(settings['prefix'])
+        if 'skip_unencrypted' in settings:
+            self.skip_unencrypted_cb.setChecked(settings['skip_unencrypted'])
+        if 'preserve_restrictions' in settings:
+            self.preserve_restrictions_cb.setChecked(settings['preserve_restrictions'])
+        if settings.get('password_type'):
+            self.password_type_combo.setCurrentText(settings['password_type'])
+        if settings.get('save_profile'):
+            index = self.save_profile_combo.findData(settings['save_profile'])
+            if index >= 0:
+                self.save_profile_combo.setCurrentIndex(index)
+        if settings.get('archive_output'):
+            index = self.archive_output_combo.findData(settings['archive_output'])
+            if index >= 0:
+                self.archive_output_combo.setCurrentIndex(index)
+    
+    def start_worker(self, files_to_process, resume_state=None):
+        self.clear_errors()
         self.worker = PDFProcessingWorker(
             files_to_process,
-            self.password_edit.text(),
+            self.get_passwords(),
             self.output_path_edit.text(),
             self.prefix_edit.text(),
             self.skip_unencrypted_cb.isChecked(),
             self.password_type_combo.currentText(),
             self.preserve_restrictions_cb.isChecked(),
-            self.generate_summary_cb.isChecked()
+            self.generate_summary_cb.isChecked(),
+            self.workers_spin.value(),
+            self.use_cache_cb.isChecked(),
+            self.force_reprocess_cb.isChecked(),
+            resume_state,
+            REPORT_FORMATS if self.generate_report_cb.isChecked() else (),
+            self.profile_cb.isChecked(),
+            self.save_profile_combo.currentData(),
+            "buffer" if self.network_io_cb.isChecked() else "direct",
+            self.network_io_cb.isChecked(),
+            self.order_combo.currentData(),
+            self.memory_budget_spin.value() * 1024 * 1024,
+            self.file_timeout_spin.value(),
+            self.memory_limit_spin.value() * 1024 * 1024,
+            self.dedup_cb.isChecked(),
+            self.archive_output_combo.currentData(),
+            2 if self.network_io_cb.isChecked() else 0,
+            self.verify_combo.currentData()
         )
         
         self.worker.progress_updated.connect(self.update_progress)
-        self.worker.file_processed.connect(self.file_processed)
+        self.worker.files_processed.connect(self.files_processed)
         self.worker.processing_finished.connect(self.processing_finished)
         self.worker.error_occurred.connect(self.handle_error)
         self.worker.summary_generated.connect(self.on_summary_generated)
+        self.worker.throughput_updated.connect(self.update_throughput)
+        self.worker.bytes_progress.connect(self.update_bytes_progress)
+        self.set_processing_state(True)
         self.worker.start()
     
+    def is_processing(self):
+        return hasattr(self, 'worker') and self.worker.isRunning()
+    
     def set_processing_state(self, processing):
-        self.select_files_btn.setEnabled(not processing)
-        self.select_folder_btn.setEnabled(not processing)
+        scanning = self.is_scanning()
+        self.select_files_btn.setEnabled(not processing and not scanning)
+        self.select_folder_btn.setEnabled(not processing and not scanning)
         self.start_btn.setEnabled(not processing)
+        self.resume_btn.setEnabled(not processing)
         self.stop_btn.setEnabled(processing)
         self.password_edit.setReadOnly(processing)
+        self.load_passwords_btn.setEnabled(not processing)
+        self.clear_passwords_btn.setEnabled(not processing)
+        self.workers_spin.setEnabled(not processing)
         if not processing:
             self.progress_bar.setValue(0)
     
     def update_progress(self, value):
         self.progress_bar.setValue(value)
     
-    def file_processed(self, filename, success, message):
-        status_icon = "✓" if success else "✗"
-        self.log(f"{status_icon} {filename} - {message}")
+    def update_bytes_progress(self, bytes_done, bytes_total, eta_seconds):
+        text = f"已处理 {format_file_size(bytes_done)} / {format_file_size(bytes_total)}"
+        if eta_seconds is not None and bytes_done < bytes_total:
+            minutes, seconds = divmod(int(eta_seconds), 60)
+            text += f"，预计剩余 {minutes // 60:02d}:{minutes % 60:02d}:{seconds:02d}"
+        self.bytes_progress_label.setText(text)
+    
+    def update_throughput(self, files_per_second, megabytes_per_second):
+        self.status_bar.showMessage(f"处理速度: {files_per_second:.1f} 个文件/秒，"
+                                    f"{megabytes_per_second:.1f} MB/秒")
+    
+    def files_processed(self, results):
+        timestamp = QDateTime.currentDateTime().toString("hh:mm:ss")
+        errors = []
+        for filename, success, message in results:
+            status_icon = "✓" if success else "✗"
+            self.log_text.append_line(f"[{timestamp}] {status_icon} {filename} - {message}")
+            if not success:
+                errors.append(f"{filename} - {message}")
+        if errors:
+            self.add_errors(errors)
     
     def on_summary_generated(self, summary_file):
         if summary_file:
@@ -432,19 +757,28 @@ class PDFPasswordRemover(QMainWindow):
         self.status_bar.showMessage("处理完成")
         self.log("=" * 50)
         self.log("所有文件处理完成！")
+        self.log(f"用时 {self.worker.batch.elapsed:.1f} 秒，"
+                 f"平均 {self.worker.batch.files_per_second:.1f} 个文件/秒，"
+                 f"{self.worker.batch.megabytes_per_second:.1f} MB/秒")
+        for path in self.worker.profile_paths:
+            self.log(f"📈 性能分析结果: {path}")
+        self.log_text.flush()
+        self.error_text.flush()
         
         output_path = Path(self.output_path_edit.text())
-        summary_file = output_path / "已解锁文件清单.txt"
+        summary_file = output_path / SUMMARY_FILENAME
         
         message = f"PDF文件处理完成！\n输出目录: {self.output_path_edit.text()}"
+        if self.error_count:
+            message += f"\n\n{self.error_count} 个文件处理失败，详见错误列表"
         if summary_file.exists():
             message += f"\n\n已生成文件清单:\n{summary_file}"
         
         QMessageBox.information(self, "完成", message)
     
     def handle_error(self, error_msg):
-        self.log(f"⚠️ 错误: {error_msg}")
-        QMessageBox.critical(self, "处理错误", error_msg)
+        self.add_error(f"⚠️ {error_msg}")
+        self.status_bar.showMessage(f"错误: {error_msg}")
     
     def stop_processing(self):
         if hasattr(self, 'worker') and self.worker.isRunning():
@@ -1,40 +1,171 @@
-from PyQt5.QtWidgets import QListWidget, QListWidgetItem
-from PyQt5.QtCore import Qt
+import os
+from collections import deque
+from PyQt5.QtWidgets import QListView, QPlainTextEdit
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QTimer, pyqtSignal
+
+
+class CheckableFileModel(QAbstractListModel):
+    """带勾选状态的文件列表模型，哈希去重并维护已勾选数量"""
+    checked_count_changed = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._paths = []
+        self._rows = {}
+        self._checked = bytearray()
+        self._checked_count = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._paths)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.DisplayRole:
+            return f"📄 {os.path.basename(self._paths[row])}"
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if self._checked[row] else Qt.Unchecked
+        if role in (Qt.UserRole, Qt.ToolTipRole):
+            return self._paths[row]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.CheckStateRole:
+            return False
+        row = index.row()
+        checked = 1 if value == Qt.Checked else 0
+        if self._checked[row] != checked:
+            self._checked[row] = checked
+            self._checked_count += 1 if checked else -1
+            self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+            self.checked_count_changed.emit(self._checked_count)
+        return True
+
+    def add_files(self, file_paths, checked=True):
+        new_files = []
+        for file_path in file_paths:
+            if file_path not in self._rows:
+                self._rows[file_path] = len(self._paths) + len(new_files)
+                new_files.append(file_path)
+        if not new_files:
+            return new_files
+
+        first = len(self._paths)
+        self.beginInsertRows(QModelIndex(), first, first + len(new_files) - 1)
+        self._paths.extend(new_files)
+        self._checked.extend(bytes([1 if checked else 0]) * len(new_files))
+        self.endInsertRows()
+
+        if checked:
+            self._checked_count += len(new_files)
+            self.checked_count_changed.emit(self._checked_count)
+        return new_files
+
+    def contains(self, file_path):
+        return file_path in self._rows
+
+    def checked_count(self):
+        return self._checked_count
+
+    def get_checked_files(self):
+        return [path for path, checked in zip(self._paths, self._checked) if checked]
+
+    def set_all_checked(self, checked=True):
+        if not self._paths:
+            return
+        value = 1 if checked else 0
+        self._checked = bytearray([value]) * len(self._paths)
+        self._checked_count = len(self._paths) if checked else 0
+        self.emit_all_changed()
+
+    def invert_checked(self):
+        if not self._paths:
+            return
+        self._checked = self._checked.translate(bytes([1, 0]) + bytes(254))
+        self._checked_count = len(self._paths) - self._checked_count
+        self.emit_all_changed()
+
+    def emit_all_changed(self):
+        self.dataChanged.emit(self.index(0), self.index(len(self._paths) - 1),
+                              [Qt.CheckStateRole])
+        self.checked_count_changed.emit(self._checked_count)
+
+    def clear(self):
+        self.beginResetModel()
+        self._paths = []
+        self._rows = {}
+        self._checked = bytearray()
+        self._checked_count = 0
+        self.endResetModel()
+        self.checked_count_changed.emit(0)
+
+
+class CheckableListView(QListView):
+    """带复选框的文件列表视图，可流畅显示数十万个文件"""
 
-class CheckableListWidget(QListWidget):
-    """带复选框的列表控件"""
-    
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.itemChanged.connect(self.on_item_changed)
-        
-    def add_checkable_item(self, text, file_path, checked=True):
-        item = QListWidgetItem(text)
-        item.setData(Qt.UserRole, file_path)
-        item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
-        item.setCheckState(Qt.Checked if checked else Qt.Unchecked)
-        self.addItem(item)
-        
+        self.file_model = CheckableFileModel(self)
+        self.setModel(self.file_model)
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(1000)
+        self.checked_count_changed = self.file_model.checked_count_changed
+
+    def add_files(self, file_paths, checked=True):
+        return self.file_model.add_files(file_paths, checked)
+
+    def count(self):
+        return self.file_model.rowCount()
+
+    def checked_count(self):
+        return self.file_model.checked_count()
+
     def get_checked_files(self):
-        checked_files = []
-        for i in range(self.count()):
-            item = self.item(i)
-            if item.checkState() == Qt.Checked:
-                checked_files.append(item.data(Qt.UserRole))
-        return checked_files
-    
+        return self.file_model.get_checked_files()
+
     def select_all(self, checked=True):
-        for i in range(self.count()):
-            item = self.item(i)
-            item.setCheckState(Qt.Checked if checked else Qt.Unchecked)
-    
+        self.file_model.set_all_checked(checked)
+
     def invert_selection(self):
-        for i in range(self.count()):
-            item = self.item(i)
-            item.setCheckState(
-                Qt.Unchecked if item.checkState() == Qt.Checked 
-                else Qt.Checked
-            )
-    
-    def on_item_changed(self, item):
-        pass
\ No newline at end of file
+        self.file_model.invert_checked()
+
+    def clear(self):
+        self.file_model.clear()
+
+
+class BufferedLogView(QPlainTextEdit):
+    """只保留最近若干行的日志视图，短时间内的多条日志合并为一次追加"""
+
+    def __init__(self, max_lines=5000, flush_interval=200, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setMaximumBlockCount(max_lines)
+        self._pending = deque(maxlen=max_lines)
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(flush_interval)
+        self._flush_timer.timeout.connect(self.flush)
+
+    def append_line(self, line):
+        self._pending.append(line)
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def flush(self):
+        self._flush_timer.stop()
+        if not self._pending:
+            return
+        self.appendPlainText("\n".join(self._pending))
+        self._pending.clear()
+        self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+
+    def clear(self):
+        self._pending.clear()
+        super().clear()
@@ -1,8 +1,16 @@
 import sys
-from PyQt5.QtWidgets import QApplication
-from gui.main_window import PDFPasswordRemover
+import multiprocessing
 
 def main():
+    multiprocessing.freeze_support()
+    if len(sys.argv) > 1 and sys.argv[1] == "--cli":
+        # 命令行模式不导入Qt，可在无图形界面的服务器上运行
+        from core.cli import main as cli_main
+        sys.exit(cli_main(sys.argv[2:]))
+    
+    from PyQt5.QtWidgets import QApplication
+    from gui.main_window import PDFPasswordRemover
+    
     app = QApplication(sys.argv)
     app.setApplicationName("移除PDF密码工具")
     app.setOrganizationName("PDF Tools")
@@ -0,0 +1,99 @@
+import os
+
+import pikepdf
+import pytest
+
+from core.api import create_batch
+
+OWNER_PASSWORD = "owner-pw"
+USER_PASSWORD = "user-pw"
+
+# 名称 -> pikepdf.Encryption 参数，None 表示不加密
+ENCRYPTIONS = {
+    "plain": None,
+    "r2": dict(R=2, aes=False, metadata=False),
+    "r3": dict(R=3, aes=False, metadata=False),
+    "r4_rc4": dict(R=4, aes=False, metadata=False),
+    "r4_aes": dict(R=4, aes=True),
+    "r4_aes_plain_metadata": dict(R=4, aes=True, metadata=False),
+    "r6": dict(R=6),
+    "r6_plain_metadata": dict(R=6, metadata=False),
+}
+
+
+def make_pdf(path, encryption=None, user=USER_PASSWORD, owner=OWNER_PASSWORD, pages=1,
+             object_streams=False, marker=None):
+    """生成一个小PDF；marker 写入文档信息，使内容不同的文件哈希也不同"""
+    with pikepdf.new() as pdf:
+        for _ in range(pages):
+            pdf.add_blank_page()
+        if marker is not None:
+            pdf.docinfo['/Title'] = str(marker)
+        options = {}
+        if encryption is not None:
+            options['encryption'] = pikepdf.Encryption(owner=owner, user=user, **encryption)
+        if object_streams:
+            options['object_stream_mode'] = pikepdf.ObjectStreamMode.generate
+        pdf.save(path, **options)
+    return path
+
+
+@pytest.fixture
+def make_corpus(tmp_path):
+    """在临时目录生成一批文件：每种加密方式各一个，另有只设置权限密码和密码不在候选中的文件"""
+    def make(name="corpus", **kwargs):
+        folder = tmp_path / name
+        folder.mkdir()
+        for index, (kind, encryption) in enumerate(ENCRYPTIONS.items()):
+            make_pdf(folder / f"{kind}.pdf", encryption, pages=index + 1, marker=kind, **kwargs)
+        make_pdf(folder / "owner_only.pdf", ENCRYPTIONS["r4_aes"], user="", marker="owner_only")
+        make_pdf(folder / "locked.pdf", ENCRYPTIONS["r4_aes"], user="other-pw", marker="locked")
+        return folder
+    return make
+
+
+# 批量处理的各条路径，结果应与单进程顺序处理完全一致
+MODES = {
+    "sequential": {},
+    "pool": dict(workers=2),
+    "supervised": dict(file_timeout=60),
+    "supervised_pool": dict(workers=2, file_timeout=60),
+    "pipelined": dict(read_ahead=2, write_queue_size=2),
+    "write_behind": dict(write_queue_size=2),
+}
+
+
+@pytest.fixture
+def corpus(make_corpus):
+    return make_corpus()
+
+
+@pytest.fixture
+def expected(corpus, tmp_path):
+    """单进程顺序处理语料的结果"""
+    results, _ = run_batch(pdf_files(corpus), tmp_path / "expected")
+    return outcome(results, tmp_path / "expected")
+
+
+def pdf_files(folder):
+    return sorted(str(path) for path in folder.glob("*.pdf"))
+
+
+def run_batch(file_paths, output_dir, **options):
+    """按给定设置处理一批文件，返回 ({文件名: 结果}, BatchProcessor)"""
+    batch = create_batch([USER_PASSWORD], output_dir, **options)
+    batch.unlocker.output_dir.mkdir(parents=True, exist_ok=True)
+    return {os.path.basename(result['file_path']): result for result in batch.run(file_paths)}, batch
+
+
+def outcome(results, output_dir):
+    """各文件的结果，以及输出能否不用密码打开和页数"""
+    summary = {}
+    for name, result in results.items():
+        pages = None
+        if result['output_file'] != "未生成":
+            with pikepdf.open(output_dir / result['output_file']) as pdf:
+                assert not pdf.is_encrypted
+                pages = len(pdf.pages)
+        summary[name] = (result['status'], result['success'], result['output_file'], pages)
+    return summary
@@ -0,0 +1,77 @@
+import os
+
+import pikepdf
+import pytest
+
+from core.batch import BatchProcessor
+from core.pdf_utils import PDFUnlocker, STATUS_ERROR, STATUS_SKIPPED, STATUS_UNLOCKED, STATUS_WRONG_PASSWORD
+from tests.conftest import (ENCRYPTIONS, MODES, OWNER_PASSWORD, USER_PASSWORD, make_pdf, outcome, pdf_files,
+                            run_batch)
+
+
+class CrashingUnlocker(PDFUnlocker):
+    """处理文件名以 crash 开头的文件时工作进程直接退出"""
+
+    def process_file(self, file_path, password_order=None, data=None):
+        if os.path.basename(file_path).startswith("crash"):
+            os._exit(3)
+        return super().process_file(file_path, password_order, data)
+
+
+def test_sequential_results(expected):
+    assert expected["plain.pdf"][0] == STATUS_SKIPPED
+    assert expected["locked.pdf"][0] == STATUS_WRONG_PASSWORD
+    unlocked = {name for name, item in expected.items() if item[0] == STATUS_UNLOCKED}
+    assert unlocked == {"r2.pdf", "r3.pdf", "r4_rc4.pdf", "r4_aes.pdf", "r4_aes_plain_metadata.pdf",
+                        "r6.pdf", "r6_plain_metadata.pdf", "owner_only.pdf"}
+    # 生成语料时每个文件的页数各不相同
+    assert expected["r6.pdf"][3] == list(ENCRYPTIONS).index("r6") + 1
+
+
+@pytest.mark.parametrize("mode", [mode for mode in MODES if mode != "sequential"])
+def test_modes_match_sequential(corpus, expected, tmp_path, mode):
+    output_dir = tmp_path / mode
+    results, _ = run_batch(pdf_files(corpus), output_dir, **MODES[mode])
+    assert outcome(results, output_dir) == expected
+    assert not list(output_dir.glob(".*.partial"))
+
+
+@pytest.mark.parametrize("sniff", [True, False])
+@pytest.mark.parametrize("mode", ["sequential", "pool"])
+@pytest.mark.parametrize("name", ["r3", "r4_aes", "r6"])
+def test_owner_only_without_owner_password(tmp_path, name, mode, sniff):
+    """候选密码中没有权限密码时，只设置了权限密码的文件仍用空密码打开"""
+    path = make_pdf(tmp_path / "owner_only.pdf", ENCRYPTIONS[name], user="")
+    for preserve in (False, True):
+        output_dir = tmp_path / f"out_{preserve}"
+        results, _ = run_batch([str(path)], output_dir, preserve_restrictions=preserve, sniff=sniff,
+                               verify="all", **MODES[mode])
+        result = results["owner_only.pdf"]
+        assert (result['status'], result['verified']) == (STATUS_UNLOCKED, True), result['message']
+        with pikepdf.open(output_dir / result['output_file']) as pdf:
+            assert pdf.is_encrypted == preserve
+        if preserve:
+            # 输出的权限密码是随机生成的，原来的权限密码不能解除限制
+            with pytest.raises(pikepdf.PasswordError):
+                pikepdf.open(output_dir / result['output_file'], password=OWNER_PASSWORD)
+
+
+@pytest.mark.parametrize("workers", [2, 3])
+@pytest.mark.parametrize("crashes", [1, 2])
+def test_crashing_file_does_not_fail_others(tmp_path, workers, crashes):
+    """进程池崩溃时在途的其他文件重新处理，只有单独处理时仍崩溃的文件记为错误"""
+    folder = tmp_path / "in"
+    folder.mkdir()
+    names = [f"file{index:02d}.pdf" for index in range(12)]
+    for index in range(crashes):
+        names[3 + index * 5] = f"crash{index}.pdf"
+    for name in names:
+        make_pdf(folder / name, ENCRYPTIONS["r4_aes"], marker=name)
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    batch = BatchProcessor(CrashingUnlocker([USER_PASSWORD], output_dir, "unlocked_"), workers)
+    results = {os.path.basename(result['file_path']): result for result in batch.run(pdf_files(folder))}
+    assert sorted(results) == sorted(names)
+    for name, result in results.items():
+        expected = STATUS_ERROR if name.startswith("crash") else STATUS_UNLOCKED
+        assert result['status'] == expected, (name, result['message'])
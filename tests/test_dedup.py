@@ -0,0 +1,27 @@
+import os
+import shutil
+
+import pikepdf
+import pytest
+
+from core.pdf_utils import STATUS_UNLOCKED
+from tests.conftest import MODES, pdf_files, run_batch
+
+
+@pytest.mark.parametrize("mode", ["sequential", "pool", "supervised"])
+def test_dedup(corpus, tmp_path, mode):
+    for name in ("copy_a.pdf", "copy_b.pdf"):
+        shutil.copyfile(corpus / "r4_aes.pdf", corpus / name)
+    output_dir = tmp_path / "out"
+    results, batch = run_batch(pdf_files(corpus), output_dir, dedup=True, **MODES[mode])
+    duplicates = {name: result for name, result in results.items() if result.get('dedup_of')}
+    assert len(duplicates) == 2
+    primary = {os.path.basename(result['dedup_of']) for result in duplicates.values()}
+    assert len(primary) == 1 and primary < {"copy_a.pdf", "copy_b.pdf", "r4_aes.pdf"}
+    for name, result in duplicates.items():
+        assert result['status'] == STATUS_UNLOCKED
+        assert result['output_file'] == f"unlocked_{name}"
+        with pikepdf.open(output_dir / result['output_file']) as pdf:
+            assert not pdf.is_encrypted
+    assert batch.dedup.duplicate_count == 2
+    assert batch.dedup.saved_bytes == 2 * os.path.getsize(corpus / "r4_aes.pdf")
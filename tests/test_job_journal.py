@@ -0,0 +1,33 @@
+import json
+
+from core.api import create_batch
+from core.batch import FileFeed
+from core.cli import main
+from core.job_journal import JobJournal, open_job_journal
+from tests.conftest import USER_PASSWORD, pdf_files
+
+
+def test_resume_skips_completed_files(corpus, tmp_path, capsys):
+    output_dir = tmp_path / "out"
+    file_paths = pdf_files(corpus)
+    batch = create_batch([USER_PASSWORD], output_dir)
+    output_dir.mkdir()
+    feed = FileFeed(file_paths, closed=True)
+    batch.journal = open_job_journal(output_dir, feed, batch.unlocker.job_settings())
+    results = batch.run(feed)
+    completed = {next(results)['file_path'] for _ in range(3)}
+    batch.stop()
+    results.close()
+
+    state = JobJournal.load(output_dir)
+    assert not state.finished
+    assert state.completed == completed
+    assert set(state.pending_files) == set(file_paths) - completed
+
+    assert main(["--resume", "-o", str(output_dir), "-p", USER_PASSWORD]) == 1
+    events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    processed = {event['file'] for event in events if event['event'] == "file"}
+    assert processed == set(file_paths) - completed
+    summary = next(event for event in events if event['event'] == "summary")
+    assert summary['job_total'] == len(file_paths)
+    assert JobJournal.load(output_dir).finished
@@ -0,0 +1,85 @@
+from unittest import mock
+
+import pytest
+
+from core import pdf_sniff
+from core.api import create_unlocker
+from core.key_cache import KeyCache
+from core.pdf_utils import STATUS_UNLOCKED, STATUS_WRONG_PASSWORD
+from tests.conftest import ENCRYPTIONS, OWNER_PASSWORD, USER_PASSWORD, make_pdf
+
+
+class FakeCheck:
+    def __init__(self, correct):
+        self.correct = correct
+
+    def matches(self, password):
+        return password == self.correct
+
+
+def test_candidates():
+    cache = KeyCache(["密码", "a", "b", "c"])
+    order, rejected = cache.candidates("fp", [0, 1, 2, 3], FakeCheck(b"c"))
+    # 非 ASCII 密码无法在 Python 中校验，仍交给 pikepdf
+    assert (order, rejected) == ([3, 0], [1, 2])
+    cache.record("fp", 3, True)
+    assert cache.candidates("fp", [0, 1, 2, 3], FakeCheck(b"c")) == ([3, 0], [])
+    cache.record("fp", 3, False)
+    assert cache.candidates("fp", [0, 1, 2, 3], FakeCheck(b"c")) == ([0], [])
+
+
+def test_match_keeps_later_candidates():
+    cache = KeyCache(["a", "b", "c", "d"])
+    assert cache.candidates("fp", [0, 1, 2, 3], FakeCheck(b"b")) == ([1, 2, 3], [0])
+    # pikepdf 拒绝了 Python 校验通过的密码后，其余密码重新校验，被拒绝的留待 pikepdf 确认
+    cache.record("fp", 1, False)
+    assert cache.candidates("fp", [0, 1, 2, 3], FakeCheck(b"b")) == ([], [2, 3])
+
+
+def test_record_good_clears_failed():
+    cache = KeyCache(["a", "b"])
+    assert cache.candidates("fp", [0, 1], FakeCheck(b"none")) == ([], [0, 1])
+    cache.record("fp", 1, True)
+    assert cache.candidates("fp", [0, 1]) == ([1], [])
+
+
+def test_eviction():
+    cache = KeyCache(["a"], max_entries=2)
+    for fingerprint in ("x", "y", "z"):
+        assert cache.remember(fingerprint, "kind") == "miss"
+        cache.candidates(fingerprint, [0], FakeCheck(b"a"))
+    assert list(cache.kinds) == ["y", "z"]
+    assert cache.remember("z", "kind") == "hit"
+
+
+@pytest.mark.parametrize("name", ["r3", "r4_aes", "r6"])
+def test_python_mismatch_falls_back_to_pikepdf(tmp_path, name):
+    """Python 校验误判为错误时仍用 pikepdf 打开，之后同指纹的文件直接使用该密码"""
+    path = str(make_pdf(tmp_path / f"{name}.pdf", ENCRYPTIONS[name]))
+    unlocker = create_unlocker(["wrong", USER_PASSWORD], tmp_path / "out")
+    unlocker.output_dir.mkdir()
+    with mock.patch.object(pdf_sniff._PasswordCheck, "matches", return_value=False):
+        result = unlocker.process_file(path)
+        assert (result['status'], result['password_index']) == (STATUS_UNLOCKED, 1)
+        result = unlocker.process_file(path)
+        assert (result['status'], result['password_index'], result['attempts']) == (STATUS_UNLOCKED, 1, 1)
+
+
+@pytest.mark.parametrize("name", ["r3", "r4_aes", "r6"])
+def test_python_match_rejected_by_pikepdf(tmp_path, name):
+    """Python 校验误判为正确的密码被 pikepdf 拒绝时，继续尝试之后的候选密码"""
+    path = str(make_pdf(tmp_path / f"{name}.pdf", ENCRYPTIONS[name]))
+    unlocker = create_unlocker(["wrong", USER_PASSWORD], tmp_path / "out")
+    unlocker.output_dir.mkdir()
+    with mock.patch.object(pdf_sniff._PasswordCheck, "matches", lambda self, password: password == b"wrong"):
+        for _ in range(2):
+            result = unlocker.process_file(path)
+            assert (result['status'], result['password_index']) == (STATUS_UNLOCKED, 1)
+
+
+def test_wrong_passwords_still_reported(tmp_path):
+    path = str(make_pdf(tmp_path / "a.pdf", ENCRYPTIONS["r4_aes"]))
+    unlocker = create_unlocker(["wrong", OWNER_PASSWORD[:-1]], tmp_path / "out")
+    unlocker.output_dir.mkdir()
+    for _ in range(2):
+        assert unlocker.process_file(path)['status'] == STATUS_WRONG_PASSWORD
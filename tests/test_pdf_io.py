@@ -0,0 +1,86 @@
+import os
+import random
+import threading
+import zipfile
+
+import pikepdf
+import pytest
+
+from core.pdf_io import MAX_OPEN_ARCHIVES, input_size, open_archive, read_input
+from core.pdf_utils import STATUS_UNLOCKED
+from tests.conftest import ENCRYPTIONS, MODES, make_pdf, run_batch
+from utils.file_utils import archive_member_path, collect_pdf_files, split_archive_path
+
+
+def make_archives(folder, count):
+    """生成若干压缩包，返回 {成员虚拟路径: 内容}"""
+    members = {}
+    for index in range(count):
+        archive_path = str(folder / f"bundle{index}.zip")
+        with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for number in range(3):
+                data = os.urandom(1024 + index * 100 + number)
+                archive.writestr(f"dir/{number}.pdf", data)
+                members[archive_member_path(archive_path, f"dir/{number}.pdf")] = data
+    return members
+
+
+def test_evicted_archive_stays_open_while_in_use(tmp_path):
+    members = make_archives(tmp_path, MAX_OPEN_ARCHIVES + 1)
+    first = min(split_archive_path(path)[0] for path in members)
+    with open_archive(first) as archive:
+        # 其他压缩包把它挤出缓存，但仍在使用，不能关闭
+        for path in members:
+            if not path.startswith(first + os.sep):
+                assert read_input(path) == members[path]
+        assert archive.read("dir/0.pdf") == members[archive_member_path(first, "dir/0.pdf")]
+    assert archive.fp is None
+
+
+def test_concurrent_reads(tmp_path):
+    members = make_archives(tmp_path, MAX_OPEN_ARCHIVES * 2)
+    paths = list(members)
+    errors = []
+
+    def read(seed):
+        rng = random.Random(seed)
+        try:
+            for _ in range(200):
+                path = rng.choice(paths)
+                assert read_input(path) == members[path]
+                assert input_size(path) == len(members[path])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=read, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, errors[0]
+
+
+@pytest.mark.parametrize("archive_output", ["zip", "folder"])
+@pytest.mark.parametrize("mode", ["sequential", "pipelined", "pool"])
+def test_archive_members(tmp_path, archive_output, mode):
+    source = make_pdf(tmp_path / "a.pdf", ENCRYPTIONS["r4_aes"], pages=2)
+    with zipfile.ZipFile(tmp_path / "bundle.zip", 'w') as archive:
+        archive.write(source, "a.pdf")
+        archive.write(source, "sub/b.pdf")
+    source.unlink()
+    file_paths = collect_pdf_files([str(tmp_path)], include_archives=True)
+    assert len(file_paths) == 2
+
+    output_dir = tmp_path / "out"
+    results, _ = run_batch(file_paths, output_dir, archive_output=archive_output, **MODES[mode])
+    assert {result['status'] for result in results.values()} == {STATUS_UNLOCKED}
+    if archive_output == "zip":
+        with zipfile.ZipFile(output_dir / "unlocked_bundle.zip") as archive:
+            assert sorted(archive.namelist()) == ["a.pdf", "sub/b.pdf"]
+            data = archive.read("sub/b.pdf")
+        (tmp_path / "b.pdf").write_bytes(data)
+        output = tmp_path / "b.pdf"
+    else:
+        output = output_dir / "unlocked_bundle" / "sub" / "b.pdf"
+    with pikepdf.open(output) as pdf:
+        assert not pdf.is_encrypted and len(pdf.pages) == 2
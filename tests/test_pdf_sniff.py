@@ -0,0 +1,122 @@
+import io
+
+import pikepdf
+import pytest
+
+from core import pdf_sniff
+from core.pdf_sniff import (KIND_ENCRYPTED, KIND_OWNER_ONLY, KIND_UNENCRYPTED, KIND_UNKNOWN,
+                            KIND_USER_PASSWORD, _load_libcrypto, sniff_file, sniff_stream)
+from tests.conftest import ENCRYPTIONS, OWNER_PASSWORD, USER_PASSWORD, make_pdf
+
+# 名称 -> (算法, 修订号)
+EXPECTED = {
+    "r2": ("RC4-40", 2),
+    "r3": ("RC4-128", 3),
+    "r4_rc4": ("RC4-128", 4),
+    "r4_aes": ("AES-128", 4),
+    "r4_aes_plain_metadata": ("AES-128", 4),
+    "r6": ("AES-256", 6),
+    "r6_plain_metadata": ("AES-256", 6),
+}
+ENCRYPTED = sorted(EXPECTED)
+
+
+def user_password_kind(name):
+    # R6 的密码哈希依赖 libcrypto，找不到时只能判断为已加密
+    if name.startswith("r6") and _load_libcrypto() is None:
+        return KIND_ENCRYPTED
+    return KIND_USER_PASSWORD
+
+
+@pytest.mark.parametrize("object_streams", [False, True])
+def test_unencrypted(tmp_path, object_streams):
+    path = make_pdf(tmp_path / "plain.pdf", object_streams=object_streams)
+    result = sniff_file(path)
+    assert result['kind'] == KIND_UNENCRYPTED
+    assert result['fingerprint'] is None
+
+
+@pytest.mark.parametrize("object_streams", [False, True])
+@pytest.mark.parametrize("name", ENCRYPTED)
+def test_user_password(tmp_path, name, object_streams):
+    path = make_pdf(tmp_path / f"{name}.pdf", ENCRYPTIONS[name], object_streams=object_streams)
+    result = sniff_file(path)
+    assert result['kind'] == user_password_kind(name)
+    assert (result['algorithm'], result['revision']) == EXPECTED[name]
+    assert result['fingerprint']
+
+
+@pytest.mark.parametrize("name", ENCRYPTED)
+def test_owner_only(tmp_path, name):
+    if name.startswith("r6") and _load_libcrypto() is None:
+        pytest.skip("没有可用的 libcrypto")
+    path = make_pdf(tmp_path / f"{name}.pdf", ENCRYPTIONS[name], user="")
+    assert sniff_file(path)['kind'] == KIND_OWNER_ONLY
+
+
+@pytest.mark.parametrize("name", ENCRYPTED)
+def test_password_check_agrees_with_pikepdf(tmp_path, name):
+    path = make_pdf(tmp_path / f"{name}.pdf", ENCRYPTIONS[name])
+    with open(path, 'rb') as f:
+        check = sniff_stream(f, password_check=True)['password_check']
+    if check is None:
+        pytest.skip("该加密方式无法在 Python 中校验")
+    for password in (OWNER_PASSWORD, USER_PASSWORD, "", "wrong", OWNER_PASSWORD[:-1]):
+        try:
+            pikepdf.open(path, password=password).close()
+            opened = True
+        except pikepdf.PasswordError:
+            opened = False
+        assert check.matches(password.encode()) == opened, password
+
+
+@pytest.mark.parametrize("name", ENCRYPTED)
+def test_without_libcrypto(tmp_path, monkeypatch, name):
+    """没有 libcrypto 时 RC4 使用纯 Python 实现，R6 交给 pikepdf"""
+    monkeypatch.setattr(pdf_sniff, "_libcrypto", False)
+    path = make_pdf(tmp_path / f"{name}.pdf", ENCRYPTIONS[name])
+    with open(path, 'rb') as f:
+        result = sniff_stream(f, password_check=True)
+    if name.startswith("r6"):
+        assert result['kind'] == KIND_ENCRYPTED
+        assert result['password_check'] is None
+    else:
+        assert result['kind'] == KIND_USER_PASSWORD
+        assert result['password_check'].matches(USER_PASSWORD.encode())
+        assert not result['password_check'].matches(b"wrong")
+
+def test_same_encryption_dictionary_has_same_fingerprint(tmp_path):
+    # R6 的密钥与文件标识无关，pikepdf 每次保存都会生成新的盐，只能比较同一文件的副本
+    path = make_pdf(tmp_path / "a.pdf", ENCRYPTIONS["r6"])
+    copy = tmp_path / "b.pdf"
+    copy.write_bytes(path.read_bytes())
+    assert sniff_file(path)['fingerprint'] == sniff_file(copy)['fingerprint']
+    other = make_pdf(tmp_path / "c.pdf", ENCRYPTIONS["r6"])
+    assert sniff_file(other)['fingerprint'] != sniff_file(path)['fingerprint']
+
+
+def test_known_kinds_skip_password_check(tmp_path):
+    path = make_pdf(tmp_path / "r4.pdf", ENCRYPTIONS["r4_aes"])
+    fingerprint = sniff_file(path)['fingerprint']
+    with open(path, 'rb') as f:
+        assert sniff_stream(f, known_kinds={fingerprint: KIND_OWNER_ONLY})['kind'] == KIND_OWNER_ONLY
+
+
+@pytest.mark.parametrize("name", ["plain", "r4_aes", "r6"])
+@pytest.mark.parametrize("size", [0.5, 0.9])
+def test_truncated(tmp_path, name, size):
+    data = make_pdf(tmp_path / "full.pdf", ENCRYPTIONS[name], pages=3).read_bytes()
+    result = sniff_stream(io.BytesIO(data[:int(len(data) * size)]))
+    assert result['kind'] == KIND_UNKNOWN
+    assert result['reason']
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b"not a pdf at all",
+    b"%PDF-1.7\n" + bytes(range(256)) * 40,
+    b"%PDF-1.4\nstartxref\n999999\n%%EOF\n",
+    b"%PDF-1.4\nxref\n0 1\n0000000000 65535 f \ntrailer\n<< /Encrypt 5 0 R >>\nstartxref\n9\n%%EOF\n",
+])
+def test_garbage(data):
+    assert sniff_stream(io.BytesIO(data))['kind'] == KIND_UNKNOWN
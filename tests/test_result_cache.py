@@ -0,0 +1,32 @@
+import pikepdf
+
+from tests.conftest import make_pdf, pdf_files, run_batch
+
+
+def test_result_cache_reuses_unchanged_files(corpus, tmp_path):
+    output_dir = tmp_path / "out"
+    file_paths = pdf_files(corpus)
+    first, _ = run_batch(file_paths, output_dir, use_cache=True)
+    assert not any(result.get('cached') for result in first.values())
+
+    second, batch = run_batch(file_paths, output_dir, use_cache=True)
+    # 失败的结果不缓存
+    assert {name for name, result in second.items() if not result.get('cached')} == {"locked.pdf"}
+    assert batch.cache.hits == len(file_paths) - 1
+
+    make_pdf(corpus / "r3.pdf", {"R": 3, "aes": False, "metadata": False}, pages=5, marker="changed")
+    third, _ = run_batch(file_paths, output_dir, use_cache=True)
+    assert not third["r3.pdf"].get('cached')
+    with pikepdf.open(output_dir / third["r3.pdf"]['output_file']) as pdf:
+        assert len(pdf.pages) == 5
+
+    forced, _ = run_batch(file_paths, output_dir, use_cache=True, force=True)
+    assert not any(result.get('cached') for result in forced.values())
+
+
+def test_result_cache_invalidated_by_settings(corpus, tmp_path):
+    output_dir = tmp_path / "out"
+    file_paths = pdf_files(corpus)
+    run_batch(file_paths, output_dir, use_cache=True)
+    results, _ = run_batch(file_paths, output_dir, use_cache=True, prefix="other_")
+    assert not any(result.get('cached') for result in results.values())
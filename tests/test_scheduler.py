@@ -0,0 +1,78 @@
+import pytest
+
+from core.batch import FileFeed
+from core.scheduler import SizeScheduler
+from tests.conftest import MODES, outcome, pdf_files, run_batch
+
+SIZES = {"a": 30, "b": 10, "c": 50, "d": 20}
+
+
+def drain(scheduler):
+    order = []
+    while True:
+        file_path = scheduler.next(timeout=0)
+        if file_path is FileFeed.DONE:
+            return order
+        assert file_path is not None
+        order.append(file_path)
+        scheduler.finished(file_path)
+
+
+@pytest.mark.parametrize("order, expected", [
+    ("input", ["a", "b", "c", "d"]),
+    ("largest_first", ["c", "a", "d", "b"]),
+    ("smallest_first", ["b", "d", "a", "c"]),
+])
+def test_order(order, expected):
+    scheduler = SizeScheduler(FileFeed(list(SIZES), closed=True, sizes=dict(SIZES)), order)
+    assert drain(scheduler) == expected
+    assert scheduler.total_bytes == sum(SIZES.values())
+
+
+def test_unknown_order():
+    with pytest.raises(ValueError):
+        SizeScheduler(FileFeed(), "random")
+
+
+def test_memory_budget_limits_files_in_flight():
+    feed = FileFeed(list(SIZES), closed=True, sizes=dict(SIZES))
+    scheduler = SizeScheduler(feed, "input", memory_budget=100, memory_factor=2)
+    assert scheduler.next(timeout=0) == "a"
+    # a 占用 60，b 的 20 还放得下，c 的 100 放不下，d 的 40 超出剩余的 20
+    assert scheduler.next(timeout=0) == "b"
+    assert scheduler.next(timeout=0) is None
+    scheduler.finished("a")
+    assert scheduler.next(timeout=0) == "d"
+    assert scheduler.next(timeout=0) is None
+    scheduler.finished("b")
+    scheduler.finished("d")
+    # 超过预算的文件在没有其他文件时单独处理
+    assert scheduler.next(timeout=0) == "c"
+    assert scheduler.next(timeout=0) is FileFeed.DONE
+    scheduler.finished("c")
+    assert scheduler.in_flight_bytes == 0
+
+
+def test_files_added_while_running():
+    feed = FileFeed(["a"], sizes={"a": 1})
+    scheduler = SizeScheduler(feed, "smallest_first")
+    assert scheduler.next(timeout=0) == "a"
+    assert scheduler.next(timeout=0) is None
+    feed.add(["c", "b"], sizes={"b": 2, "c": 3})
+    feed.close()
+    assert drain(scheduler) == ["b", "c"]
+
+
+def test_size_read_from_disk(tmp_path):
+    path = tmp_path / "x.pdf"
+    path.write_bytes(b"0" * 123)
+    scheduler = SizeScheduler(FileFeed([str(path)], closed=True))
+    assert scheduler.size_of(str(path)) == 123
+
+
+@pytest.mark.parametrize("mode", ["sequential", "pool", "supervised"])
+def test_order_and_memory_budget_do_not_change_results(corpus, expected, tmp_path, mode):
+    output_dir = tmp_path / mode
+    results, _ = run_batch(pdf_files(corpus), output_dir, order="largest_first", memory_budget=1,
+                           **MODES[mode])
+    assert outcome(results, output_dir) == expected
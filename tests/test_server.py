@@ -0,0 +1,211 @@
+import http.client
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pikepdf
+import pytest
+
+from core.pdf_utils import STATUS_UNLOCKED, STATUS_WRONG_PASSWORD
+from core import server as server_module
+from core.server import UnlockServer, UnlockService, is_loopback
+from tests.conftest import ENCRYPTIONS, USER_PASSWORD, make_pdf
+
+
+@pytest.fixture
+def serve(tmp_path):
+    servers = []
+
+    def start(**options):
+        service = UnlockService(work_dir=str(tmp_path / "work"), **options)
+        server = UnlockServer(("127.0.0.1", 0), service, quiet=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        servers.append((server, service, thread))
+        return server.server_address[1]
+
+    yield start
+    for server, service, thread in servers:
+        server.shutdown()
+        thread.join()
+        server.server_close()
+        service.close()
+
+
+def request(port, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body)
+            headers = dict(headers or {}, **{"Content-Type": "application/json"})
+        connection.request(method, path, body, headers or {})
+        response = connection.getresponse()
+        data = response.read()
+        if response.getheader("Content-Type", "").startswith("application/json"):
+            data = json.loads(data)
+        return response.status, data
+    finally:
+        connection.close()
+
+
+def wait_done(port, job_id):
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        status, job = request(port, "GET", f"/jobs/{job_id}")
+        assert status == 200
+        if job['state'] == "done":
+            return job
+        time.sleep(0.05)
+    raise AssertionError("任务未在限定时间内完成")
+
+
+def wait_idle(port, timeout=5):
+    deadline = time.monotonic() + timeout
+    while request(port, "GET", "/metrics")[1]['active']:
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def encrypted(tmp_path):
+    return make_pdf(tmp_path / "in.pdf", ENCRYPTIONS["r6"], pages=2)
+
+
+def test_upload(serve, encrypted):
+    port = serve()
+    status, job = request(port, "POST", "/jobs", encrypted.read_bytes(),
+                          {"X-PDF-Password": USER_PASSWORD, "X-Filename": "%E6%96%87%E4%BB%B6.pdf"})
+    assert status == 202
+    job = wait_done(port, job['id'])
+    assert job['status'] == STATUS_UNLOCKED
+    assert job['source'] == "文件.pdf"
+
+    status, data = request(port, "GET", job['output'])
+    assert status == 200
+    output = encrypted.parent / "out.pdf"
+    output.write_bytes(data)
+    with pikepdf.open(output) as pdf:
+        assert not pdf.is_encrypted and len(pdf.pages) == 2
+
+    assert request(port, "DELETE", f"/jobs/{job['id']}") == (200, {'id': job['id'], 'deleted': True})
+    assert request(port, "GET", f"/jobs/{job['id']}")[0] == 404
+
+
+def test_wrong_password(serve, encrypted):
+    port = serve()
+    status, job = request(port, "POST", "/jobs", encrypted.read_bytes(), {"X-PDF-Password": "wrong"})
+    job = wait_done(port, job['id'])
+    assert job['status'] == STATUS_WRONG_PASSWORD and job['output'] is None
+    assert request(port, "GET", f"/jobs/{job['id']}/output")[0] == 404
+    metrics = request(port, "GET", "/metrics")[1]
+    assert (metrics['completed'], metrics['failed']) == (1, 1)
+
+
+def test_default_passwords(serve, encrypted):
+    port = serve(default_passwords=[USER_PASSWORD])
+    _, job = request(port, "POST", "/jobs", encrypted.read_bytes())
+    assert wait_done(port, job['id'])['status'] == STATUS_UNLOCKED
+
+
+def test_local_path(serve, encrypted):
+    port = serve(allow_local_paths=True)
+    status, job = request(port, "POST", "/jobs", {"path": str(encrypted), "passwords": ["x", USER_PASSWORD]})
+    assert status == 202
+    assert wait_done(port, job['id'])['status'] == STATUS_UNLOCKED
+
+
+def test_local_path_needs_opt_in(serve, encrypted):
+    port = serve()
+    status, payload = request(port, "POST", "/jobs", {"path": str(encrypted), "password": USER_PASSWORD})
+    assert status == 403
+    assert wait_idle(port)
+
+
+@pytest.mark.parametrize("body", [
+    {"path": "missing.pdf"},
+    {"passwords": "user-pw"},
+    {"passwords": [1, 2]},
+    {"passwords": None, "password": 5},
+    {"password": ["user-pw"]},
+    {"save_profile": "unknown"},
+    ["not", "an", "object"],
+])
+def test_invalid_path_request(serve, encrypted, body):
+    port = serve(allow_local_paths=True)
+    if isinstance(body, dict):
+        body = dict({"path": str(encrypted)}, **body)
+    status, payload = request(port, "POST", "/jobs", body)
+    assert status == 400, payload
+    # 被拒绝的请求不占用队列位置（响应发出后才释放）
+    assert wait_idle(port)
+
+
+def test_unknown_paths(serve):
+    port = serve()
+    assert request(port, "GET", "/nothing")[0] == 404
+    assert request(port, "GET", "/jobs/abc")[0] == 404
+    assert request(port, "POST", "/other", b"")[0] == 404
+    assert request(port, "GET", "/health") == (200, {'status': "ok"})
+
+
+def test_local_paths_only_on_loopback(tmp_path):
+    service = UnlockService(work_dir=str(tmp_path / "work"), allow_local_paths=True)
+    try:
+        with pytest.raises(ValueError):
+            UnlockServer(("0.0.0.0", 0), service, quiet=True)
+    finally:
+        service.close()
+
+
+@pytest.mark.parametrize("host, expected", [
+    ("127.0.0.1", True), ("127.0.0.2", True), ("::1", True), ("0.0.0.0", False), ("::", False),
+    ("192.168.1.10", False), ("localhost", False), ("fe80::1%eth0", False),
+])
+def test_is_loopback(host, expected):
+    assert is_loopback(host) == expected
+
+
+def test_broken_pool_replaced_once(tmp_path, encrypted, monkeypatch):
+    """进程池崩溃后并发提交的任务只新建一个进程池"""
+    service = UnlockService(work_dir=str(tmp_path / "work"), workers=1)
+    try:
+        with pytest.raises(BrokenProcessPool):
+            service._executor.submit(os._exit, 1).result()
+        created = []
+
+        class CountingPool(ProcessPoolExecutor):
+            def __init__(self, *args, **kwargs):
+                created.append(self)
+                # 拉长新建进程池的时间，其他请求在此期间提交
+                time.sleep(0.1)
+                super().__init__(*args, **kwargs)
+
+        monkeypatch.setattr(server_module, "ProcessPoolExecutor", CountingPool)
+        barrier = threading.Barrier(6)
+        jobs = []
+
+        def submit():
+            service.reserve()
+            job_id, job_dir = service.new_job_dir()
+            barrier.wait()
+            jobs.append(service.submit(job_id, job_dir, str(encrypted), [USER_PASSWORD], "in.pdf"))
+
+        threads = [threading.Thread(target=submit) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(created) == 1
+        for job in jobs:
+            job.future.result(timeout=30)
+        deadline = time.monotonic() + 10
+        while service.metrics()['completed'] < len(jobs) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert {job.result['status'] for job in jobs} == {STATUS_UNLOCKED}
+    finally:
+        service.close()
@@ -0,0 +1,33 @@
+from core.api import create_batch
+from core.report import ResultCollector
+from tests.conftest import USER_PASSWORD, pdf_files
+
+
+def details(summary_path):
+    with open(summary_path, encoding='utf-8') as f:
+        return f.read().split("📁 文件处理详情:")[1]
+
+
+def test_runs_sharing_output_dir_keep_their_own_details(corpus, tmp_path):
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    files = pdf_files(corpus)
+    first_batch = create_batch([USER_PASSWORD], output_dir)
+    second_batch = create_batch([USER_PASSWORD], output_dir)
+    first = ResultCollector(output_dir, "user", first_batch, report_formats=())
+    second = ResultCollector(output_dir, "user", second_batch, report_formats=())
+
+    first_results = list(first_batch.run(files[:2]))
+    second_results = list(second_batch.run(files[2:]))
+    for result in first_results:
+        first.add(result)
+    for result in second_results:
+        second.add(result)
+
+    first_summary = details(first.finish())
+    assert all(result['original_file'] in first_summary for result in first_results)
+    assert not any(result['original_file'] in first_summary for result in second_results)
+    second_summary = details(second.finish())
+    assert all(result['original_file'] in second_summary for result in second_results)
+    assert not any(result['original_file'] in second_summary for result in first_results)
+    assert not list(output_dir.glob(".summary_*"))
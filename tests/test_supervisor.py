@@ -0,0 +1,67 @@
+import os
+import time
+
+import pytest
+
+from core.batch import BatchProcessor
+from core.pdf_utils import (PDFUnlocker, STATUS_ERROR, STATUS_RESOURCE_LIMIT, STATUS_TIMEOUT,
+                            STATUS_UNLOCKED)
+from core.supervisor import MEMORY_LIMIT_SUPPORTED
+from tests.conftest import ENCRYPTIONS, USER_PASSWORD, make_pdf
+
+
+class MisbehavingUnlocker(PDFUnlocker):
+    """按文件名模拟卡住、崩溃和内存失控的文件"""
+
+    def process_file(self, file_path, password_order=None, data=None):
+        name = os.path.basename(file_path)
+        if name.startswith("hang"):
+            time.sleep(60)
+        elif name.startswith("crash"):
+            os._exit(3)
+        elif name.startswith("bloat"):
+            data = b"\1" * (512 * 1024 * 1024)
+            time.sleep(60)
+        return super().process_file(file_path, password_order, data)
+
+
+@pytest.fixture
+def files(tmp_path):
+    def make(*names):
+        folder = tmp_path / "in"
+        folder.mkdir()
+        return [str(make_pdf(folder / name, ENCRYPTIONS["r4_aes"], marker=name)) for name in names]
+    return make
+
+
+def run(file_paths, output_dir, workers=1, timeout=0, memory_limit=0):
+    output_dir.mkdir()
+    unlocker = MisbehavingUnlocker([USER_PASSWORD], output_dir, "unlocked_")
+    batch = BatchProcessor(unlocker, workers, file_timeout=timeout, memory_limit=memory_limit)
+    return {os.path.basename(result['file_path']): result for result in batch.run(file_paths)}, batch
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_timeout_kills_only_the_stuck_file(files, tmp_path, workers):
+    start = time.perf_counter()
+    results, batch = run(files("a.pdf", "hang.pdf", "b.pdf", "c.pdf"), tmp_path / "out", workers, timeout=1)
+    assert time.perf_counter() - start < 30
+    assert results["hang.pdf"]['status'] == STATUS_TIMEOUT
+    assert not results["hang.pdf"]['success']
+    assert {results[name]['status'] for name in ("a.pdf", "b.pdf", "c.pdf")} == {STATUS_UNLOCKED}
+    assert batch.supervisor.killed_count == 1
+
+
+def test_crashed_worker_is_replaced(files, tmp_path):
+    results, _ = run(files("a.pdf", "crash.pdf", "b.pdf"), tmp_path / "out", timeout=30)
+    assert results["crash.pdf"]['status'] == STATUS_ERROR
+    assert "退出码 3" in results["crash.pdf"]['message']
+    assert results["a.pdf"]['status'] == results["b.pdf"]['status'] == STATUS_UNLOCKED
+
+
+@pytest.mark.skipif(not MEMORY_LIMIT_SUPPORTED, reason="内存上限仅在 Linux 上可用")
+def test_memory_limit(files, tmp_path):
+    results, _ = run(files("a.pdf", "bloat.pdf", "b.pdf"), tmp_path / "out", timeout=30,
+                     memory_limit=256 * 1024 * 1024)
+    assert results["bloat.pdf"]['status'] == STATUS_RESOURCE_LIMIT
+    assert results["a.pdf"]['status'] == results["b.pdf"]['status'] == STATUS_UNLOCKED
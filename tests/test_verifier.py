@@ -0,0 +1,102 @@
+import pytest
+
+from core.pdf_utils import STATUS_UNLOCKED, STATUS_VERIFY_FAILED, build_result
+from core.verifier import OutputVerifier, VerifySampler, describe_verify_spec, parse_verify_spec, verify_output
+from tests.conftest import ENCRYPTIONS, MODES, make_pdf, pdf_files, run_batch
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("all", (1, None)),
+    ("ALL", (1, None)),
+    ("1", (1, None)),
+    ("10", (10, None)),
+    ("25%", (None, 25.0)),
+    ("100%", (None, 100.0)),
+])
+def test_parse_verify_spec(spec, expected):
+    assert parse_verify_spec(spec) == expected
+
+
+@pytest.mark.parametrize("spec", ["0", "-1", "0%", "150%", "abc", "", "1.5"])
+def test_parse_invalid_verify_spec(spec):
+    with pytest.raises(ValueError):
+        parse_verify_spec(spec)
+
+
+def test_describe_verify_spec():
+    assert describe_verify_spec("all") == "全部校验"
+    assert describe_verify_spec("5") == "每 5 个抽查 1 个"
+    assert describe_verify_spec("12.5%") == "抽查 12.5%"
+
+
+def sample(spec, count):
+    sampler = VerifySampler(spec)
+    return [sampler.take() for _ in range(count)]
+
+
+def test_sample_every_n():
+    assert sample("3", 7) == [True, False, False, True, False, False, True]
+    assert all(sample("all", 5))
+
+
+@pytest.mark.parametrize("percent, count, expected", [(25, 100, 25), (10, 1000, 100), (100, 10, 10), (33, 300, 99)])
+def test_sample_percent(percent, count, expected):
+    taken = sample(f"{percent}%", count)
+    assert taken[0]
+    assert sum(taken) == expected
+
+
+def test_sample_percent_is_evenly_spread():
+    taken = sample("25%", 40)
+    assert [i for i, selected in enumerate(taken) if selected] == list(range(0, 40, 4))
+
+
+def test_verify_output(tmp_path):
+    good = make_pdf(tmp_path / "good.pdf", pages=3)
+    assert verify_output(str(good), expected_pages=3) is None
+    assert verify_output(good.read_bytes()) is None
+    assert "页数" in verify_output(str(good), expected_pages=2)
+
+    data = good.read_bytes()
+    assert verify_output(data[:len(data) // 2]) is not None
+
+    encrypted = make_pdf(tmp_path / "encrypted.pdf", ENCRYPTIONS["r4_aes"])
+    assert verify_output(str(encrypted)) == "输出仍需要密码才能打开"
+    restricted = make_pdf(tmp_path / "restricted.pdf", ENCRYPTIONS["r4_aes"], user="")
+    assert verify_output(str(restricted)) == "输出仍带有加密字典 /Encrypt"
+    assert verify_output(str(restricted), allow_encryption=True) is None
+
+
+def test_output_verifier(tmp_path):
+    good = make_pdf(tmp_path / "good.pdf", pages=2)
+    bad = tmp_path / "bad.pdf"
+    bad.write_bytes(good.read_bytes()[:200])
+    verifier = OutputVerifier("all", max_pending=1)
+    for source in (good, bad):
+        result = build_result(str(source), STATUS_UNLOCKED, "已解锁", source.name, page_count=2)
+        assert verifier.wants(result)
+        verifier.submit(source, result)
+    results = {result['file_path']: result for result in verifier.close()}
+    assert results[str(good)]['verified'] and results[str(good)]['status'] == STATUS_UNLOCKED
+    assert not results[str(bad)]['verified'] and results[str(bad)]['status'] == STATUS_VERIFY_FAILED
+    assert (verifier.verified, verifier.failed) == (1, 1)
+
+
+def test_output_verifier_skips_cached_and_duplicates():
+    verifier = OutputVerifier("all")
+    try:
+        assert not verifier.wants({'status': STATUS_UNLOCKED, 'cached': True})
+        assert not verifier.wants({'status': STATUS_UNLOCKED, 'dedup_of': "a.pdf"})
+        assert not verifier.wants({'status': "copied"})
+    finally:
+        verifier.close()
+
+
+@pytest.mark.parametrize("mode", ["sequential", "pipelined", "pool"])
+def test_verify_all_outputs(corpus, tmp_path, mode):
+    output_dir = tmp_path / "out"
+    results, batch = run_batch(pdf_files(corpus), output_dir, verify="all", **MODES[mode])
+    unlocked = [result for result in results.values() if result['status'] == STATUS_UNLOCKED]
+    assert unlocked and all(result['verified'] for result in unlocked)
+    assert batch.verifier.verified == len(unlocked)
+    assert batch.verifier.failed == 0
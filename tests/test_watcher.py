@@ -0,0 +1,116 @@
+import os
+import queue
+import threading
+import time
+
+import pytest
+
+from core.watcher import FolderWatcher
+
+
+@pytest.fixture(params=["inotify", "polling"])
+def watch(request, tmp_path):
+    watchers = []
+
+    def start(folder, **options):
+        ready = queue.Queue()
+        watcher = FolderWatcher([folder], settle_time=0.3, poll_interval=0.05,
+                                use_inotify=request.param == "inotify", **options)
+
+        def on_ready(file_paths, sizes):
+            for file_path in file_paths:
+                ready.put((file_path, sizes[file_path]))
+
+        thread = threading.Thread(target=watcher.run, args=(on_ready,), daemon=True)
+        thread.start()
+        watchers.append((watcher, thread))
+        return watcher, ready
+
+    yield start
+    for watcher, thread in watchers:
+        watcher.stop()
+        thread.join()
+
+
+def collect(ready, count, timeout=10):
+    found = {}
+    deadline = time.monotonic() + timeout
+    while len(found) < count and time.monotonic() < deadline:
+        try:
+            file_path, size = ready.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        found[file_path] = size
+    return found
+
+
+def quiet(ready, period=0.6):
+    time.sleep(period)
+    return ready.empty()
+
+
+def test_existing_and_new_files(watch, tmp_path):
+    folder = tmp_path / "in"
+    (folder / "sub").mkdir(parents=True)
+    existing = folder / "existing.pdf"
+    existing.write_bytes(b"%PDF-1.4 existing")
+    watcher, ready = watch(folder)
+    assert collect(ready, 1) == {str(existing): existing.stat().st_size}
+
+    added = folder / "sub" / "added.PDF"
+    added.write_bytes(b"%PDF-1.4 added")
+    (folder / "notes.txt").write_text("ignored")
+    (folder / ".hidden.pdf").write_bytes(b"%PDF")
+    assert collect(ready, 1) == {str(added): added.stat().st_size}
+    assert quiet(ready)
+
+
+def test_new_subfolder(watch, tmp_path):
+    folder = tmp_path / "in"
+    folder.mkdir()
+    watcher, ready = watch(folder)
+    nested = folder / "a" / "b"
+    nested.mkdir(parents=True)
+    (nested / "deep.pdf").write_bytes(b"%PDF-1.4 deep")
+    assert list(collect(ready, 1)) == [str(nested / "deep.pdf")]
+
+
+def test_excluded_folder_and_subfolders_off(watch, tmp_path):
+    folder = tmp_path / "in"
+    (folder / "out").mkdir(parents=True)
+    (folder / "sub").mkdir()
+    watcher, ready = watch(folder, exclude=[folder / "out"], include_subfolders=False)
+    (folder / "out" / "unlocked_a.pdf").write_bytes(b"%PDF")
+    (folder / "sub" / "b.pdf").write_bytes(b"%PDF")
+    (folder / "top.pdf").write_bytes(b"%PDF")
+    assert list(collect(ready, 1)) == [str(folder / "top.pdf")]
+    assert quiet(ready)
+
+
+def test_waits_until_file_stops_changing(watch, tmp_path):
+    folder = tmp_path / "in"
+    folder.mkdir()
+    watcher, ready = watch(folder)
+    growing = folder / "growing.pdf"
+    with open(growing, 'wb') as f:
+        for _ in range(5):
+            f.write(b"x" * 1024)
+            f.flush()
+            time.sleep(0.1)
+            assert ready.empty()
+    assert collect(ready, 1) == {str(growing): 5 * 1024}
+
+
+def test_processed_file_reported_again_only_when_modified(watch, tmp_path):
+    folder = tmp_path / "in"
+    folder.mkdir()
+    path = folder / "a.pdf"
+    path.write_bytes(b"%PDF-1.4 first")
+    watcher, ready = watch(folder)
+    assert list(collect(ready, 1)) == [str(path)]
+    watcher.done(str(path))
+    assert quiet(ready)
+
+    path.write_bytes(b"%PDF-1.4 second version")
+    os.utime(path, ns=(time.time_ns(), time.time_ns()))
+    assert collect(ready, 1) == {str(path): path.stat().st_size}
@@ -0,0 +1,109 @@
+import os
+import hashlib
+import zipfile
+
+
+def is_pdf_file(filename):
+    return filename.lower().endswith('.pdf')
+
+
+def is_zip_file(filename):
+    return filename.lower().endswith('.zip')
+
+
+def archive_member_path(archive_path, member_name):
+    """压缩包成员的虚拟路径：压缩包路径后接成员在包内的路径，如 bundle.zip/dir/a.pdf"""
+    return os.path.join(archive_path, *member_name.split('/'))
+
+
+def split_archive_path(file_path):
+    """把压缩包成员的虚拟路径拆分为 (压缩包路径, 成员名)，普通文件返回 None"""
+    file_path = os.fspath(file_path)
+    lowered = file_path.lower()
+    marker = ".zip" + os.sep
+    index = lowered.find(marker)
+    while index != -1:
+        archive_path = file_path[:index + 4]
+        if os.path.isfile(archive_path):
+            return archive_path, file_path[index + len(marker):].replace(os.sep, '/')
+        index = lowered.find(marker, index + 1)
+    return None
+
+
+def iter_archive_pdfs(archive_path, with_size=False):
+    """列出ZIP压缩包中的PDF成员（只读取中央目录，不解压）"""
+    try:
+        with zipfile.ZipFile(archive_path) as archive:
+            members = [info for info in archive.infolist()
+                       if not info.is_dir() and is_pdf_file(info.filename)]
+    except (OSError, zipfile.BadZipFile):
+        return
+    for info in members:
+        file_path = archive_member_path(archive_path, info.filename)
+        yield (file_path, info.file_size) if with_size else file_path
+
+
+def iter_pdf_files(folder_path, include_subfolders=True, with_size=False, include_archives=False):
+    """基于 os.scandir 逐个产出PDF路径，无需等待整个目录树遍历完成
+
+    with_size 为 True 时产出 (路径, 文件大小)，大小取自目录项信息。
+    include_archives 为 True 时ZIP压缩包视为文件夹，产出其中PDF成员的虚拟路径。
+    """
+    pending_dirs = [folder_path]
+    while pending_dirs:
+        current = pending_dirs.pop()
+        try:
+            with os.scandir(current) as entries:
+                subdirs = []
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if include_subfolders:
+                                subdirs.append(entry.path)
+                        elif is_pdf_file(entry.name) and entry.is_file():
+                            yield (entry.path, entry.stat().st_size) if with_size else entry.path
+                        elif include_archives and is_zip_file(entry.name) and entry.is_file():
+                            yield from iter_archive_pdfs(entry.path, with_size)
+                    except OSError:
+                        continue
+        except OSError:
+            if current == folder_path:
+                raise
+            continue
+        pending_dirs.extend(reversed(subdirs))
+
+
+def find_pdf_files(folder_path, include_subfolders=True):
+    return list(iter_pdf_files(folder_path, include_subfolders))
+
+
+def collect_pdf_files(paths, include_subfolders=True, include_archives=False):
+    """展开文件和文件夹参数为去重后的PDF文件列表，保持输入顺序"""
+    seen = set()
+    pdf_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            candidates = iter_pdf_files(path, include_subfolders, include_archives=include_archives)
+        elif include_archives and is_zip_file(path):
+            candidates = iter_archive_pdfs(path)
+        else:
+            candidates = [path]
+        for file_path in candidates:
+            if file_path not in seen:
+                seen.add(file_path)
+                pdf_files.append(file_path)
+    return pdf_files
+
+
+def load_password_file(file_path):
+    """读取候选密码文件，每行一个密码，忽略空行"""
+    with open(file_path, 'r', encoding='utf-8-sig') as f:
+        return [line.rstrip('\r\n') for line in f if line.rstrip('\r\n')]
+
+
+def file_digest(file_path, chunk_size=1024 * 1024):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()